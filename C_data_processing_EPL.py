@@ -9,6 +9,14 @@ from pandas.api.types import is_object_dtype, is_categorical_dtype, CategoricalD
 from fuzzywuzzy import fuzz
 from datetime import datetime, timedelta
 import numpy as np
+import channel_names
+import excel_reader
+import macro_rules
+from compact_frame import compact_frame, decompact_column, should_compact
+from broadcast_times import BroadcastTimesCache
+from column_schema import MARKET_CHECK_BSR_COLUMNS, REQUIRED_BSR_FIELDS, canonicalize_columns
+from sequential_gaps import sequential_gaps
+from flag_codes import FlagCodes
 from datetime import timedelta
 
 
@@ -28,28 +36,38 @@ class EPLValidator:
     # --- AUDIENCE CHECK CLASS CONSTANTS ---
     OVERNIGHT_SHEET = "DATA"
     OVERNIGHT_AUDIENCE_COL = 'Audience'
-    BSR_TARGET_COL_RAW = 'Aud Metered (000s) 3+'
+    BSR_TARGET_COL_RAW = MARKET_CHECK_BSR_COLUMNS['aud_metered'][0]  # 'Aud Metered (000s) 3+'
     GP_FILTER_COL = 'Grand Prix'
     GP_FILTER_VALUE = '15_Dutch GP'
     
-    # Canonical Column Names
-    COUNTRY_COLUMN = 'Market' 
-    CHANNEL_COLUMN = 'TV-Channel'
-    DATE_COLUMN = 'Date'
-    SESSION_COMPETITION_COLUMN = 'Competition'
-
-    def __init__(self, bsr_path: str, obligation_path: str = None, overnight_path: str = None, macro_path: str = None):
+    # Canonical Column Names: other accepted spellings of a header (BSR_COLUMNS,
+    # see column_schema.py) are renamed to these on load
+    BSR_COLUMNS = MARKET_CHECK_BSR_COLUMNS
+    COUNTRY_COLUMN = BSR_COLUMNS['market'][0]
+    CHANNEL_COLUMN = BSR_COLUMNS['tv_channel'][0]
+    DATE_COLUMN = BSR_COLUMNS['local_date'][0]
+    SESSION_COMPETITION_COLUMN = BSR_COLUMNS['competition'][0]
+
+    def __init__(self, bsr_path: str, obligation_path: str = None, overnight_path: str = None, macro_path: str = None,
+                 df: pd.DataFrame = None, dup_rules: macro_rules.ProjectRules = None, compact: bool = None):
         # self.df = df        
         self.bsr_path = bsr_path
-        self.df = self._load_bsr()
+        # compact: categorical / Arrow string text columns (compact_frame.py); None follows QC_COMPACT_BSR
+        self.compact = should_compact(compact)
+        # An already-loaded BSR (e.g. shared with another validator) skips the workbook read
+        self.df = df if df is not None else self._load_bsr()
+        # Headers resolved once; a BSR without the core columns fails here, before any check runs
+        self.df, self.schema = canonicalize_columns(self.df, self.BSR_COLUMNS, REQUIRED_BSR_FIELDS)
+        # Parsed Start/End timestamps of self.df, shared by the time-based checks (broadcast_times.py)
+        self.times = BroadcastTimesCache()
+        # Detail tables written next to the processed BSR, keyed by sheet name
+        self.side_tables: Dict[str, pd.DataFrame] = {}
         # New: Store the obligation path, but don't load the full DF yet
         self.obligation_path = obligation_path
         self.full_obligation_df = None # Will store the entire obligation sheet
         # NEW: Store the overnight path
         self.overnight_path = overnight_path # <-- STORED HERE
         self.macro_path = macro_path
-        # 🚨 NEW: Load and store the duplication rules DataFrame
-        self.dup_rules_df = self._load_and_filter_macro_rules()
 
         # ✅ FIX: Load the DataFrame immediately using the path
         # try:
@@ -61,8 +79,10 @@ class EPLValidator:
         self.full_obligation_df = None 
         
         # Load duplication rules (Assuming _load_and_filter_macro_rules is defined in your class)
+        self.dup_rule_pairs = {}
+        self.dup_project_rules = None
         try:
-            self.dup_rules_df = self._load_and_filter_macro_rules()
+            self.dup_rules_df = self._load_and_filter_macro_rules(dup_rules)
         except Exception:
             # Handle case where macro path might not be set or valid
             self.dup_rules_df = pd.DataFrame()
@@ -84,35 +104,29 @@ class EPLValidator:
         # Future EPL checks would be added here
     }
 
-    def _load_and_filter_macro_rules(self):
-        """Loads, filters, and standardizes the macro duplication rules file."""
-        if not self.macro_path:
+    def _load_and_filter_macro_rules(self, project_rules=None):
+        """
+        Loads the duplication rules from the compiled macro rule index
+        (macro_rules.py), so the macro workbook is only parsed once per file content.
+        project_rules: an already-compiled rule set (e.g. from another validator) to use as-is.
+        """
+        if project_rules is None and not self.macro_path:
             return None
             
         MACRO_SHEET_NAME = "Data Core"
         MACRO_HEADER_INDEX = 1 
         SEARCH_TERM = "Formula 1"
-        REQUIRED_RULE_COLS = ['Orig Market', 'Dup Market', 'Dup Channel', 'Projects'] # Include Projects for filtering
 
         try:
-            df_macro = pd.read_excel(self.macro_path, sheet_name=MACRO_SHEET_NAME, header=MACRO_HEADER_INDEX)
-            df_macro.columns = [str(c).strip() for c in df_macro.columns]
+            if project_rules is None:
+                rule_index = macro_rules.load_macro_rule_index(self.macro_path, MACRO_SHEET_NAME, MACRO_HEADER_INDEX)
+                project_rules = rule_index.project(SEARCH_TERM)
+            self.dup_project_rules = project_rules
+            self.dup_rule_pairs = project_rules.market_pairs
 
-            # 1. Filter by Project (Formula 1)
-            filtered_df = df_macro[
-                df_macro['Projects'].astype(str).str.contains(SEARCH_TERM, case=False, na=False)
-            ].copy()
-            
-            # 2. Select and clean required columns
-            df_dup_rules = filtered_df[REQUIRED_RULE_COLS].copy()
-
-            # Ensure key columns are clean strings (strip, upper case)
-            for col in ['Orig Market', 'Dup Market', 'Dup Channel']:
-                if col in df_dup_rules.columns:
-                    df_dup_rules[col] = df_dup_rules[col].astype(str).str.strip().str.upper()
-                    
+            # Key columns come back stripped and upper-cased
             # We only need 'Orig Market', 'Dup Market', 'Dup Channel' for the validation check
-            return df_dup_rules[['Orig Market', 'Dup Market', 'Dup Channel']].drop_duplicates()
+            return project_rules.keys("upper")[['Orig Market', 'Dup Market', 'Dup Channel']].drop_duplicates()
         
         except Exception as e:
             print(f"Error loading duplication rules from macro file: {e}")
@@ -229,8 +243,10 @@ class EPLValidator:
         # Apply standardization to BSR columns
         for col in [COUNTRY_COLUMN, CHANNEL_COLUMN, SESSION_COMPETITION_COLUMN]:
             if col in self.df.columns:
+                decompact_column(self.df, col)
                 self.df.loc[:, col] = self.df[col].astype(str).str.strip().str.upper()
         if DATE_COLUMN in self.df.columns:
+            decompact_column(self.df, DATE_COLUMN)
             self.df.loc[:, DATE_COLUMN] = pd.to_datetime(self.df[DATE_COLUMN], errors='coerce')
             
         # --- 3. AGGREGATE OVERNIGHT DATA (Get max audience per key) ---
@@ -341,7 +357,7 @@ class EPLValidator:
             sheet_name: The name or index of the Excel sheet to read. Defaults to the first sheet (0).
         """
         # Read a sample of the specified sheet
-        df_sample = pd.read_excel(
+        df_sample = excel_reader.read_excel(
             self.bsr_path, 
             sheet_name=sheet_name, 
             header=None, 
@@ -371,7 +387,7 @@ class EPLValidator:
         header_row = self._detect_header_row(sheet_name=sheet_name_to_load)
 
         # Load the full data using the detected header row and sheet name
-        df = pd.read_excel(
+        df = excel_reader.read_excel(
             self.bsr_path, 
             sheet_name=sheet_name_to_load,  # Use the specific sheet name
             header=header_row               # Use the dynamically detected header row
@@ -379,8 +395,14 @@ class EPLValidator:
         
         # Ensure column names are clean
         df.columns = [str(c).strip() for c in df.columns]
+        if self.compact:
+            df = compact_frame(df)
         return df
 
+    def _broadcast_times(self, date_col='Date (UTC/GMT)', start_col='Start (UTC)', end_col='End (UTC)'):
+        """Date_DT / Start_DT / End_DT / Times_Valid for the current self.df (rollover applied)."""
+        return self.times.get(self.df, date_col, start_col, end_col)
+
     # --- Methods for Market Specific Checks (Placeholder Implementation) ---
     def market_check_processor(self, checks: List[str]) -> List[Dict[str, Any]]:
         # ... (Method contents remain unchanged - assumed correct)
@@ -489,19 +511,9 @@ class EPLValidator:
 
         self.df[FLAG_COLUMN] = 'OK'
         
-        # 2. Prepare Timestamps (using safe parsing logic)
+        # 2. Prepare Timestamps ('Date' is the start date of the program; End_DT rolls over midnight)
         try:
-            # Create robust datetime objects. Assume 'Date' represents the start date of the program.
-            date_key = self.df['Date'].astype(str).str[:10]
-            self.df['Start_DT'] = pd.to_datetime(date_key + ' ' + self.df['Start'].astype(str), errors='coerce')
-            
-            # Adjust End_DT for programs that cross midnight.
-            end_times = self.df['End'].astype(str)
-            base_end_dt = pd.to_datetime(date_key + ' ' + end_times, errors='coerce')
-            rollover_mask = (base_end_dt < self.df['Start_DT']) & base_end_dt.notna()
-            base_end_dt.loc[rollover_mask] += timedelta(days=1)
-            self.df['End_DT'] = base_end_dt
-            
+            times = self._broadcast_times('Date', 'Start', 'End')
         except Exception as e:
             return {
                 "check_key": "consolidate_gillete_soccer", "status": "Failed",
@@ -510,63 +522,31 @@ class EPLValidator:
                 "details": {"rows_flagged": 0}
             }
 
-        # 3. Filter and Sort Candidates
+        # 3. Filter Candidates
         
         # Filter for candidates that are NOT missing time data
         gillete_mask = self.df['Combined'].astype(str).str.upper().str.contains(KEYWORD, na=False)
-        df_candidates = self.df[gillete_mask & self.df['Start_DT'].notna() & self.df['End_DT'].notna()].copy()
-        
-        # Preserve original index for final flagging
-        df_candidates['Original_Index'] = df_candidates.index
+        df_candidates = self.df[gillete_mask & times['Times_Valid']].join(times[['Start_DT', 'End_DT']])
         
         # Grouping by Market and Channel only
         GROUP_COLS = ['Market', 'TV-Channel']
-        df_candidates = df_candidates.sort_values(by=GROUP_COLS + ['Start_DT'])
-
-        # 4. Perform Sequential Gap Check (Now grouping only by Market and Channel)
-        
-        # Dictionary to store complex flags: {original_index_to_flag: message}
-        complex_flags = {}
-        
-        for _, group in df_candidates.groupby(GROUP_COLS):
-            # Calculate the gap in minutes
-            time_gap_minutes = (group['Start_DT'] - group['End_DT'].shift(1)) / timedelta(minutes=1)
-            
-            # Get the original index of the PRECEDING row (Row A)
-            preceding_original_indices = group['Original_Index'].shift(1)
-            
-            # Identify the second row in the sequence where gap is valid
-            consolidation_mask = (time_gap_minutes <= MAX_GAP_MINUTES) & (time_gap_minutes >= 0)
-            
-            # Filter down to the indices that meet the consolidation criteria
-            indices_to_flag_now = group[consolidation_mask]['Original_Index']
-            preceding_indices_now = preceding_original_indices[consolidation_mask]
 
-            # Construct the detailed flag message for each flagged row
-            for idx_to_flag, idx_preceding in zip(indices_to_flag_now, preceding_indices_now):
-                
-                # Look up the Start Time of the preceding row (Row A) using its original index
-                # Assuming 'Start' column is a readable string/object
-                preceding_start_time = self.df.loc[idx_preceding, 'Start']
-                
-                # Construct the descriptive flag message
-                flag_message = (f"Consolidate with program starting at {preceding_start_time} "
-                                f"(Original Index: {idx_preceding}, Gap <= {MAX_GAP_MINUTES}min)")
-                
-                complex_flags[idx_to_flag] = flag_message
+        # 4. Perform Sequential Gap Check: each candidate vs the previous candidate on the same Market/Channel
+        gaps = sequential_gaps(df_candidates, GROUP_COLS, 'Start_DT', 'End_DT')
+        consolidate = gaps[gaps['has_predecessor'] & (gaps['gap_min'] >= 0) & (gaps['gap_min'] <= MAX_GAP_MINUTES)]
 
-        rows_flagged = len(complex_flags)
+        rows_flagged = len(consolidate)
         
-        # 5. Apply Flag to Original DataFrame (Uses the dictionary mapping)
+        # 5. Apply Flag to Original DataFrame, pointing each flagged row (Row B) at its preceding row (Row A)
         if rows_flagged > 0:
-            # Create a pandas Series from the dictionary {original_index: message}
-            flag_series = pd.Series(complex_flags)
-            
-            # Apply the messages directly to the original DataFrame using .loc
+            preceding = consolidate['predecessor']
+            preceding_start = self.df.loc[preceding.to_numpy(), 'Start'].astype(str).to_numpy()
+            flag_series = pd.Series(
+                [f"Consolidate with program starting at {start} (Original Index: {idx_preceding}, Gap <= {MAX_GAP_MINUTES}min)"
+                 for start, idx_preceding in zip(preceding_start, preceding)],
+                index=consolidate.index,
+            )
             self.df.loc[flag_series.index, FLAG_COLUMN] = flag_series
-            
-            # Final cleanup of temporary columns in self.df
-            self.df.drop(columns=['Start_DT', 'End_DT'], inplace=True, errors='ignore')
 
         return {
             "check_key": "consolidate_gillete_soccer",
@@ -606,7 +586,7 @@ class EPLValidator:
 
         # 1. Normalize columns for reliable filtering
         market_norm = self.df['Market'].astype(str).str.strip().str.upper()
-        channel_norm = self.df['TV-Channel'].astype(str).str.strip().str.upper()
+        channel_norm = channel_names.normalize_series(self.df['TV-Channel'], "key")
         type_norm = self.df['Type of program'].astype(str).str.strip().str.upper()
 
         # 2. Identify the target rows (Robust Market AND Channel Identification)
@@ -1032,6 +1012,7 @@ class EPLValidator:
         CAPACITY_GROUPING_KEY = ['Market', 'Channel ID', 'Date (UTC/GMT)','Combined']
         
         LIVE_PROGRAM_TYPE = 'LIVE'
+        CONFLICT_TABLE = 'Capacity Conflicts'  # side table: conflict group -> conflicting programs
         
         REQUIRED_COLS = ['Market', 'Channel ID', 'Type of program', 'Date (UTC/GMT)', 'Start (UTC)', 'End (UTC)', 'Home Team', 'Away Team']
         if not all(col in self.df.columns for col in REQUIRED_COLS):
@@ -1041,15 +1022,8 @@ class EPLValidator:
         
         # --- 1. Prepare Data and Timestamps (Handling midnight rollover) ---
         try:
-            date_key = self.df['Date (UTC/GMT)'].astype(str).str[:10]
-            self.df['Start_DT'] = pd.to_datetime(date_key + ' ' + self.df['Start (UTC)'].astype(str), errors='coerce')
-            base_end_dt = pd.to_datetime(date_key + ' ' + self.df['End (UTC)'].astype(str), errors='coerce')
-            rollover_mask = (base_end_dt < self.df['Start_DT']) & base_end_dt.notna()
-            base_end_dt.loc[rollover_mask] += timedelta(days=1)
-            self.df['End_DT'] = base_end_dt
-            
+            times = self._broadcast_times('Date (UTC/GMT)', 'Start (UTC)', 'End (UTC)')
         except Exception as e:
-            self.df.drop(columns=['Start_DT', 'End_DT'], inplace=True, errors='ignore')
             return {"check_key": "check_live_broadcast_uniqueness", "status": "Failed", "action": "Live Overlap Check", "description": f"Failed to parse Date/Time columns: {e}", "details": {"rows_flagged": 0}}
             
         # Standardize grouping columns
@@ -1058,64 +1032,59 @@ class EPLValidator:
 
         live_mask = self.df['Type of program'].astype(str).str.upper().str.strip() == LIVE_PROGRAM_TYPE
         
-        df_live_candidates = self.df[live_mask].copy()
-        
-        # --- 2. Overlap Detection Logic (Grouping by Capacity Slot) ---
-        
-        conflict_details = {} 
-        
-        # Sort by the CAPACITY key and Start_DT
-        df_live_candidates = df_live_candidates.sort_values(by=CAPACITY_GROUPING_KEY + ['Start_DT'])
-        
-        # Group by the CAPACITY SLOT (Market, Channel ID, Date)
-        for key_tuple, group in df_live_candidates.groupby(CAPACITY_GROUPING_KEY):
-            if len(group) < 2:
-                continue
-                
-            lagged_end_dt = group['End_DT'].shift(1)
-            overlap_start_mask = group['Start_DT'] < lagged_end_dt
-            
-            # Check if any overlap exists in this specific group
-            if overlap_start_mask.any():
-                
-                current_overlap_indices = group[overlap_start_mask].index.tolist()
-                preceding_overlap_indices = group[overlap_start_mask].shift(1).index.dropna().astype(int)
-
-                all_conflict_indices = set(current_overlap_indices).union(set(preceding_overlap_indices))
-                
-                # Format the detailed conflict message for this group
-                conflict_log = []
-                
-                for idx in sorted(list(all_conflict_indices)):
-                    row = self.df.loc[idx]
-                    
-                    # Retrieve all relevant info for diagnosis
-                    team_info = f"{row['Home Team']} vs {row['Away Team']}"
-                    
-                    log_entry = (f"Index {idx} | Fixture: {team_info} | "
-                                f"Times: {row['Start (UTC)']} - {row['End (UTC)']}")
-                    conflict_log.append(log_entry)
-                
-                # Key tuple contains: (Market, Channel ID, Date)
-                key_id = "|".join([str(k) for k in key_tuple]) 
-                
-                conflict_message = f"CAPACITY CONFLICT: Channel Slot ({key_id}) has overlapping LIVE feeds. Conflicting slots: " + " || ".join(conflict_log)
-
-                # Apply the SAME detailed message to ALL rows involved in this specific conflict group
-                for idx in all_conflict_indices:
-                    conflict_details[idx] = conflict_message
-        
+        df_live_candidates = self.df[live_mask].join(times[['Start_DT', 'End_DT']])
+        
+        # --- 2. Overlap Detection Logic (Sweep per Capacity Slot) ---
+        # Programs sorted by start within each slot; a program conflicts when it starts
+        # before the latest end of ANY earlier program in the slot. Each run of
+        # chained overlaps is one conflict group, and every program in it is flagged.
+        slots = df_live_candidates.dropna(subset=CAPACITY_GROUPING_KEY)
+        slots = slots[slots['Start_DT'].notna()]
+        slot_id = slots.groupby(CAPACITY_GROUPING_KEY, sort=True, observed=True).ngroup()
+        slots = slots.assign(_slot=slot_id).sort_values(by=['_slot', 'Start_DT'], kind='mergesort')
+
+        ends = slots['End_DT'].fillna(pd.Timestamp.min)
+        prev_max_end = ends.groupby(slots['_slot'], sort=False).shift(1).fillna(pd.Timestamp.min)
+        prev_max_end = prev_max_end.groupby(slots['_slot'], sort=False).cummax()
+        overlaps = slots['Start_DT'] < prev_max_end
+
+        chain = (~overlaps).cumsum()
+        in_conflict = chain.groupby(chain).transform('size') > 1
+        conflicts = slots[in_conflict.to_numpy()]
+
+        # --- 3. Conflict side table (one row per conflicting program) + row flags ---
+        conflict_group = pd.Series(pd.factorize(chain[in_conflict.to_numpy()])[0] + 1, index=conflicts.index)
+        conflict_table = pd.DataFrame({
+            'Conflict_Group': conflict_group.to_numpy(),
+            'Index': conflicts.index,
+            **{col: conflicts[col].to_numpy() for col in CAPACITY_GROUPING_KEY},
+            'Fixture': (conflicts['Home Team'].astype(str) + ' vs ' + conflicts['Away Team'].astype(str)).to_numpy(),
+            'Start (UTC)': conflicts['Start (UTC)'].to_numpy(),
+            'End (UTC)': conflicts['End (UTC)'].to_numpy(),
+        })
+
+        rows_flagged = len(conflict_table)
+        n_groups = int(conflict_group.max()) if rows_flagged else 0
 
-        # --- 3. Apply Flag to Original DataFrame ---
-        rows_flagged = len(conflict_details)
-        
         if rows_flagged > 0:
-            flag_series = pd.Series(conflict_details)
-            
-            self.df.loc[flag_series.index, FLAG_COLUMN] = flag_series
-
-        # Final cleanup of temporary columns in self.df
-        self.df.drop(columns=['Start_DT', 'End_DT'], inplace=True, errors='ignore')
+            group_rows = conflict_table.drop_duplicates('Conflict_Group')
+            group_size = conflict_table['Conflict_Group'].value_counts()
+            # Flag codes: one message per conflict group
+            flags = FlagCodes(ok='OK')
+            group_code = {
+                gid: flags.code(
+                    "CAPACITY CONFLICT #{gid}: Channel Slot ({slot}) has {n} overlapping LIVE feeds. "
+                    "See '{table}' for the conflicting slots.",
+                    gid=gid, slot='|'.join(str(k) for k in key), n=group_size[gid], table=CONFLICT_TABLE,
+                )
+                for gid, key in zip(group_rows['Conflict_Group'], group_rows[CAPACITY_GROUPING_KEY].itertuples(index=False))
+            }
+            codes = np.zeros(len(self.df), dtype=np.int32)
+            codes[self.df.index.get_indexer(conflict_group.index)] = conflict_group.map(group_code).to_numpy()
+            self.df[FLAG_COLUMN] = flags.column(codes, self.df.index)
+            self.side_tables[CONFLICT_TABLE] = conflict_table
+        else:
+            self.side_tables.pop(CONFLICT_TABLE, None)
 
         # 4. Final Summary
         return {
@@ -1125,6 +1094,8 @@ class EPLValidator:
             "description": f"Flagged {rows_flagged} rows involved in a simultaneous live broadcast conflict.",
             "details": {
                 "rows_flagged": int(rows_flagged),
+                "conflict_groups": n_groups,
+                "conflict_table": CONFLICT_TABLE if rows_flagged > 0 else None,
                 "uniqueness_key_components": CAPACITY_GROUPING_KEY
             }
         }
@@ -1153,7 +1124,7 @@ class EPLValidator:
         # 1. Normalize and Calculate Counts
         
         # Normalize channel names for accurate grouping (UPPER/strip)
-        channel_norm = self.df[CHANNEL_COL].astype(str).str.strip().str.upper()
+        channel_norm = channel_names.normalize_series(self.df[CHANNEL_COL], "key")
         
         # Calculate the current line item count for each unique channel
         channel_counts_df = channel_norm.value_counts().reset_index()
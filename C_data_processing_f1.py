@@ -9,6 +9,16 @@ from pandas.api.types import is_object_dtype, is_categorical_dtype, CategoricalD
 from fuzzywuzzy import fuzz
 from datetime import datetime, timedelta
 import numpy as np
+import channel_names
+import excel_reader
+import macro_rules
+from compact_frame import compact_frame, decompact_column, should_compact
+from broadcast_times import BroadcastTimesCache
+from column_schema import MARKET_CHECK_BSR_COLUMNS, REQUIRED_BSR_FIELDS, canonicalize_columns
+from durations import duration_minutes
+from flag_codes import FlagCodes
+from row_removals import RowRemoval, apply_removals
+import report_writer
 
 
 # --- Constants ---
@@ -18,6 +28,20 @@ RED_FILL = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="soli
 HEADER_FILL = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="solid")
 
 
+def _stripped_text(series):
+    """str(x).strip() for every cell, "" for missing values."""
+    return pd.Series(np.where(series.isna(), "", series.astype(str).str.strip()), index=series.index, dtype=object)
+
+
+def _join_remarks(parts, default="OK"):
+    """Joins per-row remark arrays with "; " (empty entries skipped); rows without any remark get default."""
+    joined = np.full(len(parts[0]), "", dtype=object)
+    for part in parts:
+        part = np.asarray(part, dtype=object)
+        joined = np.where(joined == "", part, np.where(part == "", joined, joined + "; " + part))
+    return np.where(joined == "", default, joined)
+
+
 class BSRValidator:
     """
     Handles loading, validating, and processing of BSR data.
@@ -27,19 +51,29 @@ class BSRValidator:
     # --- AUDIENCE CHECK CLASS CONSTANTS ---
     OVERNIGHT_SHEET = "DATA"
     OVERNIGHT_AUDIENCE_COL = 'Audience'
-    BSR_TARGET_COL_RAW = 'Aud Metered (000s) 3+'
+    BSR_TARGET_COL_RAW = MARKET_CHECK_BSR_COLUMNS['aud_metered'][0]  # 'Aud Metered (000s) 3+'
     GP_FILTER_COL = 'Grand Prix'
     GP_FILTER_VALUE = '15_Dutch GP'
     
-    # Canonical Column Names
-    COUNTRY_COLUMN = 'Market' 
-    CHANNEL_COLUMN = 'TV-Channel'
-    DATE_COLUMN = 'Date'
-    SESSION_COMPETITION_COLUMN = 'Competition'
-
-    def __init__(self, bsr_path: str , obligation_path: str = None, overnight_path: str = None, macro_path: str = None):
+    # Canonical Column Names: other accepted spellings of a header (BSR_COLUMNS,
+    # see column_schema.py) are renamed to these on load
+    BSR_COLUMNS = MARKET_CHECK_BSR_COLUMNS
+    COUNTRY_COLUMN = BSR_COLUMNS['market'][0]
+    CHANNEL_COLUMN = BSR_COLUMNS['tv_channel'][0]
+    DATE_COLUMN = BSR_COLUMNS['local_date'][0]
+    SESSION_COMPETITION_COLUMN = BSR_COLUMNS['competition'][0]
+
+    def __init__(self, bsr_path: str , obligation_path: str = None, overnight_path: str = None, macro_path: str = None,
+                 df: pd.DataFrame = None, dup_rules: macro_rules.ProjectRules = None, compact: bool = None):
         self.bsr_path = bsr_path
-        self.df = self._load_bsr()
+        # compact: categorical / Arrow string text columns (compact_frame.py); None follows QC_COMPACT_BSR
+        self.compact = should_compact(compact)
+        # An already-loaded BSR (e.g. shared with another validator) skips the workbook read
+        self.df = df if df is not None else self._load_bsr()
+        # Headers resolved once; a BSR without the core columns fails here, before any check runs
+        self.df, self.schema = canonicalize_columns(self.df, self.BSR_COLUMNS, REQUIRED_BSR_FIELDS)
+        # Parsed Start/End timestamps of self.df, shared by the time-based checks (broadcast_times.py)
+        self.times = BroadcastTimesCache()
 
         # New: Store the obligation path, but don't load the full DF yet
         self.obligation_path = obligation_path
@@ -51,7 +85,9 @@ class BSRValidator:
         self.macro_path = macro_path
 
         # 🚨 NEW: Load and store the duplication rules DataFrame
-        self.dup_rules_df = self._load_and_filter_macro_rules()
+        self.dup_rule_pairs = {}
+        self.dup_project_rules = None
+        self.dup_rules_df = self._load_and_filter_macro_rules(dup_rules)
         
         # Dictionary to map market check keys to internal methods (to be implemented)
         self.market_check_map = {
@@ -87,107 +123,53 @@ class BSRValidator:
             "check_aztv": self._flag_aztv,
             "check_rush_caribbean": self._flag_rush_caribbean,
 
-            # 3. Removals and Recreations
-            "remove_andorra": lambda: self._remove_country("Andorra"),
-            "remove_serbia": lambda: self._remove_country("Serbia"),
-            "remove_montenegro": lambda: self._remove_country("Montenegro"),
-            "remove_brazil_espn_fox": self._remove_brazil_espn_fox,
-            "remove_switz_canal": self._remove_switz_canal,
-            "remove_viaplay_baltics": self._remove_viaplay_baltics,
+            # 3. Removals (see self.removal_checks) and Recreations
             "recreate_viaplay": self._recreate_viaplay,
             "recreate_disney_latam": self._recreate_disney_latam,
         }
 
+        # Row removal checks; market_check_processor applies consecutive ones as one batch (row_removals.py)
+        self.removal_checks = {removal.check_key: removal for removal in [
+            self._country_removal("Andorra"),
+            self._country_removal("Serbia"),
+            self._country_removal("Montenegro"),
+            self._brazil_espn_fox_removal(),
+            self._switz_canal_removal(),
+            self._viaplay_baltics_removal(),
+        ]}
+
     def normalize_channel_name(self ,channel_series):
         """
         Removes regional codes, parentheses, suffixes, and numbers to compare channels 
         by their core brand identity (e.g., ESPN, Sky).
         """
-        normalized = channel_series.astype(str).str.strip().str.upper()
-        normalized = normalized.str.replace(r'\s*\([^)]*\)', '', regex=True)
-        normalized = normalized.str.replace(
-            r'(\s+ARG|\s+BOL|\s+CHL|\s+PER|\s+SWE|\s+DE|\s+AFR|\s+PCA|\s+COL|\s+ECU|\s+URY|\s+MEX|\s+JPN|\s+LTU|\s+CHE|\s+FRA)', 
-            '', 
-            flags=re.IGNORECASE, 
-            regex=True
-        )
-        # normalized = normalized.str.replace(
-        #     r'(\s+\d+|F1|360|MAXIMO|NEWS|TOP EVENT|PREMIER LEAGUE|LALIGA|CRICKET|FOOTBALL|GOLF|GRANDSTAND|MOTORSPORT|RUGBY|TENNIS|VARIETY|WWE|RED BUTTON|MAIN EVENT|SHOWCASE|MIX|ACTION|FOOT|LIVE|\s+4K|\s+INFO)', 
-        #     '', 
-        #     flags=re.IGNORECASE, 
-        #     regex=True
-        # )
-        # normalized = normalized.str.replace(r'\s+SPORT[S]*', '', regex=True)
-        # normalized = normalized.str.replace(r'\s+TV', '', regex=True)
-        # normalized = normalized.str.replace(r'\s{2,}', ' ', regex=True).str.strip()
-        # normalized = normalized.str.replace(r'\s+', '', regex=True).str.strip()
-        # normalized = normalized.str.replace(r'[\s\+]+', '', regex=True).str.strip()
-        return normalized
+        return channel_names.normalize_series(channel_series, "brand")
 
 # --- NEW HELPER METHOD: Load and Filter Macro Rules ---
-    def _load_and_filter_macro_rules(self):
-        """Loads, filters, and standardizes the macro duplication rules file."""
-        if not self.macro_path:
-            return None
-            
-        MACRO_SHEET_NAME = "Data Core"
-        MACRO_HEADER_INDEX = 1 
-        SEARCH_TERM = "Formula 1"
-        REQUIRED_RULE_COLS = ['Orig Market', 'Dup Market', 'Dup Channel', 'Projects'] # Include Projects for initial filtering
-
-        try:
-            # NOTE: Assumes self.macro_path is set in __init__
-            df_macro = pd.read_excel(self.macro_path, sheet_name=MACRO_SHEET_NAME, header=MACRO_HEADER_INDEX)
-            df_macro.columns = [str(c).strip() for c in df_macro.columns]
-
-            filtered_df = df_macro[
-                df_macro['Projects'].astype(str).str.contains(SEARCH_TERM, case=False, na=False)
-            ].copy()
-            
-            # Select and clean required columns
-            df_dup_rules = filtered_df[['Orig Market', 'Dup Market', 'Dup Channel']].copy()
-
-            # Ensure all key columns are clean strings (strip, upper case)
-            for col in ['Orig Market', 'Dup Market', 'Dup Channel']:
-                if col in df_dup_rules.columns:
-                    df_dup_rules[col] = df_dup_rules[col].astype(str).str.strip().str.upper()
-                    
-            return df_dup_rules
-        
-        except Exception as e:
-            print(f"Error loading duplication rules from macro file: {e}")
-            return None
-
-
-    def _load_and_filter_macro_rules(self):
-        """Loads, filters, and standardizes the macro duplication rules file."""
-        if not self.macro_path:
+    def _load_and_filter_macro_rules(self, project_rules=None):
+        """
+        Loads the Formula 1 duplication rules from the compiled macro rule index
+        (macro_rules.py), so the macro workbook is only parsed once per file content.
+        Also keeps the precomputed (Orig Market, Dup Market) -> Dup Channels groupings.
+        project_rules: an already-compiled rule set (e.g. from another validator) to use as-is.
+        """
+        if project_rules is None and not self.macro_path:
             return None
             
         MACRO_SHEET_NAME = "Data Core"
         MACRO_HEADER_INDEX = 1 
         SEARCH_TERM = "Formula 1"
-        REQUIRED_RULE_COLS = ['Orig Market', 'Dup Market', 'Dup Channel', 'Projects'] # Include Projects for filtering
 
         try:
-            df_macro = pd.read_excel(self.macro_path, sheet_name=MACRO_SHEET_NAME, header=MACRO_HEADER_INDEX)
-            df_macro.columns = [str(c).strip() for c in df_macro.columns]
-
-            # 1. Filter by Project (Formula 1)
-            filtered_df = df_macro[
-                df_macro['Projects'].astype(str).str.contains(SEARCH_TERM, case=False, na=False)
-            ].copy()
-            
-            # 2. Select and clean required columns
-            df_dup_rules = filtered_df[REQUIRED_RULE_COLS].copy()
+            if project_rules is None:
+                rule_index = macro_rules.load_macro_rule_index(self.macro_path, MACRO_SHEET_NAME, MACRO_HEADER_INDEX)
+                project_rules = rule_index.project(SEARCH_TERM)
+            self.dup_project_rules = project_rules
+            self.dup_rule_pairs = project_rules.market_pairs
 
-            # Ensure key columns are clean strings (strip, upper case)
-            for col in ['Orig Market', 'Dup Market', 'Dup Channel']:
-                if col in df_dup_rules.columns:
-                    df_dup_rules[col] = df_dup_rules[col].astype(str).str.strip().str.upper()
-                    
+            # Key columns come back stripped and upper-cased
             # We only need 'Orig Market', 'Dup Market', 'Dup Channel' for the validation check
-            return df_dup_rules[['Orig Market', 'Dup Market', 'Dup Channel']].drop_duplicates()
+            return project_rules.keys("upper")[['Orig Market', 'Dup Market', 'Dup Channel']].drop_duplicates()
         
         except Exception as e:
             print(f"Error loading duplication rules from macro file: {e}")
@@ -233,21 +215,24 @@ class BSRValidator:
         
         missing_channels_log = []
         
-        # Group rules by the (Orig Market, Dup Market) pair
-        rules_grouped = df_dup_rules.groupby(['Orig Market', 'Dup Market'])
-        
-        # Apply normalization to the REQUIRED channel name from the rule sheet
-        df_dup_rules['Required_Channel_Norm'] = self.normalize_channel_name(df_dup_rules['Dup Channel'])
+        # Rules grouped by the (Orig Market, Dup Market) pair, precomputed by the macro rule index
+        rules_grouped = self.dup_rule_pairs
         
         rows_flagged = 0
+
+        # Flag codes per row (0 = 'OK'); messages are rendered once per market pair
+        flags = FlagCodes(ok='OK')
+        flag_codes = np.zeros(len(self.df), dtype=np.int32)
+        market_norm = bsr_df_check['Market_Norm'].to_numpy()
         
         # Iterate over each unique (Source Market, Target Market) pair
-        for (orig_market_raw, dup_market_raw), group in rules_grouped:
+        for (orig_market_raw, dup_market_raw), dup_channels in rules_grouped.items():
             
             orig_market = orig_market_raw.upper().strip()
             dup_market = dup_market_raw.upper().strip()
             
-            required_channels_set = set(group['Required_Channel_Norm'].unique())
+            # Apply normalization to the REQUIRED channel name from the rule sheet
+            required_channels_set = set(self.normalize_channel_name(pd.Series(dup_channels)).unique())
             existing_channels = existing_channels_map.get(dup_market, set())
             
             missing_channels = required_channels_set.difference(existing_channels)
@@ -267,19 +252,20 @@ class BSRValidator:
                 
                 # 5. Apply Flag to the BSR
                 # Format the flag message with the comprehensive list
-                missing_list_str = "; ".join(sorted(list(missing_channels)))
-                flag_message = f"Completeness Error: {len(missing_channels)} Channel(s) missing. Required: [{missing_list_str}] (Source: {orig_market_raw})."
+                flag_code = flags.code(
+                    "Completeness Error: {count} Channel(s) missing. Required: [{channels}] (Source: {source}).",
+                    count=len(missing_channels), channels="; ".join(sorted(missing_channels)), source=orig_market_raw,
+                )
                 
                 # Flag ALL rows in the target Dup Market (since the issue is market-wide completeness)
-                flag_mask = (self.df['Market'].astype(str).str.strip().str.upper() == dup_market)
-                
                 # Only flag rows that were not already flagged
-                current_flags = self.df.loc[flag_mask, FLAG_COLUMN]
-                rows_to_flag = flag_mask & (current_flags == 'OK')
+                rows_to_flag = (market_norm == dup_market) & (flag_codes == 0)
                 
-                self.df.loc[rows_to_flag, FLAG_COLUMN] = flag_message
+                flag_codes[rows_to_flag] = flag_code
                 rows_flagged += rows_to_flag.sum()
 
+        self.df[FLAG_COLUMN] = flags.column(flag_codes, self.df.index)
+
 
         final_status = "Completed" if rows_flagged == 0 else "Flagged"
 
@@ -406,8 +392,10 @@ class BSRValidator:
         # Apply standardization to BSR columns
         for col in [COUNTRY_COLUMN, CHANNEL_COLUMN, SESSION_COMPETITION_COLUMN]:
             if col in self.df.columns:
+                decompact_column(self.df, col)
                 self.df.loc[:, col] = self.df[col].astype(str).str.strip().str.upper()
         if DATE_COLUMN in self.df.columns:
+            decompact_column(self.df, DATE_COLUMN)
             self.df.loc[:, DATE_COLUMN] = pd.to_datetime(self.df[DATE_COLUMN], errors='coerce')
             
         # --- 3. AGGREGATE OVERNIGHT DATA (Get max audience per key) ---
@@ -518,7 +506,7 @@ class BSRValidator:
             sheet_name: The name or index of the Excel sheet to read. Defaults to the first sheet (0).
         """
         # Read a sample of the specified sheet
-        df_sample = pd.read_excel(
+        df_sample = excel_reader.read_excel(
             self.bsr_path, 
             sheet_name=sheet_name, 
             header=None, 
@@ -548,7 +536,7 @@ class BSRValidator:
         header_row = self._detect_header_row(sheet_name=sheet_name_to_load)
 
         # Load the full data using the detected header row and sheet name
-        df = pd.read_excel(
+        df = excel_reader.read_excel(
             self.bsr_path, 
             sheet_name=sheet_name_to_load,  # Use the specific sheet name
             header=header_row               # Use the dynamically detected header row
@@ -556,8 +544,14 @@ class BSRValidator:
         
         # Ensure column names are clean
         df.columns = [str(c).strip() for c in df.columns]
+        if self.compact:
+            df = compact_frame(df)
         return df
 
+    def _broadcast_times(self, date_col='Date (UTC/GMT)', start_col='Start (UTC)', end_col='End (UTC)'):
+        """Date_DT / Start_DT / End_DT / Times_Valid for the current self.df (rollover applied)."""
+        return self.times.get(self.df, date_col, start_col, end_col)
+
     # --- Public Methods to Run Full QC Pipeline ---
 
     def run_full_qc(self, df_data=None):
@@ -584,10 +578,17 @@ class BSRValidator:
     # --- Core Processing Method (FIXED) ---
     # --- Core Processing Method ---
     def market_check_processor(self, checks: List[str]) -> List[Dict[str, Any]]:
-        # ... (Method contents remain unchanged - assumed correct)
         status_summaries = [] 
+        # Consecutive removal checks are collected and applied with one combined filter
+        pending_removals = []
         
         for check_key in checks:
+            if check_key in self.removal_checks:
+                pending_removals.append(self.removal_checks[check_key])
+                continue
+            status_summaries.extend(self._apply_removals(pending_removals))
+            pending_removals = []
+
             if check_key in self.market_check_map:
                 try:
                     result = self.market_check_map[check_key]()
@@ -595,113 +596,129 @@ class BSRValidator:
                         status_summaries.append(result)
                     print(f"Applied custom check: {check_key}")
                 except Exception as e:
-                    status_summaries.append({
-                        "check_key": check_key,
-                        "status": "Failed",
-                        "action": "Error during execution",
-                        "description": f"Check failed due to internal error: {str(e)}",
-                        "details": {"error": str(e)}
-                    })
-                    print(f"Error applying check {check_key}: {e}")
+                    status_summaries.append(self._failed_check(check_key, e))
             else:
                 print(f"Warning: Unknown check key received: {check_key}")
-                
+
+        status_summaries.extend(self._apply_removals(pending_removals))
         return status_summaries
 
+    def _failed_check(self, check_key: str, e: Exception) -> Dict[str, Any]:
+        print(f"Error applying check {check_key}: {e}")
+        return {
+            "check_key": check_key,
+            "status": "Failed",
+            "action": "Error during execution",
+            "description": f"Check failed due to internal error: {str(e)}",
+            "details": {"error": str(e)}
+        }
+
+    def _apply_removals(self, removals: List[RowRemoval]) -> List[Dict[str, Any]]:
+        """Runs a batch of removal checks on self.df (one filter) and returns their status dicts in order."""
+        if not removals:
+            return []
+        self.df, outcomes = apply_removals(self.df, removals)
+        summaries = []
+        for check_key, outcome in outcomes:
+            if isinstance(outcome, Exception):
+                summaries.append(self._failed_check(check_key, outcome))
+            else:
+                summaries.append(outcome)
+                print(f"Applied custom check: {check_key}")
+        return summaries
+
     # --- 🌍 Implemented Market Checks (CRITICALLY FIXED) ---
     
-    def _remove_country(self, country_name: str) -> Dict[str, Any]:
-        """Removes all rows matching a specific Country/Territory name and returns a status dict."""
-        initial_rows = len(self.df)
-        
-        # Logic to filter rows (Keep all rows NOT matching the country name)
-        self.df = self.df[self.df.get('Market', self.df.get('Country', '')).astype(str).str.lower() != country_name.lower()]
-        
-        rows_removed = initial_rows - len(self.df)
-        
-        print(f"Removed {rows_removed} rows for country {country_name}")
-        
-        # 💡 FIX: Explicit casting to int() to resolve 'int64 is not JSON serializable'
-        return {
-            "check_key": f"remove_{country_name.lower().replace(' ', '_')}",
-            "status": "Completed",
-            "action": "Row Removal",
-            "description": f"Removed all data rows associated with the market: {country_name}.",
-            "details": {
-                "market_affected": country_name,
-                "rows_processed": int(initial_rows), 
-                "rows_removed": int(rows_removed),  
+    # Row removals: each returns a RowRemoval (predicate over lower-cased columns + status dict)
+
+    def _country_removal(self, country_name: str) -> RowRemoval:
+        """Removes all rows matching a specific Country/Territory name."""
+        def summary(rows_processed, rows_removed):
+            print(f"Removed {rows_removed} rows for country {country_name}")
+            return {
+                "check_key": f"remove_{country_name.lower().replace(' ', '_')}",
+                "status": "Completed",
+                "action": "Row Removal",
+                "description": f"Removed all data rows associated with the market: {country_name}.",
+                "details": {
+                    "market_affected": country_name,
+                    "rows_processed": int(rows_processed), 
+                    "rows_removed": int(rows_removed),  
+                }
             }
-        }
 
-    def _remove_brazil_espn_fox(self) -> Dict[str, Any]:
-        """Removes rows for Brazil where Broadcaster is ESPN or FOX and returns a status dict."""
-        initial_rows = len(self.df)
-        
-        mask_to_remove = (
-            (self.df.get('Market', '').astype(str).str.lower() == 'brazil') & 
-            (self.df.get('Broadcaster', '').astype(str).str.lower().str.contains('espn|fox', na=False))
+        return RowRemoval(
+            f"remove_{country_name.lower().replace(' ', '_')}",
+            lambda text: text('Market', 'Country') == country_name.lower(),
+            summary,
+            reset_index=False,
         )
-        
-        rows_removed = mask_to_remove.sum()
-        self.df = self.df[~mask_to_remove].reset_index(drop=True)
-        
-        # 💡 FIX: Explicit casting to int()
-        return {
-            "check_key": "remove_brazil_espn_fox",
-            "status": "Completed",
-            "action": "Row Removal (Conditional)",
-            "description": "Removed rows in Brazil associated with ESPN or FOX broadcasters.",
-            "details": {
-                "markets_context": "Brazil",
-                "broadcasters": "ESPN, FOX",
-                "rows_processed": int(initial_rows), 
-                "rows_removed": int(rows_removed),   
+
+    def _brazil_espn_fox_removal(self) -> RowRemoval:
+        """Removes rows for Brazil where Broadcaster is ESPN or FOX."""
+        def summary(rows_processed, rows_removed):
+            return {
+                "check_key": "remove_brazil_espn_fox",
+                "status": "Completed",
+                "action": "Row Removal (Conditional)",
+                "description": "Removed rows in Brazil associated with ESPN or FOX broadcasters.",
+                "details": {
+                    "markets_context": "Brazil",
+                    "broadcasters": "ESPN, FOX",
+                    "rows_processed": int(rows_processed), 
+                    "rows_removed": int(rows_removed),   
+                }
             }
-        }
+
+        return RowRemoval(
+            "remove_brazil_espn_fox",
+            lambda text: (text('Market') == 'brazil').to_numpy() & text.contains('Broadcaster', 'espn|fox'),
+            summary,
+        )
     
-    def _remove_switz_canal(self) -> Dict[str, Any]:
+    def _switz_canal_removal(self) -> RowRemoval:
         """Removes rows for Switzerland where TV-Channel contains Canal+ or ServusTV."""
-        initial_rows = len(self.df)
-        mask_to_remove = ((self.df.get('Market', '').astype(str).str.lower() == 'switzerland') & 
-                            (self.df.get('TV-Channel', '').astype(str).str.contains(r'Canal\+|ServusTV', case=False, na=False)))
-        rows_removed = mask_to_remove.sum()
-        self.df = self.df[~mask_to_remove].reset_index(drop=True)
-        
-        # 💡 FIX: Explicit casting to int()
-        return {
-            "check_key": "remove_switz_canal", 
-            "status": "Completed", 
-            "action": "Conditional Removal", 
-            "description": "Switzerland/Canal+ and ServusTV removal applied.", 
-            "details": {
-                "markets_context": "Switzerland",
-                "rows_processed": int(initial_rows), 
-                "rows_removed": int(rows_removed)
+        def summary(rows_processed, rows_removed):
+            return {
+                "check_key": "remove_switz_canal", 
+                "status": "Completed", 
+                "action": "Conditional Removal", 
+                "description": "Switzerland/Canal+ and ServusTV removal applied.", 
+                "details": {
+                    "markets_context": "Switzerland",
+                    "rows_processed": int(rows_processed), 
+                    "rows_removed": int(rows_removed)
+                }
             }
-        }
+
+        return RowRemoval(
+            "remove_switz_canal",
+            lambda text: (text('Market') == 'switzerland').to_numpy() & text.contains('TV-Channel', r'canal\+|servustv'),
+            summary,
+        )
         
-    def _remove_viaplay_baltics(self) -> Dict[str, Any]:
+    def _viaplay_baltics_removal(self) -> RowRemoval:
         """Removes Viaplay Group rows from Baltics/Poland."""
-        initial_rows = len(self.df)
         countries = ['latvia', 'lithuania', 'poland', 'estonia']
-        mask_to_remove = ((self.df.get('Broadcaster', '').astype(str).str.lower() == 'viaplay group') & 
-                            (self.df.get('Market', '').astype(str).str.lower().isin(countries)))
-        rows_removed = mask_to_remove.sum()
-        self.df = self.df[~mask_to_remove].reset_index(drop=True)
-        
-        # 💡 FIX: Explicit casting to int()
-        return {
-            "check_key": "remove_viaplay_baltics", 
-            "status": "Completed", 
-            "action": "Conditional Removal", 
-            "description": "Viaplay Group removal applied to Latvia, Lithuania, Poland, and Estonia.", 
-            "details": {
-                "markets_context": ", ".join(countries),
-                "rows_processed": int(initial_rows), 
-                "rows_removed": int(rows_removed)
+
+        def summary(rows_processed, rows_removed):
+            return {
+                "check_key": "remove_viaplay_baltics", 
+                "status": "Completed", 
+                "action": "Conditional Removal", 
+                "description": "Viaplay Group removal applied to Latvia, Lithuania, Poland, and Estonia.", 
+                "details": {
+                    "markets_context": ", ".join(countries),
+                    "rows_processed": int(rows_processed), 
+                    "rows_removed": int(rows_removed)
+                }
             }
-        }
+
+        return RowRemoval(
+            "remove_viaplay_baltics",
+            lambda text: (text('Broadcaster') == 'viaplay group') & text('Market').isin(countries),
+            summary,
+        )
 
     def _check_italy_mexico_dupes(self) -> Dict[str, Any]:
         """
@@ -733,9 +750,8 @@ class BSRValidator:
                 
         # CRITICAL CLEANING: Standardize for comparison consistency
         for col in df_for_check.columns:
-            # 1. Handle Categorical Dtypes to prevent 'not ordered' TypeError during internal sort
-            if isinstance(df_for_check[col].dtype, CategoricalDtype):
-                df_for_check[col] = df_for_check[col].astype('object')
+            # 1. Handle Categorical / Arrow string Dtypes (compact mode) so they get the object cleaning below
+            decompact_column(df_for_check, col)
             
             # 2. Aggressive string cleaning for object types
             if is_object_dtype(df_for_check[col]):
@@ -1427,34 +1443,29 @@ class BSRValidator:
             return {"check_key": "duration_limits", "status": "Skipped", "action": "Duration Check", "description": f"Skipped: Missing required '{DURATION_COL}' column.", "details": {"rows_processed": int(initial_rows), "rows_flagged": 0}}
 
         try:
-            # --- CRITICAL FIX ---
-            # 1. Convert the Duration column to string to handle datetime.time objects safely.
-            # This resolves the 'Invalid type for timedelta scalar' error.
-            duration_series_str = self.df[DURATION_COL].astype(str)
-            
-            # 2. Convert the cleaned string series into timedelta objects
-            duration_timedelta = pd.to_timedelta(duration_series_str, errors='coerce')
-            
-            # 3. Convert timedelta to total minutes for comparison
-            duration_minutes = duration_timedelta.dt.total_seconds() / 60
+            # 1. Duration in minutes (HH:MM:SS text, datetime.time, timedelta or plain minutes)
+            minutes = duration_minutes(self.df[DURATION_COL])
             
-            # 4. Define the masks for invalid durations
+            # 2. Define the masks for invalid durations
             
             # Flag 1: Too short
-            too_short_mask = duration_minutes < MIN_DURATION_MINUTES
+            too_short_mask = minutes < MIN_DURATION_MINUTES
             
             # Flag 2: Too long
-            too_long_mask = duration_minutes > MAX_DURATION_MINUTES
+            too_long_mask = minutes > MAX_DURATION_MINUTES
             
             # Flag 3: Invalid/Missing/Parsing Error
-            invalid_mask = duration_minutes.isna()
+            invalid_mask = minutes.isna()
             
             combined_flag_mask = too_short_mask | too_long_mask | invalid_mask
             
-            # 5. Apply the flags
-            self.df.loc[too_short_mask, FLAG_COLUMN] = f"Duration < {MIN_DURATION_MINUTES} min"
-            self.df.loc[too_long_mask, FLAG_COLUMN] = f"Duration > {MAX_DURATION_MINUTES} min (5 hrs)"
-            self.df.loc[invalid_mask, FLAG_COLUMN] = "Invalid/Missing Duration Format"
+            # 3. Apply the flags (flag codes; later masks take precedence)
+            flags = FlagCodes(ok='OK')
+            codes = np.zeros(len(self.df), dtype=np.int8)
+            codes[too_short_mask.to_numpy()] = flags.code("Duration < {limit} min", limit=MIN_DURATION_MINUTES)
+            codes[too_long_mask.to_numpy()] = flags.code("Duration > {limit} min (5 hrs)", limit=MAX_DURATION_MINUTES)
+            codes[invalid_mask.to_numpy()] = flags.code("Invalid/Missing Duration Format")
+            self.df[FLAG_COLUMN] = flags.column(codes, self.df.index)
 
             rows_flagged = combined_flag_mask.sum()
 
@@ -1526,10 +1537,10 @@ class BSRValidator:
         # Prepare BSR data for checking (copying the relevant columns)
         df_check = self.df.copy()
         live_mask = df_check['Type of program'].astype(str).str.lower() == 'live'
-        df_check['BSR_Date_Clean'] = pd.to_datetime(df_check['Date (UTC/GMT)'], errors='coerce', format='mixed').dt.date
+        df_check['BSR_Date_Clean'] = self._broadcast_times()['Date_DT'].dt.date
         
         # FIX 1: Safely map Competition column
-        competition_series = df_check['Competition'].fillna('').astype(str)
+        competition_series = df_check['Competition'].astype(object).fillna('').astype(str)
         # This creates the map: Practice 1/2/3 -> Training; Qualifying -> Qualifying; Race -> Race
         df_check['Competition_Map'] = competition_series.str.replace(r'Practice \d', 'Training', regex=True).str.strip()
 
@@ -1605,12 +1616,10 @@ class BSRValidator:
             bsr_series = self.df.copy()
             bsr_series['Program Title'] = bsr_series['Program Title'].astype(str).str.strip().str.lower()
             
-            # Safely combine date and time 
-            df_start_time_str = self._get_time_string(self.df['Start (UTC)'])
-            df_end_time_str = self._get_time_string(self.df['End (UTC)'])
-            
-            bsr_series['bsr_start_dt'] = pd.to_datetime(self.df['Date (UTC/GMT)'].astype(str) + ' ' + df_start_time_str, errors='coerce')
-            bsr_series['bsr_end_dt'] = pd.to_datetime(self.df['Date (UTC/GMT)'].astype(str) + ' ' + df_end_time_str, errors='coerce')
+            # Shared date + time stamps (End rolls over midnight)
+            times = self._broadcast_times()
+            bsr_series['bsr_start_dt'] = times['Start_DT']
+            bsr_series['bsr_end_dt'] = times['End_DT']
             
             bsr_series['duration_minutes'] = (bsr_series['bsr_end_dt'] - bsr_series['bsr_start_dt']) / timedelta(minutes=1)
             
@@ -1796,6 +1805,8 @@ class BSRValidator:
         
         # 2. Convert the 'Central & South America' variant rows to the canonical name
         # We must operate on the original DataFrame to save the change
+        # (a compacted Region column may not have the canonical name among its categories)
+        decompact_column(self.df, 'Region')
         self.df.loc[latam_mask_full, 'Region'] = CANONICAL_REGION_NAME
         
         # --- STEP 2: Core QC Logic (Now uses clean, single Regional name) ---
@@ -1875,7 +1886,9 @@ class BSRValidator:
             self.df = df
             return self.df
         df["Completeness_OK"] = df[matched_cols].notna().all(axis=1)
-        df["Completeness_Remark"] = df["Completeness_OK"].apply(lambda x: "" if x else "Missing key fields")
+        flags = FlagCodes(ok="")
+        codes = np.where(df["Completeness_OK"].to_numpy(), 0, flags.code("Missing key fields"))
+        df["Completeness_Remark"] = flags.column(codes, df.index)
         self.df = df
         return self.df
 
@@ -1943,19 +1956,6 @@ class BSRValidator:
             self.df = df
             return self.df
 
-        def parse_duration(val):
-            if pd.isna(val):
-                return None
-            val_str = str(val).strip()
-            try:
-                if ":" in val_str:
-                    t = pd.to_datetime(val_str, errors="coerce").time()
-                    return t.hour * 60 + t.minute
-                else:
-                    return float(val_str)
-            except Exception:
-                return None
-
         def expected_category(duration_min):
             if duration_min is None:
                 return "unknown"
@@ -1971,9 +1971,11 @@ class BSRValidator:
                 return "unknown"
 
         results, remarks = [], []
-        for _, row in df.iterrows():
+        durations = duration_minutes(df[dur_col])
+        durations = durations.astype(object).where(durations.notna(), None)
+
+        for (_, row), dur_min in zip(df.iterrows(), durations):
             prog_val = str(row[prog_col]).strip().lower()
-            dur_min = parse_duration(row[dur_col])
             expected = expected_category(dur_min)
             ok = expected in prog_val or prog_val in expected
             results.append(ok)
@@ -2016,19 +2018,12 @@ class BSRValidator:
         df[start_col] = df[start_col].astype(str).str.strip()
         df[end_col] = df[end_col].astype(str).str.strip()
 
-        # --- Helper: parse HH:MM:SS to minutes ---
-        def parse_hms_to_minutes(val):
-            if not val or val in ["None", "nan", "NaT"]:
-                return None
-            try:
-                parts = val.split(":")
-                if len(parts) >= 2:
-                    h, m = int(parts[0]), int(parts[1])
-                    s = int(parts[2]) if len(parts) == 3 else 0
-                    return h * 60 + m + s / 60
-            except Exception as e:
-                print(f"[WARN] Could not parse time '{val}': {e}")
-            return None
+        # --- Start/End clock times to minutes (negative spans cross midnight) ---
+        start_min = duration_minutes(df[start_col], clock_only=True)
+        end_min = duration_minutes(df[end_col], clock_only=True)
+        span_min = end_min - start_min
+        span_min = span_min.where(span_min >= 0, span_min + 24 * 60)
+        durations = span_min.astype(object).where(span_min.notna(), None)
 
         # --- Helper: classify by duration ---
         def expected_category(duration_min):
@@ -2048,21 +2043,11 @@ class BSRValidator:
         expected_list = []
         ok_list = []
 
-        for idx, row in df.iterrows():
+        for (idx, row), duration_min in zip(df.iterrows(), durations):
             start_val = row[start_col]
             end_val = row[end_col]
             actual_prog = str(row[type_col]).strip().lower() if pd.notna(row[type_col]) else "unknown"
 
-            start_min = parse_hms_to_minutes(start_val)
-            end_min = parse_hms_to_minutes(end_val)
-
-            if start_min is None or end_min is None:
-                duration_min = None
-            else:
-                duration_min = end_min - start_min
-                if duration_min < 0:
-                    duration_min += 24 * 60  # Handle midnight crossover
-
             expected = expected_category(duration_min)
             ok = expected in actual_prog or actual_prog in expected
 
@@ -2274,16 +2259,6 @@ class BSRValidator:
                 return ""
             return str(x).strip()
 
-        def parse_duration_to_minutes(val):
-            try:
-                parts = str(val).split(":")
-                if len(parts) < 2:
-                    return None
-                h, m, s = int(parts[0]), int(parts[1]), int(parts[2]) if len(parts) == 3 else 0
-                return h * 60 + m + s / 60
-            except Exception:
-                return None
-
         reference_markets = set()
         reference_channels = set()
         if reference_df is not None:
@@ -2292,11 +2267,15 @@ class BSRValidator:
             if "TV-Channel" in reference_df.columns:
                 reference_channels.update(reference_df["TV-Channel"].dropna().astype(str).str.strip().unique())
 
-        for idx, row in df_out.iterrows():
+        if "Duration" in df_out.columns:
+            durations = duration_minutes(df_out["Duration"], clock_only=True)
+        else:
+            durations = pd.Series(np.nan, index=df_out.index)
+
+        for (idx, row), duration_min in zip(df_out.iterrows(), durations):
             market = norm(row.get("Market", ""))
             channel = norm(row.get("TV-Channel", ""))
             program = norm(row.get("Program Title", "")) or norm(row.get("Combined", ""))
-            duration_min = parse_duration_to_minutes(row.get("Duration", ""))
 
             remarks = []
             ok1 = True
@@ -2320,7 +2299,7 @@ class BSRValidator:
                 ok2 = False
                 remarks.append("Missing Program Title")
 
-            if duration_min is None:
+            if pd.isna(duration_min):
                 ok2 = False
                 remarks.append("Invalid Duration")
 
@@ -2423,17 +2402,7 @@ class BSRValidator:
                 self.df = df
                 return self.df
 
-        def duration_to_hours(d):
-            try:
-                if pd.isna(d):
-                    return 0
-                parts = str(d).split(":")
-                h, m, s = (int(parts[i]) if i < len(parts) else 0 for i in range(3))
-                return h + m/60 + s/3600
-            except:
-                return 0
-
-        df["Duration_Hours"] = df["Duration"].apply(duration_to_hours)
+        df["Duration_Hours"] = duration_minutes(df["Duration"]).fillna(0) / 60
         df["Duplicated_Market_Check_OK"] = True
         df["Duplicated_Market_Check"] = "Not Applicable"
 
@@ -2468,83 +2437,43 @@ class BSRValidator:
 
     def country_channel_id_check(self):
         # ... (Contents of old country_channel_id_check, replacing 'df' with 'self.df') ...
-        df = self.df
-        df_result = df.copy()
-        df_result["Market_Channel_ID_OK"] = True
-        df_result["Market_Channel_ID_Remark"] = ""
+        df_result = self.df
 
-        def norm(x):
-            return str(x).strip() if pd.notna(x) else ""
+        def text(col):
+            if col not in df_result.columns:
+                return pd.Series("", index=df_result.index, dtype=object)
+            return _stripped_text(df_result[col])
 
-        # Maps to track consistency
-        channel_id_map = {}
-        market_id_map = {}
+        channel, channel_id = text("TV-Channel"), text("Channel ID")
+        market, market_id = text("Market"), text("Market ID")
 
-        for idx, row in df_result.iterrows():
-            channel = norm(row.get("TV-Channel"))
-            channel_id = norm(row.get("Channel ID"))
-            market = norm(row.get("Market"))
-            market_id = norm(row.get("Market ID"))
+        # ✅ Check 1 – Same channel shouldn't have multiple Channel IDs (the first one seen is the reference)
+        channel_first_id = channel_id.groupby(channel, sort=False).transform("first")
+        channel_conflict = (channel != "") & (channel_id != channel_first_id)
 
-            remarks = []
-            ok = True
+        # ✅ Check 2 – Same market shouldn't have multiple Market IDs
+        market_first_id = market_id.groupby(market, sort=False).transform("first")
+        market_conflict = (market != "") & (market_id != market_first_id)
 
-            # ✅ Check 1 – Same channel shouldn't have multiple Channel IDs
-            if channel:
-                if channel in channel_id_map and channel_id_map[channel] != channel_id:
-                    remarks.append(
-                        f"Channel '{channel}' has multiple IDs ({channel_id_map[channel]} vs {channel_id})"
-                    )
-                    ok = False
-                else:
-                    channel_id_map[channel] = channel_id
-
-            # ✅ Check 2 – Same market shouldn't have multiple Market IDs
-            if market:
-                if market in market_id_map and market_id_map[market] != market_id:
-                    remarks.append(
-                        f"Market '{market}' has multiple IDs ({market_id_map[market]} vs {market_id})"
-                    )
-                    ok = False
-                else:
-                    market_id_map[market] = market_id
-
-            # ✅ Check 3 – Same Channel ID shouldn't be used for multiple channels
-            # Note: This check relies on the channel_id_map state after the whole iteration, 
-            # but is conventionally done per-row for immediate feedback/marking.
-            # We'll stick to the original per-row logic where possible, but this one is weak.
-            # Better check 3 (in loop): if current ID exists, verify if associated channel is different.
-            
-            # Reverting to simple in-loop check 3/4 from original (though they are weak without post-analysis)
-            # The full checks need to be rerun after the loop, but for consistency with original code:
-            pass # Skipping original weak per-row multi-ID checks
-
-            # ✅ Write results
-            df_result.at[idx, "Market_Channel_ID_OK"] = ok
-            df_result.at[idx, "Market_Channel_ID_Remark"] = "; ".join(remarks) if remarks else "OK"
-        
-        # Post-analysis check (stronger, only affects remarks/OK if inconsistency found)
-        # Check 3: Same Channel ID shouldn't be used for multiple channels
-        channel_id_to_channels = df_result.groupby("Channel ID")["TV-Channel"].nunique()
-        bad_cids = channel_id_to_channels[channel_id_to_channels > 1].index.tolist()
-        
-        if bad_cids:
-            mask = df_result["Channel ID"].isin(bad_cids)
-            df_result.loc[mask, "Market_Channel_ID_OK"] = False
-            df_result.loc[mask, "Market_Channel_ID_Remark"] += (
-                "; Channel ID assigned to multiple channels"
-            )
-        
-        # Check 4: Same Market ID shouldn't be used for multiple markets
-        market_id_to_markets = df_result.groupby("Market ID")["Market"].nunique()
-        bad_mids = market_id_to_markets[market_id_to_markets > 1].index.tolist()
-        
-        if bad_mids:
-            mask = df_result["Market ID"].isin(bad_mids)
-            df_result.loc[mask, "Market_Channel_ID_OK"] = False
-            df_result.loc[mask, "Market_Channel_ID_Remark"] += (
-                "; Market ID assigned to multiple markets"
-            )
+        # ✅ Check 3 – Same Channel ID shouldn't be used for multiple channels
+        shared_channel_id = (df_result.groupby("Channel ID")["TV-Channel"].transform("nunique") > 1).to_numpy()
+
+        # ✅ Check 4 – Same Market ID shouldn't be used for multiple markets
+        shared_market_id = (df_result.groupby("Market ID")["Market"].transform("nunique") > 1).to_numpy()
+
+        # ✅ Write results (ID reuse is appended to the per-channel/market remark)
+        remark = _join_remarks([
+            np.where(channel_conflict,
+                     "Channel '" + channel + "' has multiple IDs (" + channel_first_id + " vs " + channel_id + ")", ""),
+            np.where(market_conflict,
+                     "Market '" + market + "' has multiple IDs (" + market_first_id + " vs " + market_id + ")", ""),
+        ])
+        remark = remark + np.where(shared_channel_id, "; Channel ID assigned to multiple channels", "")
+        remark = remark + np.where(shared_market_id, "; Market ID assigned to multiple markets", "")
+
+        df_result["Market_Channel_ID_OK"] = ~(channel_conflict.to_numpy() | market_conflict.to_numpy()
+                                              | shared_channel_id | shared_market_id)
+        df_result["Market_Channel_ID_Remark"] = remark
         
         self.df = df_result
         return self.df
@@ -2625,12 +2554,8 @@ def color_excel(output_path, df):
     wb.save(output_path)
 
 
-def generate_summary_sheet(output_path, df):
-    """Generates a summary sheet with pass/fail counts for QC checks."""
-    wb = load_workbook(output_path)
-    if "Summary" in wb.sheetnames: del wb["Summary"]
-    ws = wb.create_sheet("Summary")
-
+def qc_summary(df):
+    """Pass/fail counts of every QC result column, as written to the Summary sheet."""
     qc_columns = [col for col in df.columns if "_OK" in col]
     summary_data = []
     for col in qc_columns:
@@ -2638,10 +2563,27 @@ def generate_summary_sheet(output_path, df):
         passed = df[col].sum() if df[col].dtype==bool else sum(df[col]=="True")
         summary_data.append([col, total, passed, total - passed])
 
-    summary_df = pd.DataFrame(summary_data, columns=["Check", "Total", "Passed", "Failed"])
+    return pd.DataFrame(summary_data, columns=["Check", "Total", "Passed", "Failed"])
+
+
+def generate_summary_sheet(output_path, df):
+    """Generates a summary sheet with pass/fail counts for QC checks."""
+    wb = load_workbook(output_path)
+    if "Summary" in wb.sheetnames: del wb["Summary"]
+    ws = wb.create_sheet("Summary")
+
+    summary_df = qc_summary(df)
     for r in dataframe_to_rows(summary_df, index=False, header=True):
         ws.append(r)
     wb.save(output_path)
 
+
+def write_qc_report(output_path, df, sheet_name="Sheet1"):
+    """
+    Writes the QC results, their green/red highlighting and the Summary sheet
+    in a single pass (replaces to_excel + color_excel + generate_summary_sheet).
+    """
+    return report_writer.write_report(output_path, df, sheet_name=sheet_name, summary=qc_summary(df))
+
 # You will need to remove the old qc_checks.py file and rename this to qc_checks.py 
 # or update api.py to import BSRValidator from qc_processor.py.
@@ -5,7 +5,6 @@ import pandas as pd
 import os
 import time
 import threading
-import shutil # Used for efficient file saving
 from typing import Optional, List # Added List for checks
 from C_data_processing import DataExplorer
 from io import BytesIO # Needed to save Excel in memory before returning
@@ -33,8 +32,7 @@ from qc_checks import (
     duplicated_markets_check,
     country_channel_id_check,
     client_lstv_ott_check,
-    color_excel,
-    generate_summary_sheet,
+    write_qc_report,
     # market_specific_check_processor,
 )
 
@@ -51,6 +49,13 @@ from C_data_processing_EPL import EPLValidator
 # --- NEW QC IMPORTS (YOURS - ADDED) ---
 # We import your file with an alias 'qc_general' to prevent name conflicts
 import qc_checks_1 as qc_general
+from workbook_cache import WorkbookCache
+from column_schema import REQUIRED_BSR_FIELDS, SchemaError, log_unresolved, resolve_schema
+from job_queue import JobStore, JobQueue, SUCCEEDED
+from check_graph import Check, run_checks
+from upload_store import UploadStore
+import report_writer
+import check_graph
 
 # -------------------- ⚙️ Folder setup (UNTOUCHED) --------------------
 BASE_DIR = os.getcwd()
@@ -59,6 +64,20 @@ OUTPUT_FOLDER = os.path.join(BASE_DIR, "outputs")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
+# Uploads are streamed into a content-addressed store (uploads/store/<sha256><ext>),
+# so same-named uploads never overwrite each other and identical files share one path
+upload_store = UploadStore(os.path.join(UPLOAD_FOLDER, "store"))
+
+# -------------------- ⏳ Background Job Setup --------------------
+# Uploads of queued jobs stay pinned in the upload store until the job ends;
+# results are kept in JOB_RESULT_FOLDER for JOB_RETENTION_HOURS and survive restarts.
+JOB_RESULT_FOLDER = os.path.join(BASE_DIR, "job_results")
+JOB_RETENTION_HOURS = 24
+os.makedirs(JOB_RESULT_FOLDER, exist_ok=True)
+
+job_store = JobStore(os.environ.get("QC_JOB_DB", os.path.join(BASE_DIR, "qc_jobs.db")))
+job_queue = JobQueue(job_store)
+
 # -------------------- 🧹 Cleanup Functions (UNTOUCHED) --------------------
 def cleanup_old_files(folder_path, max_age_minutes=30):
     """Deletes files older than max_age_minutes."""
@@ -81,7 +100,9 @@ def start_background_cleanup():
     def run_cleanup():
         while True:
             cleanup_old_files(UPLOAD_FOLDER, max_age_minutes=30)
+            upload_store.cleanup(max_age_minutes=30)
             cleanup_old_files(OUTPUT_FOLDER, max_age_minutes=30)
+            job_store.purge(max_age_hours=JOB_RETENTION_HOURS)
             time.sleep(300)
 
     thread = threading.Thread(target=run_cleanup, daemon=True)
@@ -106,6 +127,8 @@ async def lifespan(app: FastAPI):
     yield
     # Cleanup state
     del app.state.df
+    job_queue.shutdown(wait=False)
+    check_graph.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -128,11 +151,10 @@ async def upload_csv(file: UploadFile = File(...)):
     """
     Handles CSV file upload from the frontend and saves it to the data directory.
     """
-    file_location = os.path.join(UPLOAD_FOLDER, file.filename) 
+    file_location = None
     
     try:
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        file_location = upload_store.save_upload(file)
             
         app.state.df = pd.read_csv(file_location, index_col=0, parse_dates=True)
 
@@ -140,6 +162,7 @@ async def upload_csv(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred during file upload: {e}")
     finally:
+        upload_store.release(file_location)
         await file.close() # This endpoint can remain async, it's fine
 
 # -------------------- 📂 End Points Using DataExplorer Class (UNTOUCHED) --------------------
@@ -167,6 +190,38 @@ async def read_sales(limit: int = Query(100, gt=0, lt=150000)):
 
 # -------------------- 🚀 QC API Endpoint (MODIFIED FOR CONCURRENCY) --------------------
 
+def _no_progress(fraction, message=None):
+    """Progress callback for pipelines run inside a request."""
+    pass
+
+def _run_qc_pipeline(progress, rosco_path, bsr_path, data_path, output_path):
+    """Full QC pipeline (qc_checks.py). Shared by /api/run_qc and its background job."""
+    df_data = pd.read_excel(data_path) if data_path else None
+
+    progress(0.05, "Loading Rosco and BSR")
+    start_date, end_date = detect_period_from_rosco(rosco_path)
+    df = load_bsr(bsr_path) 
+
+    progress(0.2, "Running QC checks")
+    df = period_check(df, start_date, end_date)
+    df = completeness_check(df)
+    df = overlap_duplicate_daybreak_check(df)
+    df = program_category_check(df)
+    df = duration_check(df)
+    progress(0.5, "Running reference checks")
+    df = check_event_matchday_competition(df, df_data=df_data, rosco_path=rosco_path)
+    df = market_channel_program_duration_check(df, reference_df=df_data)
+    df = domestic_market_coverage_check(df, reference_df=df_data)
+    df = rates_and_ratings_check(df)
+    df = duplicated_markets_check(df)
+    df = country_channel_id_check(df)
+    df = client_lstv_ott_check(df)
+
+    progress(0.85, "Writing report")
+    # Data, highlighting and Summary sheet in one pass
+    write_qc_report(output_path, df)
+    return {"result_path": output_path}
+
 @app.post("/api/run_qc")
 def run_qc_checks(  # <-- CHANGED from async def to def
     rosco_file: UploadFile = File(..., description="The Rosco file (.xlsx)"),
@@ -178,51 +233,21 @@ def run_qc_checks(  # <-- CHANGED from async def to def
     and returns the processed Excel file.
     """
     
-    # Define paths for uploaded files
-    rosco_path = os.path.join(UPLOAD_FOLDER, rosco_file.filename)
-    bsr_path = os.path.join(UPLOAD_FOLDER, bsr_file.filename)
-    data_path = None
+    rosco_path, bsr_path, data_path = None, None, None
 
     try:
-        # 1. Save uploaded files to disk (for path-based QC functions)
-        with open(rosco_path, "wb") as buffer:
-            shutil.copyfileobj(rosco_file.file, buffer) # <-- Sync file save
-        with open(bsr_path, "wb") as buffer:
-            shutil.copyfileobj(bsr_file.file, buffer) # <-- Sync file save
-        
-        df_data = None
-        if data_file and data_file.filename:
-            data_path = os.path.join(UPLOAD_FOLDER, data_file.filename)
-            with open(data_path, "wb") as buffer:
-                shutil.copyfileobj(data_file.file, buffer) # <-- Sync file save
-            df_data = pd.read_excel(data_path) 
-
-        # 2. Run QC Pipeline (This is all blocking, now runs in a thread)
-        start_date, end_date = detect_period_from_rosco(rosco_path)
-        df = load_bsr(bsr_path) 
-
-        df = period_check(df, start_date, end_date)
-        df = completeness_check(df)
-        df = overlap_duplicate_daybreak_check(df)
-        df = program_category_check(df)
-        df = duration_check(df)
-        df = check_event_matchday_competition(df, df_data=df_data, rosco_path=rosco_path)
-        df = market_channel_program_duration_check(df, reference_df=df_data)
-        df = domestic_market_coverage_check(df, reference_df=df_data)
-        df = rates_and_ratings_check(df)
-        df = duplicated_markets_check(df)
-        df = country_channel_id_check(df)
-        df = client_lstv_ott_check(df)
-
-        # 3. Generate Output File on Disk (in OUTPUT_FOLDER)
+        # 1. Stream uploaded files into the upload store (for path-based QC functions)
+        rosco_path = upload_store.save_upload(rosco_file)
+        bsr_path = upload_store.save_upload(bsr_file)
+        data_path = upload_store.save_upload(data_file)
+
+        # 2. Run QC Pipeline and generate the output file (in OUTPUT_FOLDER)
+        # (This is all blocking, now runs in a thread)
         output_file = f"QC_Result_{os.path.splitext(bsr_file.filename)[0]}.xlsx"
         output_path = os.path.join(OUTPUT_FOLDER, output_file)
+        _run_qc_pipeline(_no_progress, rosco_path, bsr_path, data_path, output_path)
 
-        df.to_excel(output_path, index=False)
-        color_excel(output_path, df)
-        generate_summary_sheet(output_path, df)
-
-        # 4. Return FileResponse
+        # 3. Return FileResponse
         return FileResponse(
             path=output_path,
             filename=output_file,
@@ -231,14 +256,10 @@ def run_qc_checks(  # <-- CHANGED from async def to def
 
     except Exception as e:
         print(f"QC Error: {e}")
-        for path in [rosco_path, bsr_path, data_path]:
-            if path and os.path.exists(path):
-                os.remove(path)
-                
         raise HTTPException(status_code=500, detail=f"An error occurred during QC processing: {str(e)}")
     finally:
-        # Removed all 'await file.close()' calls
-        pass
+        # Stored uploads are shared by content, so they are released rather than deleted
+        upload_store.release(rosco_path, bsr_path, data_path)
 
 
 # -------------------- 🌍 F1 MARKET CHECK ENDPOINT (MODIFIED FOR CONCURRENCY) --------------------
@@ -257,6 +278,79 @@ EPL_CHECK_KEYS = {
     "suppress_duplicated_audience"
     } 
 
+def _run_market_checks(progress, bsr_path, obligation_path, overnight_path, macro_path, checks, output_path):
+    """
+    Runs the selected F1/EPL market checks and writes the processed BSR to output_path.
+    Shared by /api/market_check_and_process and its background job.
+    """
+    secondary_reports: Dict[str, pd.DataFrame] = {} 
+    status_summaries = []
+    df_processed = None 
+
+    progress(0.05, "Loading BSR")
+    # Split Checks; a validator is only built if one of its checks was selected
+    bsr_checks_to_run = [c for c in checks if c not in EPL_CHECK_KEYS]
+    epl_checks_to_run = [c for c in checks if c in EPL_CHECK_KEYS]
+
+    shared_kwargs = {
+        'bsr_path': bsr_path, 
+        'obligation_path': obligation_path, 
+        'overnight_path': overnight_path, 
+        'macro_path': macro_path
+    }
+
+    bsr_validator = None
+    if bsr_checks_to_run or not epl_checks_to_run:
+        bsr_validator = BSRValidator(**shared_kwargs)
+
+    # --- Run BSR/F1 Checks ---
+    if bsr_checks_to_run:
+        progress(0.3, "Running F1 market checks")
+        print(f"Running BSR checks: {bsr_checks_to_run}")
+        status_summaries.extend(bsr_validator.market_check_processor(bsr_checks_to_run))
+        df_processed = bsr_validator.df # Capture results
+    
+    # --- Run EPL Checks ---
+    if epl_checks_to_run:
+        progress(0.6, "Running EPL market checks")
+        print(f"Running EPL checks: {epl_checks_to_run}")
+        # 💡 Shared load: if the BSR validator exists, the EPL validator takes its
+        # (already BSR-processed) DataFrame and macro rules instead of re-reading the files
+        if bsr_validator is not None:
+            epl_validator = EPLValidator(
+                **shared_kwargs, df=bsr_validator.df, dup_rules=bsr_validator.dup_project_rules
+            )
+        else:
+            epl_validator = EPLValidator(**shared_kwargs)
+            
+        # Run EPL checks
+        # Assuming EPLValidator's checks are modifying its internal self.df
+        epl_summaries = [epl_validator.market_check_map[c]() for c in epl_checks_to_run if c in epl_validator.market_check_map]
+        status_summaries.extend(epl_summaries)
+        secondary_reports.update(epl_validator.side_tables)
+        
+        # The final processed DF is the one held by the EPL validator
+        df_processed = epl_validator.df 
+
+    # --- Determine the final DataFrame if no checks ran ---
+    if df_processed is None:
+        # If neither set of checks ran, use the original BSR validator's loaded DataFrame
+        df_processed = bsr_validator.df 
+    
+    if df_processed.empty:
+        raise Exception("Processed DataFrame is empty after applying checks.")
+
+    progress(0.85, "Writing report")
+    # Finalize and Save (Simplified report extraction)
+    clean_summaries = [s for s in status_summaries if isinstance(s, dict)]
+    
+    # --- EXCEL WRITER ---
+    # Sheet 1: Main Processed BSR Data (Mandatory), written in one pass (see report_writer.py)
+    # Secondary reports (e.g. the capacity conflict table) follow as extra sheets
+    report_writer.write_report(output_path, df_processed, sheet_name='Processed BSR', extra_sheets=secondary_reports)
+
+    return {"result_path": output_path, "summaries": clean_summaries}
+
 @app.post("/api/market_check_and_process", response_model=None)
 def market_check_and_process( 
     bsr_file: UploadFile = File(..., description="BSR file for market-specific checks"),
@@ -265,97 +359,25 @@ def market_check_and_process(
     macro_file: Optional[UploadFile] = File(None, description="Macro BSA Market Duplicator file"),
     checks: List[str] = Form(..., description="List of selected check keys (e.g., 'remove_andorra')")
 ):
-    bsr_file_path = os.path.join(UPLOAD_FOLDER, bsr_file.filename)
-    obligation_path, overnight_path, macro_path = None, None, None
+    bsr_file_path, obligation_path, overnight_path, macro_path = None, None, None, None
     
     output_filename = f"Processed_BSR_{os.path.splitext(bsr_file.filename)[0]}_{int(time.time())}.xlsx"
     output_path = os.path.join(OUTPUT_FOLDER, output_filename)
 
-    secondary_reports: Dict[str, pd.DataFrame] = {} 
-    status_summaries = []
-    df_processed = None 
-    
     try:
-        # 1. Save all files synchronously
-        # Save BSR file
-        with open(bsr_file_path, "wb") as buffer:
-            shutil.copyfileobj(bsr_file.file, buffer)
-            
-        # Save optional files
-        if obligation_file and obligation_file.filename:
-            obligation_path = os.path.join(UPLOAD_FOLDER, obligation_file.filename)
-            with open(obligation_path, "wb") as buffer:
-                shutil.copyfileobj(obligation_file.file, buffer)
-        if overnight_file and overnight_file.filename: 
-            overnight_path = os.path.join(UPLOAD_FOLDER, overnight_file.filename)
-            with open(overnight_path, "wb") as buffer:
-                shutil.copyfileobj(overnight_file.file, buffer)
-        if macro_file and macro_file.filename: 
-            macro_path = os.path.join(UPLOAD_FOLDER, macro_file.filename)
-            with open(macro_path, "wb") as buffer:
-                shutil.copyfileobj(macro_file.file, buffer)
-
-
-        # 2. Split Checks and Initialize Validators
-        bsr_checks_to_run = [c for c in checks if c not in EPL_CHECK_KEYS]
-        epl_checks_to_run = [c for c in checks if c in EPL_CHECK_KEYS]
-
-        # 💡 Independent Initialization: Both validators load the raw file
-        shared_kwargs = {
-            'bsr_path': bsr_file_path, 
-            'obligation_path': obligation_path, 
-            'overnight_path': overnight_path, 
-            'macro_path': macro_path
-        }
-        
-        bsr_validator = BSRValidator(**shared_kwargs)
-        epl_validator = EPLValidator(**shared_kwargs)
-
-        # --- Run BSR/F1 Checks ---
-        if bsr_checks_to_run:
-            print(f"Running BSR checks: {bsr_checks_to_run}")
-            status_summaries.extend(bsr_validator.market_check_processor(bsr_checks_to_run))
-            df_processed = bsr_validator.df # Capture results
-        
-        # --- Run EPL Checks ---
-        if epl_checks_to_run:
-            print(f"Running EPL checks: {epl_checks_to_run}")
-            # If BSR checks ran first, we must apply those changes to the EPL validator's DF 
-            # so EPL checks run on the BSR-processed data.
-            if bsr_checks_to_run and df_processed is not None:
-                epl_validator.df = df_processed
-                
-            # Run EPL checks
-            # Assuming EPLValidator's checks are modifying its internal self.df
-            epl_summaries = [epl_validator.market_check_map[c]() for c in epl_checks_to_run if c in epl_validator.market_check_map]
-            status_summaries.extend(epl_summaries)
-            
-            # The final processed DF is the one held by the EPL validator
-            df_processed = epl_validator.df 
-
-        # --- Determine the final DataFrame if no checks ran ---
-        if df_processed is None:
-            # If neither set of checks ran, use the original BSR validator's loaded DataFrame
-            df_processed = bsr_validator.df 
-        
-        if df_processed.empty:
-            raise Exception("Processed DataFrame is empty after applying checks.")
-
-        # 3. Finalize and Save (Simplified report extraction)
-        clean_summaries = [s for s in status_summaries if isinstance(s, dict)]
-        
-        # --- 4. MULTI-SHEET EXCEL WRITER ---
-        # NOTE: Using 'openpyxl' engine which is suitable for Streamlit/FastAPI integration
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            # Sheet 1: Main Processed BSR Data (Mandatory)
-            df_processed.to_excel(writer, sheet_name='Processed BSR', index=False)
-            
-            # Placeholder for saving secondary reports if any were generated (unchanged logic)
-            # for sheet_name, report_df in secondary_reports.items():
-            #     report_df.to_excel(writer, sheet_name= sheet_name, index=False) 
-
+        # 1. Stream all files into the upload store (optional files may be missing)
+        bsr_file_path = upload_store.save_upload(bsr_file)
+        obligation_path = upload_store.save_upload(obligation_file)
+        overnight_path = upload_store.save_upload(overnight_file)
+        macro_path = upload_store.save_upload(macro_file)
+
+        # 2. Run the selected checks and save the processed BSR
+        result = _run_market_checks(
+            _no_progress, bsr_file_path, obligation_path, overnight_path, macro_path, checks, output_path
+        )
+        clean_summaries = result["summaries"]
 
-        # 5. Finalize JSON Response
+        # 3. Finalize JSON Response
         download_url = f"/api/download_file?filename={output_filename}" 
 
         return JSONResponse(content={
@@ -365,19 +387,16 @@ def market_check_and_process(
             "summaries": clean_summaries
         })
 
+    except SchemaError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         print(f"Market Check Error: {e}")
         # Ensure temporary files are cleaned up even if an error occurs
         raise HTTPException(status_code=500, detail=f"An error occurred during market checks: {str(e)}")
         
     finally:
-        # Cleanup uploaded files
-        for path in [bsr_file_path, obligation_path, overnight_path, macro_path]:
-            if path and os.path.exists(path):
-                try:
-                    os.remove(path)
-                except OSError as e:
-                    print(f"Error cleaning up file {path}: {e}")
+        # Release uploaded files (shared by content, removed by the cleanup thread)
+        upload_store.release(bsr_file_path, obligation_path, overnight_path, macro_path)
 
 # -------------------- 📥 NEW DOWNLOAD ENDPOINT (UNTOUCHED) --------------------
 @app.get("/api/download_file")
@@ -399,6 +418,67 @@ async def download_file(filename: str = Query(...)):
 # -----------------------------------------------------------
 
 # -------------------- 1. NEW GENERAL QC ENDPOINT --------------------
+def _run_general_qc_pipeline(progress, rosco_path, bsr_path, output_path, macro_path=None):
+    """
+    Runs YOUR QC pipeline from qc_checks_1.py: the 9 general checks, plus the
+    LaLiga domestic/duplicated market checks when a macro file is given.
+    Shared by the general/LaLiga endpoints and their background jobs.
+    """
+    config = load_config()
+    col_map = config["column_mappings"]
+    rules = config["qc_rules"]
+    project = config["project_rules"]
+    file_rules = config["file_rules"]
+
+    progress(0.05, "Loading BSR and Rosco")
+    # One cache per run: every sheet of the BSR / Rosco is parsed only once
+    workbooks = WorkbookCache()
+    df = qc_general.load_bsr(bsr_path, col_map["bsr"], cache=workbooks)
+    # Every config field is resolved once; a BSR without the core columns stops here
+    schema = log_unresolved(resolve_schema(df, col_map["bsr"])).require(REQUIRED_BSR_FIELDS)
+    start_date, end_date = qc_general.detect_period_from_rosco(rosco_path, cache=workbooks)
+
+    progress(0.2, "Running QC checks")
+    df = qc_general.period_check(df, start_date, end_date, col_map["bsr"], schema=schema)
+    df = qc_general.completeness_check(df, col_map["bsr"], rules["program_category"], schema=schema)
+    df = qc_general.overlap_duplicate_daybreak_check(df, col_map["bsr"], rules["overlap_check"], schema=schema)
+    progress(0.4, "Running reference checks")
+    # 💡 Check graph: independent checks are planned into waves (see check_graph.py); with
+    # QC_PARALLEL_CHECKS=1 a wave runs on a process pool, where the workbook cache arrives
+    # empty and each check re-reads its sheet from the upload path.
+    checks = [
+        Check("program_category", qc_general.program_category_check, frame_kw="df",
+              bsr_path=bsr_path, col_map=col_map, rules=rules["program_category"], file_rules=file_rules, cache=workbooks,
+              schema=schema),
+        Check("event_matchday", qc_general.check_event_matchday_competition, bsr_path, col_map, file_rules,
+              cache=workbooks, schema=schema),
+        Check("market_channel_consistency", qc_general.market_channel_consistency_check, rosco_path, col_map, file_rules,
+              cache=workbooks, schema=schema),
+        Check("rates_and_ratings", qc_general.rates_and_ratings_check, col_map["bsr"], schema=schema),
+        Check("country_channel_id", qc_general.country_channel_id_check, col_map["bsr"], schema=schema),
+        Check("client_lstv_ott", qc_general.client_lstv_ott_check, col_map["bsr"], rules["client_check"], schema=schema),
+    ]
+
+    sheet_name = "QC Results"
+    if macro_path:
+        # domestic_market_check strips the market/competition columns in place,
+        # and duplicated_market_check reads them afterwards
+        checks += [
+            Check("domestic_market", qc_general.domestic_market_check, project, col_map["bsr"], debug=True, in_place=True,
+                  schema=schema),
+            Check("duplicated_market", qc_general.duplicated_market_check, macro_path, project, col_map, file_rules,
+                  debug=True, after=["domestic_market"], schema=schema),
+        ]
+        sheet_name = "Laliga QC Results"
+
+    df = run_checks(df, checks)
+    workbooks.clear()
+
+    progress(0.85, "Writing report")
+    # Data, highlighting and Summary sheet in one pass
+    qc_general.write_qc_report(output_path, df, file_rules, sheet_name=sheet_name)
+    return {"result_path": output_path}
+
 @app.post("/api/run_general_qc")
 def run_general_qc_checks( # <-- CHANGED from async def to def
     rosco_file: UploadFile = File(...),
@@ -407,57 +487,29 @@ def run_general_qc_checks( # <-- CHANGED from async def to def
     """
     Runs YOUR 9-check GENERAL QC pipeline from qc_checks_1.py
     """
-    config = load_config()
-    col_map = config["column_mappings"]
-    rules = config["qc_rules"]
-    file_rules = config["file_rules"]
-
-    rosco_path = os.path.join(UPLOAD_FOLDER, rosco_file.filename)
-    bsr_path = os.path.join(UPLOAD_FOLDER, bsr_file.filename)
+    rosco_path, bsr_path = None, None
     
     try:
-        # Save files synchronously
-        with open(rosco_path, "wb") as buffer:
-            shutil.copyfileobj(rosco_file.file, buffer)
-        with open(bsr_path, "wb") as buffer:
-            shutil.copyfileobj(bsr_file.file, buffer)
-
-        # --- Run YOUR QC Pipeline (The 9 Checks) ---
-        start_date, end_date = qc_general.detect_period_from_rosco(rosco_path)
-        df = qc_general.load_bsr(bsr_path, col_map["bsr"])
-
-        df = qc_general.period_check(df, start_date, end_date, col_map["bsr"])
-        df = qc_general.completeness_check(df, col_map["bsr"], rules["program_category"])
-        df = qc_general.overlap_duplicate_daybreak_check(df, col_map["bsr"], rules["overlap_check"])
-        df = qc_general.program_category_check(bsr_path, df, col_map, rules["program_category"], file_rules)
-        df = qc_general.check_event_matchday_competition(df, bsr_path, col_map, file_rules)
-        df = qc_general.market_channel_consistency_check(df, rosco_path, col_map, file_rules)
-        df = qc_general.rates_and_ratings_check(df, col_map["bsr"])
-        df = qc_general.country_channel_id_check(df, col_map["bsr"])
-        df = qc_general.client_lstv_ott_check(df, col_map["bsr"], rules["client_check"])
-
-        # Generate Output File
+        # Stream files into the upload store
+        rosco_path = upload_store.save_upload(rosco_file)
+        bsr_path = upload_store.save_upload(bsr_file)
+
+        # --- Run YOUR QC Pipeline (The 9 Checks) and Generate Output File ---
         output_file = f"General_QC_Result_{os.path.splitext(bsr_file.filename)[0]}.xlsx"
         output_path = os.path.join(OUTPUT_FOLDER, output_file)
-
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="QC Results")
-
-        qc_general.color_excel(output_path, df)
-        qc_general.generate_summary_sheet(output_path, df, file_rules)
+        _run_general_qc_pipeline(_no_progress, rosco_path, bsr_path, output_path)
 
         return FileResponse(
             path=output_path,
             filename=output_file,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
+    except SchemaError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        for path in [rosco_path, bsr_path]:
-            if path and os.path.exists(path): os.remove(path)
         raise HTTPException(status_code=500, detail=f"An error occurred during General QC: {str(e)}")
     finally:
-        # Removed 'await file.close()'
-        pass
+        upload_store.release(rosco_path, bsr_path)
 
 # -------------------- 2. NEW LALIGA QC ENDPOINT --------------------
 @app.post("/api/run_laliga_qc")
@@ -469,61 +521,184 @@ def run_laliga_qc_checks( # <-- CHANGED from async def to def
     """
     Runs YOUR FULL 11-check QC pipeline from qc_checks_1.py
     """
-    config = load_config()
-    col_map = config["column_mappings"]
-    rules = config["qc_rules"]
-    project = config["project_rules"]
-    file_rules = config["file_rules"]
-
-    rosco_path = os.path.join(UPLOAD_FOLDER, rosco_file.filename)
-    bsr_path = os.path.join(UPLOAD_FOLDER, bsr_file.filename)
-    macro_path = os.path.join(UPLOAD_FOLDER, macro_file.filename)
+    rosco_path, bsr_path, macro_path = None, None, None
     
     try:
-        # Save files synchronously
-        with open(rosco_path, "wb") as buffer:
-            shutil.copyfileobj(rosco_file.file, buffer)
-        with open(bsr_path, "wb") as buffer:
-            shutil.copyfileobj(bsr_file.file, buffer)
-        with open(macro_path, "wb") as buffer:
-            shutil.copyfileobj(macro_file.file, buffer)
-
-        # --- Run YOUR QC Pipeline (ALL 11 Checks) ---
-        start_date, end_date = qc_general.detect_period_from_rosco(rosco_path)
-        df = qc_general.load_bsr(bsr_path, col_map["bsr"])
-
-        df = qc_general.period_check(df, start_date, end_date, col_map["bsr"])
-        df = qc_general.completeness_check(df, col_map["bsr"], rules["program_category"])
-        df = qc_general.overlap_duplicate_daybreak_check(df, col_map["bsr"], rules["overlap_check"])
-        df = qc_general.program_category_check(bsr_path, df, col_map, rules["program_category"], file_rules)
-        df = qc_general.check_event_matchday_competition(df, bsr_path, col_map, file_rules)
-        df = qc_general.market_channel_consistency_check(df, rosco_path, col_map, file_rules)
-        df = qc_general.rates_and_ratings_check(df, col_map["bsr"])
-        df = qc_general.country_channel_id_check(df, col_map["bsr"])
-        df = qc_general.client_lstv_ott_check(df, col_map["bsr"], rules["client_check"])
-        
-        df = qc_general.domestic_market_check(df, project, col_map["bsr"], debug=True)
-        df = qc_general.duplicated_market_check(df, macro_path, project, col_map, file_rules, debug=True)
+        # Stream files into the upload store
+        rosco_path = upload_store.save_upload(rosco_file)
+        bsr_path = upload_store.save_upload(bsr_file)
+        macro_path = upload_store.save_upload(macro_file)
 
-        # Generate Output File
+        # --- Run YOUR QC Pipeline (ALL 11 Checks) and Generate Output File ---
         output_file = f"Laliga_QC_Result_{os.path.splitext(bsr_file.filename)[0]}.xlsx"
         output_path = os.path.join(OUTPUT_FOLDER, output_file)
-
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Laliga QC Results")
-
-        qc_general.color_excel(output_path, df)
-        qc_general.generate_summary_sheet(output_path, df, file_rules)
+        _run_general_qc_pipeline(_no_progress, rosco_path, bsr_path, output_path, macro_path=macro_path)
 
         return FileResponse(
             path=output_path,
             filename=output_file,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
+    except SchemaError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        for path in [rosco_path, bsr_path, macro_path]:
-            if path and os.path.exists(path): os.remove(path)
         raise HTTPException(status_code=500, detail=f"An error occurred during Laliga QC: {str(e)}")
     finally:
-        # Removed 'await file.close()'
-        pass
\ No newline at end of file
+        upload_store.release(rosco_path, bsr_path, macro_path)
+# -----------------------------------------------------------
+# -------------------- ⏳ BACKGROUND JOB ENDPOINTS --------------------
+# -----------------------------------------------------------
+# Same pipelines as the endpoints above, but the request only stores the uploads and
+# returns a job id; the run happens on the job queue's worker pool. Poll
+# /api/jobs/{job_id} for status/progress and fetch the file from /api/jobs/{job_id}/result.
+
+def _new_job_folder():
+    """Reserves a job id with its own result folder."""
+    job_id = job_queue.new_job_id()
+    result_dir = os.path.join(JOB_RESULT_FOLDER, job_id)
+    os.makedirs(result_dir, exist_ok=True)
+    return job_id, result_dir
+
+def _finish_job(upload_paths, result_dir):
+    """Releases the job's uploads, and removes its result folder if the job produced nothing."""
+    upload_store.release(*upload_paths)
+    if os.path.isdir(result_dir) and not os.listdir(result_dir):
+        os.rmdir(result_dir)
+
+def _job_not_queued(error, upload_paths, result_dir):
+    """Cleanup when storing the uploads or queueing the job failed (no job will run _finish_job)."""
+    _finish_job(upload_paths, result_dir)
+    print(f"Job submission error: {error}")
+    raise HTTPException(status_code=500, detail=f"Could not queue the job: {str(error)}")
+
+def _submit_job(kind, job_id, result_dir, upload_paths, fn, *args):
+    job_queue.submit(kind, fn, *args, job_id=job_id, cleanup=lambda: _finish_job(upload_paths, result_dir))
+    return JSONResponse(status_code=202, content={
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}",
+    })
+
+@app.post("/api/jobs/run_qc")
+def submit_qc_job(
+    rosco_file: UploadFile = File(..., description="The Rosco file (.xlsx)"),
+    bsr_file: UploadFile = File(..., description="The BSR file (.xlsx)"),
+    data_file: Optional[UploadFile] = File(None, description="The optional Client Data file (.xlsx)")
+):
+    """Queues the full QC pipeline (/api/run_qc)."""
+    job_id, result_dir = _new_job_folder()
+    rosco_path, bsr_path, data_path = None, None, None
+    try:
+        rosco_path = upload_store.save_upload(rosco_file)
+        bsr_path = upload_store.save_upload(bsr_file)
+        data_path = upload_store.save_upload(data_file)
+        output_path = os.path.join(result_dir, f"QC_Result_{os.path.splitext(bsr_file.filename)[0]}.xlsx")
+        return _submit_job(
+            "run_qc", job_id, result_dir, [rosco_path, bsr_path, data_path],
+            _run_qc_pipeline, rosco_path, bsr_path, data_path, output_path
+        )
+    except Exception as e:
+        _job_not_queued(e, [rosco_path, bsr_path, data_path], result_dir)
+
+@app.post("/api/jobs/run_general_qc")
+def submit_general_qc_job(
+    rosco_file: UploadFile = File(...),
+    bsr_file: UploadFile = File(...)
+):
+    """Queues the general QC pipeline (/api/run_general_qc)."""
+    job_id, result_dir = _new_job_folder()
+    rosco_path, bsr_path = None, None
+    try:
+        rosco_path = upload_store.save_upload(rosco_file)
+        bsr_path = upload_store.save_upload(bsr_file)
+        output_path = os.path.join(result_dir, f"General_QC_Result_{os.path.splitext(bsr_file.filename)[0]}.xlsx")
+        return _submit_job(
+            "run_general_qc", job_id, result_dir, [rosco_path, bsr_path],
+            _run_general_qc_pipeline, rosco_path, bsr_path, output_path
+        )
+    except Exception as e:
+        _job_not_queued(e, [rosco_path, bsr_path], result_dir)
+
+@app.post("/api/jobs/run_laliga_qc")
+def submit_laliga_qc_job(
+    rosco_file: UploadFile = File(...),
+    bsr_file: UploadFile = File(...),
+    macro_file: UploadFile = File(...)
+):
+    """Queues the LaLiga QC pipeline (/api/run_laliga_qc)."""
+    job_id, result_dir = _new_job_folder()
+    rosco_path, bsr_path, macro_path = None, None, None
+    try:
+        rosco_path = upload_store.save_upload(rosco_file)
+        bsr_path = upload_store.save_upload(bsr_file)
+        macro_path = upload_store.save_upload(macro_file)
+        output_path = os.path.join(result_dir, f"Laliga_QC_Result_{os.path.splitext(bsr_file.filename)[0]}.xlsx")
+        return _submit_job(
+            "run_laliga_qc", job_id, result_dir, [rosco_path, bsr_path, macro_path],
+            _run_general_qc_pipeline, rosco_path, bsr_path, output_path, macro_path
+        )
+    except Exception as e:
+        _job_not_queued(e, [rosco_path, bsr_path, macro_path], result_dir)
+
+@app.post("/api/jobs/market_check_and_process")
+def submit_market_check_job(
+    bsr_file: UploadFile = File(..., description="BSR file for market-specific checks"),
+    obligation_file: Optional[UploadFile] = File(None, description="F1 Obligation file for broadcaster checks"), 
+    overnight_file: Optional[UploadFile] = File(None, description="Overnight Audience file for upscale/integrity check"),
+    macro_file: Optional[UploadFile] = File(None, description="Macro BSA Market Duplicator file"),
+    checks: List[str] = Form(..., description="List of selected check keys (e.g., 'remove_andorra')")
+):
+    """Queues the selected market checks (/api/market_check_and_process)."""
+    job_id, result_dir = _new_job_folder()
+    bsr_path, obligation_path, overnight_path, macro_path = None, None, None, None
+    try:
+        bsr_path = upload_store.save_upload(bsr_file)
+        obligation_path = upload_store.save_upload(obligation_file)
+        overnight_path = upload_store.save_upload(overnight_file)
+        macro_path = upload_store.save_upload(macro_file)
+        output_path = os.path.join(result_dir, f"Processed_BSR_{os.path.splitext(bsr_file.filename)[0]}.xlsx")
+        return _submit_job(
+            "market_check_and_process", job_id, result_dir, [bsr_path, obligation_path, overnight_path, macro_path],
+            _run_market_checks, bsr_path, obligation_path, overnight_path, macro_path, checks, output_path
+        )
+    except Exception as e:
+        _job_not_queued(e, [bsr_path, obligation_path, overnight_path, macro_path], result_dir)
+
+@app.get("/api/jobs/{job_id}")
+def get_job_status(job_id: str):
+    """Status, progress (0-1), current step and, once finished, the result link or error."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or has expired.")
+
+    content = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "message": job["message"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["status"] == SUCCEEDED:
+        content["download_url"] = f"/api/jobs/{job_id}/result"
+        content.update(job["result"])  # e.g. market check summaries
+    return content
+
+@app.get("/api/jobs/{job_id}/result")
+def download_job_result(job_id: str):
+    """Returns the output file of a finished job."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or has expired.")
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}, no result available.")
+    if not job["result_path"] or not os.path.exists(job["result_path"]):
+        raise HTTPException(status_code=404, detail="Result file not found or has expired.")
+
+    return FileResponse(
+        path=job["result_path"],
+        filename=os.path.basename(job["result_path"]),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
@@ -0,0 +1,156 @@
+"""
+Smoke run of the FastAPI app (api.py) through its ASGI interface, without a
+server: lifespan startup, POST /api/jobs/market_check_and_process, polling
+GET /api/jobs/{job_id}, downloading the result, the 422 answer of
+/api/run_general_qc for a BSR missing core columns, and lifespan shutdown.
+
+api.py keeps its uploads, outputs and job database under the working
+directory (and cleans them up in the background), so the run happens in a
+temporary directory. Exits with status 1 when a step fails.
+
+Usage:
+    python benchmarks/api_jobs_smoke.py
+    python benchmarks/api_jobs_smoke.py --bsr path/to/bsr.xlsx --checks remove_andorra remove_serbia
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BSR = os.path.join(ROOT, "data", "WF 3 F1-R12 - Great Britain.xlsx")
+XLSX_MAGIC = b"PK"
+
+
+def multipart(fields, files):
+    """multipart/form-data body for (name, value) fields and (name, path) files."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields:
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, path in files:
+        with open(path, "rb") as fh:
+            data = fh.read()
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                     f'filename="{os.path.basename(path)}"\r\nContent-Type: application/octet-stream\r\n\r\n'.encode()
+                     + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+async def request(app, method, path, body=b"", content_type=None):
+    """One HTTP request against the ASGI app; returns (status, headers, body)."""
+    headers = [(b"host", b"smoke")]
+    if content_type:
+        headers += [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": headers,
+        "client": ("smoke", 0), "server": ("smoke", 80),
+    }
+    pending = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        # The client stays connected until the response is sent
+        await asyncio.Event().wait()
+
+    response = {"status": None, "headers": {}, "body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message["headers"]}
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], response["body"]
+
+
+async def run(app, bsr_path, checks, missing_bsr_path):
+    failures = []
+
+    def expect(step, ok, detail):
+        print(f"{'ok  ' if ok else 'FAIL'} {step}: {detail}")
+        if not ok:
+            failures.append(step)
+
+    # Lifespan startup
+    lifespan_in, lifespan_out = asyncio.Queue(), []
+    await lifespan_in.put({"type": "lifespan.startup"})
+
+    async def lifespan_send(message):
+        lifespan_out.append(message["type"])
+
+    lifespan = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}},
+                                       lifespan_in.get, lifespan_send))
+    while not lifespan_out:
+        await asyncio.sleep(0.01)
+    expect("startup", lifespan_out == ["lifespan.startup.complete"], lifespan_out)
+
+    # Submit -> poll -> download
+    body, content_type = multipart([("checks", key) for key in checks], [("bsr_file", bsr_path)])
+    status, _, payload = await request(app, "POST", "/api/jobs/market_check_and_process", body, content_type)
+    expect("submit", status == 202, f"{status} {payload.decode()}")
+    job_id = json.loads(payload)["job_id"]
+
+    job = {}
+    for _ in range(1200):
+        status, _, payload = await request(app, "GET", f"/api/jobs/{job_id}")
+        job = json.loads(payload)
+        if job.get("status") in ("succeeded", "failed"):
+            break
+        await asyncio.sleep(0.5)
+    expect("poll", job.get("status") == "succeeded",
+           f"{job.get('status')} {[s.get('status') for s in job.get('summaries', [])]} {job.get('error') or ''}")
+
+    status, headers, payload = await request(app, "GET", f"/api/jobs/{job_id}/result")
+    expect("download", status == 200 and payload.startswith(XLSX_MAGIC),
+           f"{status} {headers.get('content-type')} {len(payload)} bytes")
+
+    # Schema errors answer 422
+    body, content_type = multipart([], [("rosco_file", bsr_path), ("bsr_file", missing_bsr_path)])
+    status, _, payload = await request(app, "POST", "/api/run_general_qc", body, content_type)
+    expect("schema 422", status == 422, f"{status} {payload.decode()[:160]}")
+
+    await lifespan_in.put({"type": "lifespan.shutdown"})
+    await lifespan
+    expect("shutdown", lifespan_out[-1] == "lifespan.shutdown.complete", lifespan_out)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bsr", default=DEFAULT_BSR)
+    parser.add_argument("--checks", nargs="+", default=["remove_andorra", "remove_serbia"])
+    args = parser.parse_args()
+    bsr_path = os.path.abspath(args.bsr)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copy(os.path.join(ROOT, "config.json"), workdir)
+        missing_bsr_path = os.path.join(workdir, "bsr_missing_start_end.xlsx")
+        pd.DataFrame({"Market": ["France"], "TV Channel": ["Canal+"], "Date (UTC/GMT)": ["2025-07-06"]}).to_excel(
+            missing_bsr_path, index=False)
+        os.environ.setdefault("QC_JOB_DB", os.path.join(workdir, "qc_jobs.db"))
+        os.chdir(workdir)
+        import api  # noqa: E402  (folders are created under the working directory on import)
+
+        failures = asyncio.run(run(api.app, bsr_path, args.checks, missing_bsr_path))
+        os.chdir(ROOT)
+
+    print(f"\n{len(failures)} step(s) failed")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,155 @@
+"""
+Benchmark for check_graph.run_checks: the reference-check wave of the general
+QC pipeline (api.py) run one by one ("sequential") vs as one parallel wave
+("parallel"). The wave holds the workbook-backed checks (program_category,
+event_matchday, market_channel_consistency), which re-read their sheets from
+the synthetic BSR / Rosco workbooks in the pool, and the column checks
+(rates_and_ratings, country_channel_id, client_lstv_ott).
+
+Reports the timings and whether both runs give the same frame. Parallel runs
+stay opt-in (QC_PARALLEL_CHECKS) until this shows a speedup on the machine the
+API runs on; run it with --workers set to the cores available.
+
+Usage:
+    python benchmarks/check_graph_benchmark.py
+    python benchmarks/check_graph_benchmark.py --sizes 100000 1000000 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+TEAMS = ["Arsenal", "Chelsea", "Liverpool", "Everton", "Fulham", "Brentford", "Wolves", "Burnley"]
+
+
+def make_bsr(n_rows, seed=0):
+    """Synthetic BSR with the columns the general QC reference checks read."""
+    rng = np.random.default_rng(seed)
+    home = rng.choice(TEAMS, n_rows)
+    away = np.roll(home, 1)
+    return pd.DataFrame({
+        "Market": rng.choice(["France", "Spain", "Italy", "Germany"], n_rows),
+        "Market ID": rng.integers(1, 5, n_rows),
+        "TV-Channel": rng.choice(["Canal+", "DAZN", "Sky", "ESPN", "Eurosport"], n_rows),
+        "Channel ID": rng.integers(1, 50, n_rows),
+        "Pay/Free TV": rng.choice(["Pay", "Free", "Unknown"], n_rows),
+        "Type of Program": rng.choice(["Live", "Repeat", "Highlights", "Magazine"], n_rows),
+        "Program Description": rng.choice(["Match", "Highlights of the day", "Studio analysis"], n_rows),
+        "Home Team": home,
+        "Away Team": away,
+        "Event": "Premier League",
+        "Matchday": rng.integers(1, 5, n_rows).astype(str),
+        "Source": rng.choice(["Meter", "Estimate"], n_rows),
+        "Aud. Estimates ['000s]": rng.random(n_rows) * 100,
+        "Aud Metered (000s) 3+": np.where(rng.random(n_rows) < 0.3, np.nan, rng.random(n_rows) * 100),
+        "Date": pd.Timestamp("2025-07-06"),
+        "Start (UTC)": rng.choice(["12:00:00", "15:00:00", "19:30:00"], n_rows),
+        "End (UTC)": rng.choice(["13:50:00", "16:55:00", "21:00:00"], n_rows),
+    })
+
+
+def make_workbooks(folder):
+    """BSR workbook with a fixture list sheet and Rosco workbook, as the checks read them."""
+    bsr_path = os.path.join(folder, "bsr.xlsx")
+    rosco_path = os.path.join(folder, "rosco.xlsx")
+    fixtures = pd.DataFrame([
+        {"Event": "Premier League", "Home Team": home, "Away Team": away, "Matchday": str(md),
+         "Date": "2025-07-06", "Start Time": "12:00:00"}
+        for md in range(1, 5) for home, away in zip(TEAMS, np.roll(TEAMS, 1))
+    ])
+    with pd.ExcelWriter(bsr_path) as writer:
+        pd.DataFrame({"Market": ["France"]}).to_excel(writer, sheet_name="Data", index=False)
+        fixtures.to_excel(writer, sheet_name="Fixture List", index=False)
+    with pd.ExcelWriter(rosco_path) as writer:
+        pd.DataFrame({"Period": ["2025-07-01 to 2025-07-31"]}).to_excel(writer, sheet_name="General", index=False)
+        pd.DataFrame({"ChannelCountry": ["France", "Spain", "Italy", "Germany"] * 2,
+                      "ChannelName": ["Canal+", "DAZN", "Sky", "ESPN", "Eurosport", "DAZN", "Sky", "Canal+"]}).to_excel(
+            writer, sheet_name="Channels", index=False)
+    return bsr_path, rosco_path
+
+
+def timed(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20_000, 100_000])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    # The pool size is read when check_graph is imported; workers inherit the warning filter
+    os.environ["QC_CHECK_WORKERS"] = str(args.workers)
+    os.environ["PYTHONWARNINGS"] = "ignore::UserWarning"
+    warnings.simplefilter("ignore", UserWarning)
+    import check_graph  # noqa: E402
+    import qc_checks_1 as q  # noqa: E402
+    from column_schema import resolve_schema  # noqa: E402
+    from workbook_cache import WorkbookCache  # noqa: E402
+
+    logging.disable(logging.WARNING)
+    with open(os.path.join(ROOT, "config.json")) as f:
+        config = json.load(f)
+    col_map = config["column_mappings"]
+    bsr_cols = col_map["bsr"]
+    rules = config["qc_rules"]
+    file_rules = config["file_rules"]
+    workdir = tempfile.TemporaryDirectory()
+    bsr_path, rosco_path = make_workbooks(workdir.name)
+
+    def reference_checks(schema, workbooks):
+        return [
+            check_graph.Check("program_category", q.program_category_check, frame_kw="df", bsr_path=bsr_path,
+                              col_map=col_map, rules=rules["program_category"], file_rules=file_rules,
+                              cache=workbooks, schema=schema),
+            check_graph.Check("event_matchday", q.check_event_matchday_competition, bsr_path, col_map, file_rules,
+                              cache=workbooks, schema=schema),
+            check_graph.Check("market_channel_consistency", q.market_channel_consistency_check, rosco_path, col_map,
+                              file_rules, cache=workbooks, schema=schema),
+            check_graph.Check("rates_and_ratings", q.rates_and_ratings_check, bsr_cols, schema=schema),
+            check_graph.Check("country_channel_id", q.country_channel_id_check, bsr_cols, schema=schema),
+            check_graph.Check("client_lstv_ott", q.client_lstv_ott_check, bsr_cols, rules["client_check"],
+                              schema=schema),
+        ]
+
+    print(f"{args.workers} worker(s), {os.cpu_count()} core(s)")
+    # Start the workers first, so the timings don't include process start-up
+    warm_up = make_bsr(1000)
+    timed(lambda: check_graph.run_checks(warm_up, reference_checks(resolve_schema(warm_up, bsr_cols), None),
+                                         parallel=True))
+    for n_rows in args.sizes:
+        df = make_bsr(n_rows)
+        workbooks = WorkbookCache()
+        checks = reference_checks(resolve_schema(df, bsr_cols), workbooks)
+        sequential, t_seq = timed(lambda: check_graph.run_checks(df.copy(), checks, parallel=False))
+        parallel, t_par = timed(lambda: check_graph.run_checks(df.copy(), checks, parallel=True))
+        try:
+            pd.testing.assert_frame_equal(sequential.astype(object), parallel.astype(object))
+            same = "same"
+        except AssertionError:
+            same = "DIFFERENT"
+        print(f"{n_rows:>9} rows  sequential {t_seq:6.2f}s  parallel {t_par:6.2f}s  "
+              f"speedup {t_seq / t_par:4.2f}x  {same}")
+        workbooks.clear()
+    check_graph.shutdown()
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Compact-vs-plain equivalence run for the market checks.
+
+Runs every BSRValidator / EPLValidator market check twice on the same BSR,
+once on the plain frame and once on compact_frame() of it, and compares the
+status dicts and the resulting frames (as object values). The BSR is
+prepared so that checks writing into loaded text columns have to write
+values the compacted columns don't hold yet:
+    - Region only uses the 'Central & South America' spelling, so
+      check_latam_espn writes the canonical 'Central and South America';
+    - a synthetic overnight file makes update_audience_from_overnight
+      upper-case Market / TV-Channel / Competition and parse Date in place.
+Exits with status 1 when any check differs.
+
+Usage:
+    python benchmarks/compact_checks_equivalence.py
+    python benchmarks/compact_checks_equivalence.py --bsr path/to/bsr.xlsx --macro path/to/macro.xlsm
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import warnings
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from C_data_processing_f1 import BSRValidator  # noqa: E402
+from C_data_processing_EPL import EPLValidator  # noqa: E402
+from compact_frame import compact_frame  # noqa: E402
+
+DEFAULT_BSR = os.path.join(ROOT, "data", "WF 3 F1-R12 - Great Britain.xlsx")
+DEFAULT_MACRO = os.path.join(ROOT, "data", "Macro - BSA Market Duplicator 3.5-F1.xlsm")
+
+
+def prepare_bsr(df):
+    df = df.copy()
+    if "Region" in df.columns:
+        df["Region"] = df["Region"].replace({"Central and South America": "Central & South America"})
+    return df
+
+
+def write_overnight(df, path):
+    """Overnight sheet matching the BSR's Market / TV-Channel pairs (race day, higher audiences)."""
+    pairs = df[["Market", "TV-Channel"]].dropna().drop_duplicates()
+    overnight = pd.DataFrame({
+        "Country": pairs["Market"].astype(str).str.lower().to_numpy(),
+        "Channel": pairs["TV-Channel"].astype(str).to_numpy(),
+        "Date": pd.Timestamp("2025-07-06"),
+        "Session": "Race",
+        "Grand Prix": BSRValidator.GP_FILTER_VALUE,
+        BSRValidator.OVERNIGHT_AUDIENCE_COL: 10_000.0,
+    })
+    overnight.to_excel(path, sheet_name=BSRValidator.OVERNIGHT_SHEET, index=False)
+
+
+def run_check(cls, key, frame, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        validator = cls(df=frame, **kwargs)
+        summaries = validator.market_check_processor([key])
+    return summaries, validator.df
+
+
+def frames_differ(a, b):
+    try:
+        pd.testing.assert_frame_equal(a.astype(object).reset_index(drop=True),
+                                      b.astype(object).reset_index(drop=True), check_dtype=False)
+    except AssertionError as e:
+        return str(e).splitlines()[0]
+    return None
+
+
+def run(bsr_path, macro_path):
+    warnings.simplefilter("ignore")
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = prepare_bsr(BSRValidator(bsr_path=bsr_path, compact=False).df)
+    compact = compact_frame(df)
+    print(f"{len(df)} rows, {sum(isinstance(t, pd.CategoricalDtype) for t in compact.dtypes)} categorical columns")
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        overnight_path = os.path.join(tmp, "overnight.xlsx")
+        write_overnight(df, overnight_path)
+        validators = [
+            (BSRValidator, dict(bsr_path=bsr_path, macro_path=macro_path, overnight_path=overnight_path)),
+            (EPLValidator, dict(bsr_path=bsr_path, overnight_path=overnight_path)),
+        ]
+        for cls, kwargs in validators:
+            with contextlib.redirect_stdout(io.StringIO()):
+                probe = cls(df=df.copy(), **kwargs)
+            keys = list(probe.market_check_map) + list(getattr(probe, "removal_checks", {}))
+            for key in keys:
+                plain_summaries, plain_df = run_check(cls, key, df.copy(), compact=False, **kwargs)
+                compact_summaries, compact_df = run_check(cls, key, compact.copy(), compact=True, **kwargs)
+                status = [s.get("status") for s in plain_summaries]
+                problems = []
+                if plain_summaries != compact_summaries:
+                    problems.append(f"status {status} vs {[s.get('status') for s in compact_summaries]}")
+                frame_diff = frames_differ(plain_df, compact_df)
+                if frame_diff:
+                    problems.append(frame_diff)
+                failures += bool(problems)
+                print(f"{'FAIL' if problems else 'ok  '} {cls.__name__}.{key} {status} {'; '.join(problems)}")
+
+    print(f"\n{failures} check(s) differ between compact and plain frames")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bsr", default=DEFAULT_BSR)
+    parser.add_argument("--macro", default=DEFAULT_MACRO)
+    args = parser.parse_args()
+    sys.exit(1 if run(args.bsr, args.macro) else 0)
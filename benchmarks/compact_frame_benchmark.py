@@ -0,0 +1,64 @@
+"""
+Benchmark for the compact BSR load mode (compact_frame.py).
+
+Builds a synthetic BSR with the usual text columns (a few hundred distinct
+markets / channels / broadcasters, free-text descriptions) and reports the
+deep memory usage of the frame before and after compact_frame(), plus the
+dtype chosen per column.
+
+Usage:
+    python benchmarks/compact_frame_benchmark.py
+    python benchmarks/compact_frame_benchmark.py --sizes 100000 500000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import compact_frame  # noqa: E402
+
+
+def make_bsr(n, seed=0):
+    rng = np.random.default_rng(seed)
+    markets = [f"Market {i}" for i in range(180)]
+    channels = [f"Channel {i} HD" for i in range(600)]
+    return pd.DataFrame({
+        "Region": rng.choice(["Europe", "Asia", "Americas", "Africa", "Middle East"], n),
+        "Market": rng.choice(markets, n),
+        "Broadcaster": rng.choice([f"Broadcaster {i}" for i in range(250)], n),
+        "TV-Channel": rng.choice(channels, n),
+        "Pay/Free TV": rng.choice(["Pay", "Free"], n),
+        "Type of program": rng.choice(["Live", "Delayed", "Repeat", "Highlights", "Magazine"], n),
+        "Competition": rng.choice(["Race", "Qualifying", "Practice 1", "Practice 2", "Practice 3"], n),
+        "Source": rng.choice(["Meter", "Estimate", "BSA"], n),
+        "Program Description": [f"Live coverage #{i}" for i in rng.integers(0, n, n)],
+        "Start (UTC)": pd.Timestamp("2025-07-06") + pd.to_timedelta(rng.integers(0, 86400, n), unit="s"),
+        "Aud Metered (000s) 3+": rng.random(n) * 500,
+    })
+
+
+def run(sizes):
+    print(f"Arrow string dtype: {compact_frame.arrow_string_dtype()}")
+    for n in sizes:
+        df = make_bsr(n)
+        t0 = time.perf_counter()
+        compact = compact_frame.compact_frame(df)
+        elapsed = time.perf_counter() - t0
+        before = compact_frame.frame_memory_mb(df)
+        after = compact_frame.frame_memory_mb(compact)
+        print(f"\n{n} rows: {before:8.1f} MB -> {after:7.1f} MB  ({before / after:.1f}x smaller, {elapsed:.2f}s)")
+        changed = {c: str(t) for c, t in compact.dtypes.items() if t != df.dtypes[c]}
+        print(f"  converted: {changed}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 500000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,90 @@
+"""
+Benchmark for the Excel reader layer (excel_reader.py) over the workbooks in data/.
+
+For every workbook it times a full read of all sheets with each available
+engine, then the narrow macro read used by the duplication checks (only the
+rule columns of "Data Core", via usecols). Each engine's frames are compared
+with openpyxl's and any sheet that differs is listed.
+
+Usage:
+    python benchmarks/excel_reader_benchmark.py
+    python benchmarks/excel_reader_benchmark.py --data-dir data --repeat 3
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import excel_reader  # noqa: E402
+
+MACRO_RULE_COLS = ["Projects", "Orig Market", "Orig Channel", "Dup Market", "Dup Channel"]
+
+
+def _engines():
+    engines = ["openpyxl"]
+    try:
+        import python_calamine  # noqa: F401
+        engines.append("calamine")
+    except ImportError:
+        pass
+    return engines
+
+
+def _best_of(repeat, fn):
+    best, out = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def _differing_sheets(reference, other):
+    diffs = []
+    for sheet, ref_df in reference.items():
+        try:
+            pd.testing.assert_frame_equal(ref_df, other[sheet])
+        except AssertionError:
+            diffs.append(sheet)
+    return diffs
+
+
+def run(data_dir, repeat):
+    engines = _engines()
+    print(f"Engines available: {engines} (selected at runtime: {excel_reader.excel_engine()})")
+
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.xls*"))):
+        name = os.path.basename(path)
+        print(f"\n{name} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+        results = {}
+        for engine in engines:
+            elapsed, frames = _best_of(repeat, lambda: excel_reader.read_excel(path, sheet_name=None, engine=engine))
+            results[engine] = frames
+            diffs = _differing_sheets(results["openpyxl"], frames) if engine != "openpyxl" else []
+            print(f"  all sheets  {engine:<9} {elapsed:7.2f}s  sheets={len(frames)}"
+                  + (f"  differs on: {diffs}" if diffs else ""))
+
+        if "Data Core" in results["openpyxl"]:
+            for engine in engines:
+                for label, usecols in (("all cols", None), ("usecols", excel_reader.columns_named(MACRO_RULE_COLS))):
+                    elapsed, _ = _best_of(repeat, lambda: excel_reader.read_excel(
+                        path, sheet_name="Data Core", header=1, dtype=str, usecols=usecols, engine=engine))
+                    print(f"  Data Core   {engine:<9} {label:<9} {elapsed:7.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.path.join(ROOT, "data"))
+    parser.add_argument("--repeat", type=int, default=1, help="report the best of N reads")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")  # openpyxl data-validation / header warnings
+    run(args.data_dir, args.repeat)
@@ -0,0 +1,124 @@
+"""
+Benchmark for overlap_duplicate_daybreak_check: original row loop ("rows")
+vs the sort-and-shift / interval-sweep engine ("vectorized").
+
+Runs both qc_checks_1 (used by the API) and the legacy qc_checks module on
+synthetic BSR schedules and reports timings plus how the outputs compare.
+
+Usage:
+    python benchmarks/overlap_check_benchmark.py
+    python benchmarks/overlap_check_benchmark.py --sizes 10000 100000 --legacy-max 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import qc_checks  # noqa: E402
+import qc_checks_1  # noqa: E402
+
+RESULT_COLS = ["Overlap_OK", "Overlap_Remark", "Duplicate_OK", "Duplicate_Remark",
+               "Daybreak_OK", "Daybreak_Remark"]
+
+
+def make_schedule(n_rows, seed=0):
+    """
+    Builds a synthetic BSR schedule: back-to-back programs per channel/day with
+    a sprinkling of overlaps, exact duplicates and late-night continuations.
+    """
+    rng = np.random.default_rng(seed)
+    n_channels = max(1, n_rows // 400)
+    n_slots = max(1, n_rows // 20)  # ~20 programs per channel/day
+
+    slot = np.sort(rng.integers(0, n_slots, n_rows))
+    channel_idx = slot % n_channels
+    day = pd.Timestamp("2025-08-01") + pd.to_timedelta(slot // n_channels, unit="D")
+
+    # Back-to-back programs; a negative gap produces an overlap with the previous one
+    duration = rng.choice([30, 45, 60, 90, 120], n_rows)
+    gap = rng.choice([0, 0, 0, 1, 5, 15, -10], n_rows)
+    step = pd.Series(duration + gap).groupby(slot).cumsum().to_numpy() - (duration + gap)
+    start_min = (6 * 60 + step) % (24 * 60)
+    end_min = np.minimum(start_min + duration, 24 * 60 - 1)
+
+    def hhmmss(minutes):
+        return pd.Series(minutes).map(lambda m: f"{m // 60:02d}:{m % 60:02d}:00").to_numpy()
+
+    df = pd.DataFrame({
+        "Market": np.array(["Spain", "Italy", "Brazil", "Mexico"])[channel_idx % 4],
+        "TV Channel": pd.Series(channel_idx).map(lambda c: f"Channel {c}").to_numpy(),
+        "Channel ID": channel_idx + 1000,
+        "Broadcaster": np.array(["BC A", "BC B", "BC C"])[channel_idx % 3],
+        "Date (UTC/GMT)": day,
+        "Program Title": rng.choice(["LaLiga Live", "LaLiga Highlights", "Studio"], n_rows),
+        "Start (UTC)": hhmmss(start_min),
+        "End (UTC)": hhmmss(end_min),
+        "Pay/Free TV": rng.choice(["Pay", "Free", "OTT"], n_rows, p=[0.6, 0.35, 0.05]),
+        "Combined": rng.choice(["Live", "Delayed"], n_rows),
+    })
+
+    # Exact duplicates (~1%)
+    n_dup = max(1, n_rows // 100)
+    df.iloc[-n_dup:] = df.iloc[:n_dup].to_numpy()
+    return df
+
+
+def _time(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return time.perf_counter() - t0, out
+
+
+def _compare(old, new):
+    """Summarises differences; the sweep may only ADD overlap flags."""
+    same = {c: bool(old[c].equals(new[c])) for c in RESULT_COLS if not c.startswith("Overlap")}
+    old_flags = ~old["Overlap_OK"].astype(bool)
+    new_flags = ~new["Overlap_OK"].astype(bool)
+    return {
+        **same,
+        "overlap_flags_rows": int(old_flags.sum()),
+        "overlap_flags_vectorized": int(new_flags.sum()),
+        "overlap_superset": bool((new_flags | ~old_flags).all()),
+        "overlap_remarks_kept": bool(old.loc[old_flags, "Overlap_Remark"].equals(new.loc[old_flags, "Overlap_Remark"])),
+    }
+
+
+def run(sizes, legacy_max=None):
+    config = json.load(open(os.path.join(ROOT, "config.json")))
+    bsr_cols = config["column_mappings"]["bsr"]
+    rules = config["qc_rules"]["overlap_check"]
+    # qc_checks keys on broadcaster/program title, which are not mapped in config.json
+    legacy_bsr_cols = {**bsr_cols, "broadcaster": ["Broadcaster"], "program_title": ["Program Title"]}
+
+    targets = [
+        ("qc_checks_1", qc_checks_1.overlap_duplicate_daybreak_check, bsr_cols),
+        ("qc_checks", qc_checks.overlap_duplicate_daybreak_check, legacy_bsr_cols),
+    ]
+
+    for n_rows in sizes:
+        df = make_schedule(n_rows)
+        for name, fn, cols in targets:
+            t_new, new = _time(fn, df, cols, rules, engine="vectorized")
+            line = f"{name:<12} rows={n_rows:>9,}  vectorized={t_new:8.2f}s"
+            if legacy_max is None or n_rows <= legacy_max:
+                t_old, old = _time(fn, df, cols, rules, engine="rows")
+                line += f"  rows={t_old:8.2f}s  speedup={t_old / t_new:6.1f}x  {_compare(old, new)}"
+            else:
+                line += "  rows=skipped"
+            print(line, flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=None,
+                        help="skip the row-loop engine above this many rows")
+    args = parser.parse_args()
+    run(args.sizes, args.legacy_max)
@@ -0,0 +1,109 @@
+"""
+Benchmark for the single-pass report writer (report_writer.py).
+
+Builds a synthetic QC result frame (base columns plus *_OK / *_Remark pairs)
+and times, per size:
+    - legacy : df.to_excel + color_excel + generate_summary_sheet (qc_checks_1)
+    - <engine>: report_writer.write_report with each available engine
+Each output is read back and compared sheet by sheet with the legacy one.
+
+Usage:
+    python benchmarks/report_writer_benchmark.py
+    python benchmarks/report_writer_benchmark.py --sizes 10000 100000 --legacy-max 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import qc_checks_1  # noqa: E402
+import report_writer  # noqa: E402
+
+FILE_RULES = {"summary_sheet_name": "Summary"}
+
+
+def make_results(n, n_checks=10, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Market": rng.choice(["Spain", "France", "Italy", "Germany"], n),
+        "TV Channel": rng.choice([f"Channel {i}" for i in range(40)], n),
+        "Date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 90, n), unit="D"),
+        "Aud Metered (000s) 3+": rng.random(n) * 100,
+        "Program Description": rng.choice(["Live match", "Highlights", "Magazine", None], n),
+    })
+    for i in range(n_checks):
+        ok = pd.Series(rng.choice([True, False, None], n, p=[0.8, 0.15, 0.05]), dtype=object)
+        df[f"Check{i}_OK"] = ok
+        df[f"Check{i}_Remark"] = np.where(ok == False, f"Check {i} failed", "")  # noqa: E712
+    return df
+
+
+def _engines():
+    engines = ["openpyxl"]
+    try:
+        import xlsxwriter  # noqa: F401
+        engines.append("xlsxwriter")
+    except ImportError:
+        pass
+    return engines
+
+
+def _legacy(path, df):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, sheet_name="QC Results")
+    qc_checks_1.color_excel(path, df)
+    qc_checks_1.generate_summary_sheet(path, df, FILE_RULES)
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def _same_sheets(path, reference):
+    """True when every sheet reads back identical to the legacy output."""
+    if reference is None:
+        return "n/a"
+    back = pd.read_excel(path, sheet_name=None)
+    try:
+        for name, ref_df in reference.items():
+            pd.testing.assert_frame_equal(back[name], ref_df)
+        return True
+    except (AssertionError, KeyError):
+        return False
+
+
+def run(sizes, legacy_max):
+    print(f"Engines available: {_engines()} (selected at runtime: {report_writer.report_engine()})")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            df = make_results(n)
+            print(f"\n{n} rows x {df.shape[1]} columns")
+            reference = None
+            if n <= legacy_max:
+                path = os.path.join(tmp, "legacy.xlsx")
+                print(f"  legacy      {_timed(lambda: _legacy(path, df)):7.2f}s")
+                reference = pd.read_excel(path, sheet_name=None)
+            for engine in _engines():
+                path = os.path.join(tmp, f"{engine}.xlsx")
+                elapsed = _timed(lambda: report_writer.write_report(
+                    path, df, "QC Results", summary=qc_checks_1.qc_summary(df), engine=engine))
+                print(f"  {engine:<11} {elapsed:7.2f}s  same data as legacy={_same_sheets(path, reference)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--legacy-max", type=int, default=50000, help="skip the legacy path above this size")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+    run(args.sizes, args.legacy_max)
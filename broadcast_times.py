@@ -0,0 +1,101 @@
+"""
+Canonical broadcast timestamps for a BSR frame.
+
+Checks comparing air times need datetime64 start/end stamps for every row,
+built from a date column and the Start / End clock times.
+parse_broadcast_times() builds them in one vectorized pass:
+    - Date_DT     : the date cell (parsed per distinct value, format="mixed"),
+                    truncated to midnight;
+    - Start_DT    : Date_DT + Start clock time;
+    - End_DT      : Date_DT + End clock time, one day later when it is earlier
+                    than the start (programs crossing midnight);
+    - Times_Valid : Start_DT and End_DT both parsed.
+Clock times are read with durations.duration_minutes(clock_only=True), so
+"HH:MM:SS" text and datetime.time cells give the same stamps.
+
+BroadcastTimesCache keeps one parse per (date, start, end) column triple and
+serves it again while those columns and the row index are unchanged, so the
+checks of a validator share one parse, and a check that edits or drops rows
+gets fresh stamps on the next read.
+"""
+import numpy as np
+import pandas as pd
+
+from durations import duration_minutes
+
+TIME_COLUMNS = ["Date_DT", "Start_DT", "End_DT", "Times_Valid"]
+MINUTES_PER_DAY = 24 * 60
+
+
+def _parse_dates(series):
+    codes, uniques = pd.factorize(series.astype(object))
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce", format="mixed")
+    dates = parsed.dt.normalize().to_numpy(dtype="datetime64[ns]")
+    stamps = np.full(len(series), np.datetime64("NaT"), dtype="datetime64[ns]")
+    stamps[codes >= 0] = dates[codes[codes >= 0]]
+    return pd.Series(stamps, index=series.index)
+
+
+def _clock_offsets(df, col):
+    """Time of day of each row as a timedelta (NaT when missing / not a clock time)."""
+    if col not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype="timedelta64[ns]")
+    minutes = duration_minutes(df[col], clock_only=True)
+    minutes = minutes.where(minutes < MINUTES_PER_DAY)
+    # Whole microseconds, so "HH:MM:SS" never picks up float rounding noise
+    return pd.to_timedelta(np.round(minutes.to_numpy() * 60e6), unit="us").to_series(index=df.index)
+
+
+def parse_broadcast_times(df, date_col="Date (UTC/GMT)", start_col="Start (UTC)", end_col="End (UTC)"):
+    """
+    DataFrame (index of df) with Date_DT, Start_DT, End_DT and Times_Valid.
+    Missing columns give NaT stamps.
+    """
+    if date_col in df.columns:
+        date_dt = _parse_dates(df[date_col])
+    else:
+        date_dt = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+
+    start_dt = date_dt + _clock_offsets(df, start_col)
+    end_dt = date_dt + _clock_offsets(df, end_col)
+    rollover = (end_dt < start_dt).to_numpy()
+    end_dt = end_dt.mask(rollover, end_dt + pd.Timedelta(days=1))
+
+    return pd.DataFrame({
+        "Date_DT": date_dt,
+        "Start_DT": start_dt,
+        "End_DT": end_dt,
+        "Times_Valid": start_dt.notna() & end_dt.notna(),
+    }, index=df.index)
+
+
+def _fingerprint(df, columns):
+    present = [c for c in columns if c in df.columns]
+    if not present:
+        return pd.util.hash_pandas_object(df.index).to_numpy()
+    return pd.util.hash_pandas_object(df[present], index=True).to_numpy()
+
+
+class BroadcastTimesCache:
+    """
+    parse_broadcast_times() results of one run, keyed by column triple and
+    checked against a hash of the source columns + index on every read.
+
+    The returned frame is shared between checks: read it, don't modify it.
+    """
+
+    def __init__(self):
+        self._entries = {}  # (date_col, start_col, end_col) -> (fingerprint, times)
+
+    def get(self, df, date_col="Date (UTC/GMT)", start_col="Start (UTC)", end_col="End (UTC)"):
+        key = (date_col, start_col, end_col)
+        fingerprint = _fingerprint(df, key)
+        entry = self._entries.get(key)
+        if entry is not None and np.array_equal(entry[0], fingerprint):
+            return entry[1]
+        times = parse_broadcast_times(df, *key)
+        self._entries[key] = (fingerprint, times)
+        return times
+
+    def clear(self):
+        self._entries.clear()
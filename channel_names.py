@@ -0,0 +1,93 @@
+"""
+Channel-name normalization shared by the validators and QC checks.
+
+Each comparison style keeps the exact rules its callers always used:
+    - "brand": upper case, bracketed parts and regional suffixes (ARG, MEX,
+      FRA, ...) removed, so channels compare by brand identity
+      (BSRValidator duplication checks);
+    - "rosco": lower case, bracketed parts and anything after a dash removed,
+      symbols turned into spaces (BSR vs ROSCO consistency check);
+    - "key"  : stripped and upper-cased (EPL filters and channel counts).
+
+normalize() results are kept in one bounded LRU cache for the whole process,
+so repeated names are normalized once across calls and requests
+(QC_CHANNEL_CACHE_SIZE entries). normalize_series() works on the distinct
+values of a column only and broadcasts the results back.
+"""
+import os
+import re
+import functools
+
+import numpy as np
+import pandas as pd
+
+CACHE_SIZE = int(os.environ.get("QC_CHANNEL_CACHE_SIZE", "65536"))
+
+_PARENTHESES = re.compile(r"\s*\([^)]*\)")
+_REGION_SUFFIXES = re.compile(
+    r"(\s+ARG|\s+BOL|\s+CHL|\s+PER|\s+SWE|\s+DE|\s+AFR|\s+PCA|\s+COL|\s+ECU|\s+URY|\s+MEX|\s+JPN|\s+LTU|\s+CHE|\s+FRA)",
+    flags=re.IGNORECASE,
+)
+_BRACKETS = re.compile(r"\(.*?\)|\[.*?\]")
+_DASHES = re.compile(r"[-–—]")
+_SYMBOLS = re.compile(r"[^0-9a-zA-Z\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _brand(text):
+    s = _PARENTHESES.sub("", text.strip().upper())
+    return _REGION_SUFFIXES.sub("", s)
+
+
+def _rosco(text):
+    s = _BRACKETS.sub("", text)
+    s = _DASHES.split(s)[0]
+    s = _SYMBOLS.sub(" ", s)
+    return _WHITESPACE.sub(" ", s).strip().lower()
+
+
+def _key(text):
+    return text.strip().upper()
+
+
+# style -> (rule applied to str(name), result for missing values or None to apply the rule to str(NaN))
+STYLES = {
+    "brand": (_brand, None),
+    "rosco": (_rosco, ""),
+    "key": (_key, None),
+}
+
+
+def _style(style):
+    try:
+        return STYLES[style]
+    except KeyError:
+        raise ValueError(f"Unknown channel normalization style: {style!r}") from None
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _cached(text, style):
+    return STYLES[style][0](text)
+
+
+def normalize(name, style="brand"):
+    """Normalized form of one channel name (memoized per distinct raw name)."""
+    missing_value = _style(style)[1]
+    if missing_value is not None and pd.isna(name):
+        return missing_value
+    return _cached(str(name), style)
+
+
+def normalize_series(series, style="brand"):
+    """normalize() over a Series, computed once per distinct value."""
+    missing_value = _style(style)[1]
+    codes, uniques = pd.factorize(series.astype(str))
+    normalized = np.array([_cached(u, style) for u in uniques], dtype=object)[codes]
+    if missing_value is not None:
+        normalized[series.isna().to_numpy()] = missing_value
+    return pd.Series(normalized, index=series.index, name=series.name)
+
+
+def cache_info():
+    """Hit/miss statistics of the shared normalization cache."""
+    return _cached.cache_info()
@@ -0,0 +1,326 @@
+"""
+Dependency graph runner for QC checks.
+
+A pipeline is declared as an ordered list of Check objects; the order is the
+one the checks would run in sequentially, and `after=` names the earlier
+checks a check depends on. run_checks() groups consecutive independent checks
+into waves:
+    - checks in a wave run concurrently on a process pool (QC_CHECK_WORKERS,
+      default: all cores). A check sees the run's base columns (the frame
+      given to run_checks) plus the columns added by the checks it declares
+      in `after=`. Those columns and the index are pickled once per wave,
+      each on its own, into a shared memory block, and every pool check loads
+      only the columns it sees. Only the columns a check adds are merged
+      back, in declaration order, so the result (values and column order) is
+      the same as running the checks one by one;
+    - local=True checks (arguments that can't be sent to another process) run
+      in this process while the pool works, on read-only views of the frame's
+      columns instead of copies;
+    - in_place=True checks (ones that rewrite existing columns) run on their
+      own, between waves.
+
+Checks in a parallel wave must therefore only *add* columns. Their numpy
+columns are read-only, so writing into one in place raises; a column that was
+replaced is compared with the original by value. Either way the change is
+reported instead of being silently dropped by the merge.
+
+Parallel runs are opt-in (QC_PARALLEL_CHECKS=1, or parallel=True); see
+benchmarks/check_graph_benchmark.py for the measured speedup. Frames smaller
+than PARALLEL_MIN_ROWS always run sequentially, since shipping them to the
+pool costs more than the checks themselves.
+"""
+import os
+import pickle
+import hashlib
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+MAX_WORKERS = int(os.environ.get("QC_CHECK_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_ROWS = int(os.environ.get("QC_PARALLEL_MIN_ROWS", "20000"))
+PARALLEL_CHECKS = os.environ.get("QC_PARALLEL_CHECKS", "0").lower() in ("1", "true", "yes")
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+class Check:
+    """
+    One node of the check graph: fn(df, *args, **kwargs) -> df.
+
+    frame_kw : pass the frame as this keyword instead of as the first argument
+               (e.g. program_category_check(bsr_path, df, ...) uses frame_kw="df")
+    after    : names of earlier checks whose output this check reads (in a parallel
+               wave, the only added columns it sees)
+    local    : run in the calling process (arguments that can't be pickled)
+    in_place : the check rewrites existing columns, so it never shares a wave
+    """
+
+    def __init__(self, name, fn, *args, after=(), local=False, in_place=False, frame_kw=None, **kwargs):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.after = tuple(after)
+        self.local = local
+        self.in_place = in_place
+        self.frame_kw = frame_kw
+
+    def run(self, df):
+        return _call(self.fn, df, self.args, self.kwargs, self.frame_kw)
+
+
+def _call(fn, df, args, kwargs, frame_kw):
+    if frame_kw:
+        return fn(*args, **{frame_kw: df}, **kwargs)
+    return fn(df, *args, **kwargs)
+
+
+def _column_values(series):
+    """The array behind a column, without a copy: numpy for numpy dtypes, else the ExtensionArray."""
+    return series.to_numpy() if isinstance(series.dtype, np.dtype) else series.array
+
+
+def _read_only_frame(columns, index):
+    """
+    Frame over {name: values} that shares their memory. Numpy columns are
+    read-only views, so a check writing into one in place raises.
+    """
+    data = {}
+    for name, values in columns.items():
+        if isinstance(values, np.ndarray):
+            values = values.view()
+            values.flags.writeable = False
+        data[name] = values
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def _fingerprint(values):
+    """
+    Cheap identity of a column's data: its buffer for (read-only) numpy
+    columns, a hash of the values for extension arrays, which can't be
+    made read-only.
+    """
+    if isinstance(values, np.ndarray):
+        return values.__array_interface__["data"][0], values.shape, values.strides, values.dtype
+    return values.dtype, hashlib.blake2b(pd.util.hash_array(values)).digest()
+
+
+def _changed(original, fingerprint, column):
+    """Whether column differs from original, whose fingerprint was taken before the check ran."""
+    if _fingerprint(_column_values(column)) == fingerprint:
+        return False
+    # A replaced read-only buffer may still hold the same values; a hash that
+    # changed means the values did
+    return not isinstance(_column_values(original), np.ndarray) or not column.equals(original)
+
+
+def _added_columns(name, fn, frame, args, kwargs, frame_kw):
+    """
+    Runs one check on frame (see _read_only_frame) and returns its row count
+    and {column: values} for the columns it added. Raises when the check
+    changed or dropped an existing column, since the merge would lose that
+    change: a numpy column whose data is no longer the same buffer is
+    compared by value, every other one is unchanged.
+    """
+    originals = {c: frame[c] for c in frame.columns}
+    before = {c: _fingerprint(_column_values(s)) for c, s in originals.items()}
+    try:
+        result = _call(fn, frame, args, kwargs, frame_kw)
+    except ValueError as e:
+        if "read-only" not in str(e):
+            raise
+        raise ValueError(f"Check '{name}' wrote into existing columns in place; "
+                         "declare it in_place=True so it runs on its own") from e
+
+    modified = [
+        c for c, original in originals.items()
+        if c not in result.columns or _changed(original, before[c], result[c])
+    ]
+    # A change in row count is reported by the merge
+    if modified and len(result) == len(frame):
+        raise ValueError(f"Check '{name}' modified existing columns {modified}; "
+                         "declare it in_place=True so it runs on its own")
+    return len(result), {c: _column_values(result[c]) for c in result.columns if c not in originals}
+
+
+class _SharedColumns:
+    """
+    The index and the columns a wave's pool checks read, each pickled once
+    into one shared memory block, so every worker loads only its own columns.
+    """
+
+    def __init__(self, df, columns):
+        parts = [pickle.dumps(df.index, protocol=pickle.HIGHEST_PROTOCOL)]
+        parts += [pickle.dumps(_column_values(df[c]), protocol=pickle.HIGHEST_PROTOCOL) for c in columns]
+        spans, offset = [], 0
+        for part in parts:
+            spans.append((offset, len(part)))
+            offset += len(part)
+        self.index_span = spans[0]
+        self.spans = dict(zip(columns, spans[1:]))
+
+        self._block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (start, size), part in zip(spans, parts):
+            self._block.buf[start:start + size] = part
+        self.name = self._block.name
+
+    def release(self):
+        self._block.close()
+        self._block.unlink()
+
+
+def _load_shared_frame(name, index_span, spans):
+    block = shared_memory.SharedMemory(name=name)
+
+    def load(span):
+        start, size = span
+        view = block.buf[start:start + size]
+        try:
+            return pickle.loads(view)
+        finally:
+            view.release()
+
+    try:
+        return _read_only_frame({c: load(span) for c, span in spans.items()}, load(index_span))
+    finally:
+        block.close()
+
+
+def _added_columns_shared(name, fn, block_name, index_span, spans, args, kwargs, frame_kw):
+    """Pool side of _added_columns: reads the check's columns from shared memory."""
+    return _added_columns(name, fn, _load_shared_frame(block_name, index_span, spans), args, kwargs, frame_kw)
+
+
+def _executor():
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            # Not "fork": the API process runs threads (request pool, job queue, cleanup)
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _EXECUTOR = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=context)
+        return _EXECUTOR
+
+
+def shutdown():
+    """Stops the worker pool (it is started again on the next parallel run)."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+            _EXECUTOR = None
+
+
+def plan_waves(checks):
+    """
+    Splits the declared checks into waves of checks that can run together.
+    Raises ValueError for duplicate names or dependencies on unknown/later checks.
+    """
+    seen = set()
+    for check in checks:
+        if check.name in seen:
+            raise ValueError(f"Duplicate check name: {check.name}")
+        missing = [dep for dep in check.after if dep not in seen]
+        if missing:
+            raise ValueError(f"Check '{check.name}' depends on {missing}, which must be declared before it")
+        seen.add(check.name)
+
+    waves, current = [], []
+    for check in checks:
+        current_names = {c.name for c in current}
+        if current and (check.in_place or current_names.intersection(check.after)):
+            waves.append(current)
+            current = []
+        if check.in_place:
+            waves.append([check])
+        else:
+            current.append(check)
+    if current:
+        waves.append(current)
+    return waves
+
+
+def _visible_columns(df, check, base, outputs):
+    """The run's base columns plus what the check's dependencies added, in frame order."""
+    wanted = set(base).union(*(outputs[dep] for dep in check.after))
+    return [c for c in df.columns if c in wanted]
+
+
+def _run_wave(df, wave, base, outputs):
+    visible = {c.name: _visible_columns(df, c, base, outputs) for c in wave}
+    pool_checks = [c for c in wave if not c.local]
+    futures = {}
+    shared = None
+    if pool_checks:
+        shipped = set().union(*(visible[c.name] for c in pool_checks))
+        shared = _SharedColumns(df, [c for c in df.columns if c in shipped])
+    try:
+        if pool_checks:
+            executor = _executor()
+            futures = {
+                c.name: executor.submit(_added_columns_shared, c.name, c.fn, shared.name, shared.index_span,
+                                        {col: shared.spans[col] for col in visible[c.name]},
+                                        c.args, c.kwargs, c.frame_kw)
+                for c in pool_checks
+            }
+
+        # Local checks run here while the pool works on the others, on
+        # read-only views of the frame's columns
+        added = {
+            c.name: _added_columns(c.name, c.fn,
+                                   _read_only_frame({col: _column_values(df[col]) for col in visible[c.name]}, df.index),
+                                   c.args, c.kwargs, c.frame_kw)
+            for c in wave if c.local
+        }
+        for name, future in futures.items():
+            added[name] = future.result()
+    finally:
+        # Wait for every pool check before the block goes away
+        for future in futures.values():
+            future.exception()
+        if shared is not None:
+            shared.release()
+
+    # New columns go on a shallow copy: the caller's frame is left as it was
+    df = df.copy(deep=False)
+    written = {}
+    for check in wave:
+        n_rows, new_columns = added[check.name]
+        if n_rows != len(df):
+            raise ValueError(f"Check '{check.name}' changed the number of rows; it can't run in parallel")
+        for col, values in new_columns.items():
+            if col in written:
+                raise ValueError(f"Checks '{written[col]}' and '{check.name}' both write column '{col}'")
+            written[col] = check.name
+            df[col] = values
+        outputs[check.name] = set(new_columns).union(*(outputs[dep] for dep in check.after))
+    return df
+
+
+def run_checks(df, checks, parallel=None):
+    """
+    Runs the checks over df and returns the resulting frame.
+    parallel: True/False to force; None follows QC_PARALLEL_CHECKS (off by
+    default), for frames of at least PARALLEL_MIN_ROWS rows when more than one
+    worker is configured.
+    """
+    waves = plan_waves(checks)
+    if parallel is None:
+        parallel = PARALLEL_CHECKS and len(df) >= PARALLEL_MIN_ROWS and MAX_WORKERS > 1
+
+    base = list(df.columns)
+    outputs = {}  # check name -> columns it and its dependencies added
+    for wave in waves:
+        if not parallel or len(wave) == 1:
+            for check in wave:
+                before = set(df.columns)
+                df = check.run(df)
+                outputs[check.name] = (set(df.columns) - before).union(*(outputs[dep] for dep in check.after))
+        else:
+            df = _run_wave(df, wave, base, outputs)
+    return df
@@ -0,0 +1,160 @@
+"""
+Column schema resolution for BSR frames.
+
+config.json's column_mappings lists, per logical field (tv_channel, date,
+start_time, ...), the header spellings it may have in a file. Instead of each
+check scanning the headers again for every field it reads, a pipeline
+resolves the whole mapping once after load:
+
+    schema = resolve_schema(df, col_map["bsr"])
+    schema.require(REQUIRED_BSR_FIELDS)      # fail fast, listing every gap
+    df = completeness_check(df, col_map["bsr"], rules, schema=schema)
+
+Header matching is case-insensitive and ignores surrounding whitespace; the
+first candidate (in config order) present in the frame wins.
+
+The market check validators (BSRValidator / EPLValidator) address columns by
+their canonical header ('TV-Channel', 'Aud Metered (000s) 3+', ...). They
+resolve MARKET_CHECK_BSR_COLUMNS once on load with canonicalize_columns(),
+which renames other accepted spellings to the canonical one.
+"""
+import logging
+
+# Fields the general QC pipeline can't run without (period, overlap/daybreak
+# and market/channel checks all key on them)
+REQUIRED_BSR_FIELDS = ("market", "tv_channel", "date", "start_time", "end_time")
+
+# Headers of the market check validators: logical field -> accepted spellings,
+# the canonical header (the one the checks use) first. Alternatives never name
+# another field's canonical header, so renaming can't clobber a column.
+MARKET_CHECK_BSR_COLUMNS = {
+    "region": ["Region"],
+    "market": ["Market"],
+    "market_id": ["Market ID"],
+    "broadcaster": ["Broadcaster"],
+    "tv_channel": ["TV-Channel", "TV Channel", "Channel"],
+    "channel_id": ["Channel ID", "ChannelID"],
+    "pay_tv": ["Pay/Free TV"],
+    "date": ["Date (UTC/GMT)", "Date(UTC/GMT)"],
+    "local_date": ["Date"],
+    "start_time": ["Start (UTC)", "Start(UTC)"],
+    "end_time": ["End (UTC)", "End(UTC)"],
+    "local_start": ["Start"],
+    "local_end": ["End"],
+    "duration": ["Duration"],
+    "program_title": ["Program Title", "Title"],
+    "program_desc": ["Program Description", "Description"],
+    "combined": ["Combined"],
+    "type_of_program": ["Type of program", "Type of programme"],
+    "event": ["Event"],
+    "competition": ["Competition"],
+    "match_day": ["Matchday", "Match Day"],
+    "fixture_desc": ["Phase / Fixture / Episode Desc."],
+    "home_team": ["Home Team", "HomeTeam"],
+    "away_team": ["Away Team", "AwayTeam"],
+    "aud_estimates": ["Aud. Estimates ['000s]", "Audience Estimates", "Aud Estimates"],
+    "aud_metered": ["Aud Metered (000s) 3+", "Aud. Metered (000s) 3+", "Audience Metered"],
+    "source": ["Source", "Audience Source", "AudienceSource"],
+}
+
+
+class SchemaError(ValueError):
+    """Required logical fields have no matching column in the file."""
+
+    def __init__(self, missing, mappings, context="BSR"):
+        self.missing = list(missing)
+        details = "; ".join(f"{field} (expected one of: {', '.join(map(str, _as_list(mappings.get(field))))})"
+                            for field in self.missing)
+        super().__init__(f"{context} is missing required columns: {details}")
+
+
+def _as_list(candidates):
+    if candidates is None:
+        return []
+    return candidates if isinstance(candidates, list) else [candidates]
+
+
+class ColumnSchema:
+    """
+    Logical field -> actual header of one frame.
+
+    schema["tv_channel"] -> "TV-Channel" (None when the file has no such column;
+    KeyError for a field that is not in the mapping, as with the config dict)
+    """
+
+    def __init__(self, columns, mappings):
+        self.mappings = dict(mappings)
+        # Normalized header -> actual header (a later duplicate wins, as in _find_column)
+        self._headers = {str(c).lower().strip(): c for c in columns}
+        self.columns = {field: self.find(candidates) for field, candidates in self.mappings.items()}
+
+    def find(self, candidates):
+        """First of the candidate header names present in the frame, or None."""
+        for cand in _as_list(candidates):
+            if cand is None:
+                continue
+            key = str(cand).lower().strip()
+            if key in self._headers:
+                return self._headers[key]
+        return None
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def get(self, field, default=None):
+        return self.columns.get(field) or default
+
+    @property
+    def missing(self):
+        """Logical fields with no matching column, in config order."""
+        return [field for field, col in self.columns.items() if col is None]
+
+    def require(self, fields, context="BSR"):
+        """Raises SchemaError naming every field of `fields` that did not resolve."""
+        missing = [field for field in fields if self.columns.get(field) is None]
+        if missing:
+            raise SchemaError(missing, self.mappings, context)
+        return self
+
+
+def resolve_schema(df, mappings, schema=None):
+    """
+    ColumnSchema of df for a column_mappings section; a schema passed in
+    (resolved once by the pipeline) is returned as-is.
+    """
+    if schema is not None:
+        return schema
+    return ColumnSchema(df.columns, mappings)
+
+
+def canonicalize_columns(df, mappings, required=(), context="BSR"):
+    """
+    Resolves mappings on df once, raising SchemaError for any of `required`
+    that has no column, and renames every resolved header to its field's
+    canonical spelling (the first candidate). Returns (df, schema of the
+    returned frame); df is returned as-is when nothing needs renaming.
+    """
+    schema = ColumnSchema(df.columns, mappings).require(required, context)
+    renames = {}
+    for field, col in schema.columns.items():
+        canonical = _as_list(mappings[field])[0]
+        if col is not None and col != canonical and canonical not in df.columns:
+            renames[col] = canonical
+    if renames:
+        logging.info(f"{context}: renamed columns {renames}")
+        df = df.rename(columns=renames)
+        schema = ColumnSchema(df.columns, mappings)
+    return df, schema
+
+
+def log_unresolved(schema, context="BSR"):
+    """Reports every unresolved optional field once, up front."""
+    if schema.missing:
+        logging.warning(f"{context}: no column found for {', '.join(schema.missing)}; "
+                        "checks reading them will report the column as missing.")
+    return schema
+
+
+def find_column(df, candidates):
+    """Case-insensitive lookup of one candidate list in df.columns (None if absent)."""
+    return ColumnSchema(df.columns, {}).find(candidates)
@@ -0,0 +1,84 @@
+"""
+Compact load mode for BSR frames.
+
+A loaded BSR keeps Market, Region, TV-Channel, Broadcaster, Type of program,
+Competition, Source, ... as Python-object strings, although most of them hold
+a few hundred distinct values over 100k+ rows. compact_frame() converts:
+    - low-cardinality text columns to categoricals;
+    - other text columns to Arrow-backed strings (NaN semantics, so
+      astype(str) and comparisons behave as for object columns) when pyarrow
+      is installed; without pyarrow they stay object.
+Columns mixing strings with other values (times, numbers, ...) are left as-is.
+
+Enable it per load (compact=True) or for every BSR load with
+QC_COMPACT_BSR=1.
+
+Checks that write new values into part of a loaded column (.loc[mask, col])
+call decompact_column() first.
+"""
+import os
+import functools
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+COMPACT_BSR = os.environ.get("QC_COMPACT_BSR", "0").lower() in ("1", "true", "yes")
+
+# A text column becomes categorical when it has at most CATEGORY_MAX_UNIQUE
+# distinct values and at most CATEGORY_MAX_RATIO distinct values per row
+CATEGORY_MAX_UNIQUE = int(os.environ.get("QC_CATEGORY_MAX_UNIQUE", "5000"))
+CATEGORY_MAX_RATIO = 0.5
+
+
+@functools.lru_cache(maxsize=None)
+def arrow_string_dtype():
+    """Arrow-backed string dtype with NaN missing values, or None without pyarrow."""
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype(storage="pyarrow", na_value=np.nan)
+    except (ImportError, TypeError):
+        return None
+
+
+def compact_frame(df, max_unique=CATEGORY_MAX_UNIQUE, max_ratio=CATEGORY_MAX_RATIO):
+    """Returns df with its pure-text columns stored as categoricals / Arrow strings."""
+    string_dtype = arrow_string_dtype()
+    converted = {}
+    for i in np.flatnonzero((df.dtypes == object).to_numpy()):
+        values = df.iloc[:, i]
+        if infer_dtype(values, skipna=True) != "string":
+            continue
+        n_unique = values.nunique(dropna=True)
+        if n_unique <= max_unique and n_unique <= max_ratio * len(values):
+            converted[i] = values.astype("category")
+        elif string_dtype is not None:
+            converted[i] = values.astype(string_dtype)
+
+    if not converted:
+        return df
+    df = df.copy(deep=False)
+    for i, values in converted.items():
+        df.isetitem(i, values)
+    return df
+
+
+def decompact_column(df, col):
+    """
+    Turns a compacted column of df (categorical / Arrow string) back into an
+    object column, in place, before a check writes values into part of it:
+    a .loc write of a value that is not one of a categorical's categories
+    raises. Plain columns are left as they are.
+    """
+    if col in df.columns and isinstance(df[col].dtype, (pd.CategoricalDtype, pd.StringDtype)):
+        df[col] = df[col].astype(object)
+
+
+def should_compact(compact):
+    """Resolves a compact=None argument to the QC_COMPACT_BSR default."""
+    return COMPACT_BSR if compact is None else compact
+
+
+def frame_memory_mb(df):
+    """Deep memory usage of df in MB."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
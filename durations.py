@@ -0,0 +1,83 @@
+"""
+Duration parsing shared by the duration-based checks (program category,
+duration limits, market/channel/program consistency, duplicated markets).
+
+duration_minutes() turns a Duration-like column into float minutes in one
+vectorized pass:
+    - numbers and numeric text are minutes ("90", 90, 90.0);
+    - clock text is H:MM[:SS[.fff]], optionally with a day prefix as written
+      by str(timedelta) ("01:30:00", "1:30", "1 days 02:00:00");
+    - datetime.time cells (how Excel time cells load) and timedeltas are
+      converted exactly;
+    - anything else (missing values, dates, free text) is NaN.
+Each distinct value is parsed once and the results are broadcast back, so a
+100k-row column with a few hundred distinct durations costs a few hundred
+parses.
+"""
+import re
+import datetime
+import numbers
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_timedelta64_dtype
+
+_CLOCK = re.compile(
+    r"^\s*(?:(?P<days>\d+)\s+days?,?\s+)?"
+    r"(?P<hours>\d+)\s*:\s*(?P<minutes>\d+)(?:\s*:\s*(?P<seconds>\d+(?:\.\d*)?))?\s*$",
+    flags=re.IGNORECASE,
+)
+
+
+def _text_minutes(texts, clock_only):
+    """Minutes for an array of strings (clock text, or numeric text unless clock_only)."""
+    texts = pd.Series(texts, dtype=object).str.strip()
+    parts = texts.str.extract(_CLOCK).apply(pd.to_numeric, errors="coerce")
+    minutes = (
+        parts["days"].fillna(0) * 1440
+        + parts["hours"] * 60
+        + parts["minutes"]
+        + parts["seconds"].fillna(0) / 60
+    )
+    if not clock_only:
+        minutes = minutes.fillna(pd.to_numeric(texts, errors="coerce"))
+    return minutes.to_numpy(dtype=float)
+
+
+def _value_minutes(values, clock_only):
+    """Minutes for an object array of distinct values."""
+    minutes = np.full(len(values), np.nan)
+    text_pos = []
+    for i, v in enumerate(values):
+        if isinstance(v, str):
+            text_pos.append(i)
+        elif isinstance(v, (datetime.timedelta, np.timedelta64)):
+            minutes[i] = pd.Timedelta(v).total_seconds() / 60
+        elif isinstance(v, datetime.time):
+            minutes[i] = v.hour * 60 + v.minute + v.second / 60 + v.microsecond / 60e6
+        elif isinstance(v, numbers.Real) and not clock_only:
+            minutes[i] = float(v)
+    if text_pos:
+        minutes[text_pos] = _text_minutes(values[text_pos], clock_only)
+    return minutes
+
+
+def duration_minutes(values, clock_only=False):
+    """
+    Float minutes for every value of a Duration-like column (NaN where the
+    value is missing or not a duration).
+    clock_only: only clock text, times and timedeltas count; bare numbers
+                are NaN (for columns where a number is not a duration)
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if is_timedelta64_dtype(series.dtype):
+        return series.dt.total_seconds() / 60
+    if is_numeric_dtype(series.dtype) and not is_bool_dtype(series.dtype):
+        if clock_only:
+            return pd.Series(np.nan, index=series.index)
+        return series.astype(float)
+
+    codes, uniques = pd.factorize(series.astype(object))
+    minutes = _value_minutes(np.asarray(uniques, dtype=object), clock_only)
+    result = np.where(codes >= 0, minutes[codes] if len(minutes) else np.nan, np.nan)
+    return pd.Series(result, index=series.index, dtype=float)
@@ -0,0 +1,58 @@
+"""
+Excel reader layer.
+
+Every workbook read in the QC pipeline goes through here so the engine is
+chosen in one place, at runtime:
+    - "calamine" (python-calamine, Rust) when it is installed;
+    - otherwise "openpyxl", which pandas opens in read_only (streaming) mode.
+
+Set QC_EXCEL_ENGINE=openpyxl (or calamine) to force an engine.
+
+Known difference: cells holding a negative time serial come back as
+datetime(1899, 12, 2x, ...) from openpyxl but as a plain time from calamine.
+"""
+import os
+import functools
+import pandas as pd
+
+ENGINE_ENV_VAR = "QC_EXCEL_ENGINE"
+
+
+@functools.lru_cache(maxsize=None)
+def excel_engine():
+    """Name of the fastest Excel engine available in this environment."""
+    forced = os.environ.get(ENGINE_ENV_VAR)
+    if forced:
+        return forced
+    try:
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        return "openpyxl"
+
+
+def columns_named(names):
+    """
+    usecols callable matching header names after strip(), since the
+    pipeline strips headers only once the sheet has been read.
+    """
+    wanted = {str(n).strip() for n in names}
+    return lambda col: str(col).strip() in wanted
+
+
+def read_excel(path, sheet_name=0, header=0, usecols=None, nrows=None, dtype=None, engine=None):
+    """pd.read_excel with the runtime-selected engine."""
+    return pd.read_excel(
+        path,
+        sheet_name=sheet_name,
+        header=header,
+        usecols=usecols,
+        nrows=nrows,
+        dtype=dtype,
+        engine=engine or excel_engine(),
+    )
+
+
+def excel_file(path, engine=None):
+    """pd.ExcelFile with the runtime-selected engine."""
+    return pd.ExcelFile(path, engine=engine or excel_engine())
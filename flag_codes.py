@@ -0,0 +1,82 @@
+"""
+Compact flag columns: one small-integer code per row plus a message table.
+
+Flag / remark columns (Completeness_Remark, QC_Dup_Channel_Existence_Flag,
+QC_Channel_Capacity_Conflict_Flag, ...) repeat a handful of long messages over
+every row. Here a flag column is a pandas Categorical: the codes are the
+per-row integer column (int8 / int16 for up to 32k messages) and the
+categories are the message table, so each distinct message is stored once and
+only expanded into text when the report is written (report_writer) or when
+the column is converted with astype(object) / astype(str).
+Comparisons (== "OK"), value_counts() and .str work as on text columns.
+
+Messages are parameterized: a check registers a template with its parameters
+(FlagCodes.code) and gets back the code of the rendered message, which is
+interned, so rows sharing a message share a code.
+
+A categorical only accepts values from its categories: assign codes with
+FlagCodes, or convert the column back with astype(object), instead of
+writing new text into it with .loc.
+"""
+import numpy as np
+import pandas as pd
+
+
+class FlagCodes:
+    """
+    Message table of one flag column. Code 0 is the ok message.
+
+        flags = FlagCodes(ok="OK")
+        codes = np.zeros(len(df), dtype=int)
+        codes[mask] = flags.code("{n} Channel(s) missing.", n=3)
+        df[FLAG_COLUMN] = flags.column(codes, df.index)
+    """
+
+    def __init__(self, ok="OK"):
+        self.messages = []
+        self._codes = {}
+        self.code(ok)
+
+    def code(self, template, **params):
+        """Code of template.format(**params) (just template without params)."""
+        message = template.format(**params) if params else template
+        code = self._codes.get(message)
+        if code is None:
+            code = self._codes[message] = len(self.messages)
+            self.messages.append(message)
+        return code
+
+    def column(self, codes, index=None):
+        """Categorical Series for an array of codes (-1 is a missing value)."""
+        values = pd.Categorical.from_codes(np.asarray(codes), categories=self.messages)
+        return pd.Series(values, index=index)
+
+    def table(self):
+        """Code -> message table (e.g. for a legend sheet)."""
+        return pd.DataFrame({"Code": range(len(self.messages)), "Message": self.messages})
+
+
+def flags_from_masks(checks, index, ok="OK", sep="; "):
+    """
+    Flag column for rows failing any of several conditions.
+
+    checks: list of (boolean mask, text); a row's message is the texts of the
+            conditions it fails, in list order, joined with sep; rows failing
+            none get ok.
+    Each combination of failed conditions is rendered once, whatever the
+    number of rows sharing it.
+    """
+    if len(checks) > 62:
+        raise ValueError("flags_from_masks supports at most 62 conditions")
+    pattern = np.zeros(len(index), dtype=np.int64)
+    for bit, (mask, _) in enumerate(checks):
+        pattern |= np.asarray(mask, dtype=bool).astype(np.int64) << bit
+
+    row_codes, patterns = pd.factorize(pattern)
+    flags = FlagCodes(ok=ok)
+    pattern_codes = np.array([
+        flags.code(sep.join(text for bit, (_, text) in enumerate(checks) if p >> bit & 1) or ok)
+        for p in patterns
+    ], dtype=np.int64)
+    return flags.column(pattern_codes[row_codes], index)
+
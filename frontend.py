@@ -3,6 +3,7 @@ import requests
 import pandas as pd
 from io import BytesIO
 import os
+import time
 
 # --- FastAPI Configuration (UNTOUCHED) ---
 # Update this if your FastAPI server is running on a different port or host
@@ -10,6 +11,71 @@ import os
 BACKEND_BASE_URL = os.environ.get("STREAMLIT_BACKEND_URL", "http://localhost:8000")
 BACKEND_URL = BACKEND_BASE_URL + "/api"
 
+# --- Background jobs ---
+# QC runs are queued on the backend (/api/jobs/...) and polled until they finish,
+# so no request has to stay open for the whole run.
+JOB_POLL_SECONDS = 2
+JOB_TIMEOUT_SECONDS = int(os.environ.get("STREAMLIT_JOB_TIMEOUT", "3600"))
+REQUEST_TIMEOUT = 60
+
+
+class JobError(Exception):
+    """The backend refused the job, or the job failed / timed out."""
+
+    def __init__(self, detail, status_code=None):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+def _error_detail(response, default="Unknown error occurred on the backend."):
+    try:
+        return response.json().get("detail", default)
+    except requests.JSONDecodeError:
+        return response.text
+
+
+def run_backend_job(endpoint, files, data=None):
+    """
+    Queues /api/jobs/<endpoint>, shows its progress and returns the finished job's
+    status (download_url, plus e.g. the market check summaries).
+    Raises JobError / requests.RequestException.
+    """
+    response = requests.post(f"{BACKEND_URL}/jobs/{endpoint}", files=files, data=data, timeout=REQUEST_TIMEOUT)
+    if response.status_code != 202:
+        raise JobError(_error_detail(response), response.status_code)
+    job_id = response.json()["job_id"]
+
+    progress_bar = st.progress(0.0, text="Waiting for a worker")
+    deadline = time.time() + JOB_TIMEOUT_SECONDS
+    while True:
+        response = requests.get(f"{BACKEND_URL}/jobs/{job_id}", timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            raise JobError(_error_detail(response), response.status_code)
+        job = response.json()
+        progress_bar.progress(job.get("progress") or 0.0, text=job.get("message") or job["status"])
+        if job["status"] == "succeeded":
+            return job
+        if job["status"] == "failed":
+            raise JobError(job.get("error") or "The job failed on the backend.")
+        if time.time() > deadline:
+            raise JobError(f"The job did not finish within {JOB_TIMEOUT_SECONDS // 60} minutes (job id {job_id}).")
+        time.sleep(JOB_POLL_SECONDS)
+
+
+def download_job_result(job, default_filename):
+    """(filename, content) of a finished job's output file."""
+    response = requests.get(f"{BACKEND_BASE_URL}{job['download_url']}", timeout=REQUEST_TIMEOUT)
+    if response.status_code != 200:
+        raise JobError(_error_detail(response), response.status_code)
+    output_filename = default_filename
+    content_disposition = response.headers.get("Content-Disposition")
+    if content_disposition:
+        try:
+            output_filename = content_disposition.split('filename=')[1].strip('"')
+        except IndexError:
+            pass
+    return output_filename, response.content
+
 LOGO_PATH_1 = "images/nielsen1.png"
 LOGO_PATH_2 = "images/nielsen2.png"
 LOGO_PATH_3 = "images/nielsen sports.png"
@@ -318,34 +384,22 @@ with main_qc_tab:
                 # data_file logic removed
 
                 try:
-                    # 2. Make the POST request to YOUR new endpoint
-                    response = requests.post(f"{BACKEND_URL}/run_general_qc", files=files, timeout=600) 
-
-                    if response.status_code == 200:
-                        # 3. Extract filename and serve the downloaded file
-                        content_disposition = response.headers.get("Content-Disposition")
-                        output_filename = "General_QC_Result.xlsx" 
-                        if content_disposition:
-                            try:
-                                output_filename = content_disposition.split('filename=')[1].strip('"')
-                            except IndexError:
-                                pass 
-                        
-                        st.success("✅ General QC completed successfully!")
-                        st.download_button(
-                            label="📥 Download General QC Result",
-                            data=response.content, 
-                            file_name=output_filename,
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                    else:
-                        # Handle backend errors
-                        try:
-                            error_detail = response.json().get("detail", "Unknown error occurred on the backend.")
-                        except requests.JSONDecodeError:
-                            error_detail = response.text
-                            
-                        st.error(f"❌ Backend Error ({response.status_code}): {error_detail}")
+                    # 2. Queue the job and wait for it (polled, see run_backend_job)
+                    job = run_backend_job("run_general_qc", files)
+
+                    # 3. Fetch and serve the result file
+                    output_filename, content = download_job_result(job, "General_QC_Result.xlsx")
+                    st.success("✅ General QC completed successfully!")
+                    st.download_button(
+                        label="📥 Download General QC Result",
+                        data=content, 
+                        file_name=output_filename,
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+
+                except JobError as e:
+                    # Handle backend errors
+                    st.error(f"❌ Backend Error ({e.status_code or 'job'}): {e}")
 
                 except requests.exceptions.RequestException as e:
                     st.error(f"❌ Connection or Timeout Error: Could not reach the backend. Check if FastAPI is running. Error: {e}")
@@ -386,30 +440,20 @@ with laliga_qc_tab:
                 }
                 
                 try:
-                    # 2. Make the POST request to the Laliga QC endpoint
-                    response = requests.post(f"{BACKEND_URL}/run_laliga_qc", files=files, timeout=600) 
-
-                    if response.status_code == 200:
-                        content_disposition = response.headers.get("Content-Disposition")
-                        output_filename = "Laliga_QC_Result.xlsx"
-                        if content_disposition:
-                            try:
-                                output_filename = content_disposition.split('filename=')[1].strip('"')
-                            except IndexError: pass 
-                        
-                        st.success("✅ Laliga QC completed successfully!")
-                        st.download_button(
-                            label="📥 Download Laliga QC Result",
-                            data=response.content, 
-                            file_name=output_filename,
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                    else:
-                        try:
-                            error_detail = response.json().get("detail", "Unknown error.")
-                        except requests.JSONDecodeError:
-                            error_detail = response.text
-                        st.error(f"❌ Backend Error ({response.status_code}): {error_detail}")
+                    # 2. Queue the Laliga QC job and wait for it
+                    job = run_backend_job("run_laliga_qc", files)
+
+                    output_filename, content = download_job_result(job, "Laliga_QC_Result.xlsx")
+                    st.success("✅ Laliga QC completed successfully!")
+                    st.download_button(
+                        label="📥 Download Laliga QC Result",
+                        data=content, 
+                        file_name=output_filename,
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+
+                except JobError as e:
+                    st.error(f"❌ Backend Error ({e.status_code or 'job'}): {e}")
 
                 except requests.exceptions.RequestException as e:
                     st.error(f"❌ Connection Error: {e}")
@@ -528,109 +572,98 @@ with f1_tab:
                 data = {'checks': active_checks} 
 
                 try:
-                    # 3. Call the backend endpoint
-                    response = requests.post(
-                        f"{BACKEND_URL}/market_check_and_process", 
-                        files=files, 
-                        data=data,
-                        timeout=600
-                    )
+                    # 3. Queue the checks on the backend and wait for them
+                    result_json = run_backend_job("market_check_and_process", files, data=data)
+
+                    # 4. Success: Handle the finished job's status
+                    try:
+                        summaries = result_json.get("summaries", [])
+                        download_url_suffix = result_json.get("download_url")
+                        message = f"Successfully applied {len(active_checks)} market checks. Processed file is ready for download."
+                        
+                        # Construct the full download URL using the base URL
+                        full_download_url = f"{BACKEND_BASE_URL}{download_url_suffix}"
 
-                    if response.status_code == 200:
-                        # 4. Success: Handle the JSON response (unchanged)
-                        try:
-                            result_json = response.json()
-                            summaries = result_json.get("summaries", [])
-                            download_url_suffix = result_json.get("download_url")
-                            message = result_json.get("message", "Processing complete.")
+                        st.success(f"✅ Checks completed successfully! {message}")
+                        
+                        # --- Display Summaries ---
+                        st.subheader("Processing Summary")
+                        if summaries:
+                            # ... (summary display logic unchanged) ...
+                            df_summary = pd.DataFrame(summaries)
                             
-                            # Construct the full download URL using the base URL
-                            full_download_url = f"http://localhost:8000{download_url_suffix}"
+                            df_summary_display = df_summary.copy()
 
-                            st.success(f"✅ Checks completed successfully! {message}")
-                            
-                            # --- Display Summaries ---
-                            st.subheader("Processing Summary")
-                            if summaries:
-                                # ... (summary display logic unchanged) ...
-                                df_summary = pd.DataFrame(summaries)
+                            if 'details' in df_summary.columns:
                                 
-                                df_summary_display = df_summary.copy()
-
-                                if 'details' in df_summary.columns:
-                                    
-                                    df_summary_display['Market'] = df_summary['details'].apply(
-                                        lambda d: d.get('market_affected', d.get('markets_context', 'Global/N/A'))
-                                    )
-                                    
-                                    def get_change_count(d):
-                                        if 'rows_removed' in d: return d['rows_removed']
-                                        if 'total_issues_flagged' in d: return d['total_issues_flagged']
-                                        if 'rows_added' in d: return d['rows_added']
-                                        if 'broadcasters_missing' in d: return d['broadcasters_missing'] 
-                                        return 0
-                                        
-                                    df_summary_display['Change Count'] = df_summary['details'].apply(get_change_count)
-                                    
-                                    df_summary_display = df_summary_display.rename(columns={
-                                        "description": "Operation", 
-                                        "status": "Status"
-                                    })
+                                df_summary_display['Market'] = df_summary['details'].apply(
+                                    lambda d: d.get('market_affected', d.get('markets_context', 'Global/N/A'))
+                                )
+                                
+                                def get_change_count(d):
+                                    if 'rows_removed' in d: return d['rows_removed']
+                                    if 'total_issues_flagged' in d: return d['total_issues_flagged']
+                                    if 'rows_added' in d: return d['rows_added']
+                                    if 'broadcasters_missing' in d: return d['broadcasters_missing'] 
+                                    return 0
                                     
-                                    df_summary_display = df_summary_display[[
-                                        'Status', 
-                                        'Operation', 
-                                        'Market', 
-                                        'Change Count', 
-                                        'check_key'
-                                    ]].set_index('check_key')
-                                else:
-                                    df_summary_display = df_summary_display.rename(columns={
-                                        "description": "Operation", 
-                                        "status": "Status"
-                                    })
-                                    if 'check_key' in df_summary_display.columns:
-                                            df_summary_display = df_summary_display[['Status', 'Operation', 'check_key']].set_index('check_key')
-                                            
-                                st.dataframe(df_summary_display, use_container_width=True)
+                                df_summary_display['Change Count'] = df_summary['details'].apply(get_change_count)
                                 
-                                # --- Display Duplicates Dataframe (UNCHANGED) ---
-                                dupe_summary = next((s for s in summaries if s.get('check_key') == 'check_italy_mexico' and s['details'].get('duplicate_data')), None)
+                                df_summary_display = df_summary_display.rename(columns={
+                                    "description": "Operation", 
+                                    "status": "Status"
+                                })
                                 
-                                if dupe_summary and dupe_summary['details']['duplicate_data']:
-                                    duplicate_data = dupe_summary['details']['duplicate_data']
-                                    st.subheader("⚠️ Duplicate Rows Found and Consolidated (Italy/Mexico)")
-                                    
-                                    duplicates_df = pd.DataFrame(duplicate_data)
-                                    st.dataframe(duplicates_df, use_container_width=True)
-                                    st.caption(
-                                        f"The table above shows {len(duplicates_df)} rows involved in the duplicate sets (including the one kept). "
-                                        f"**{dupe_summary['details'].get('rows_removed', 0)}** rows were removed."
-                                    )
-
+                                df_summary_display = df_summary_display[[
+                                    'Status', 
+                                    'Operation', 
+                                    'Market', 
+                                    'Change Count', 
+                                    'check_key'
+                                ]].set_index('check_key')
                             else:
-                                st.info("No specific operational summaries were returned.")
-
-                            # --- Provide Download Button (UNCHANGED) ---
-                            if download_url_suffix:
-                                st.markdown("---")
-                                st.markdown(
-                                    f'### 📥 Download Processed File <a href="{full_download_url}" download>Click Here to Download</a>',
-                                    unsafe_allow_html=True
+                                df_summary_display = df_summary_display.rename(columns={
+                                    "description": "Operation", 
+                                    "status": "Status"
+                                })
+                                if 'check_key' in df_summary_display.columns:
+                                        df_summary_display = df_summary_display[['Status', 'Operation', 'check_key']].set_index('check_key')
+                                        
+                            st.dataframe(df_summary_display, use_container_width=True)
+                            
+                            # --- Display Duplicates Dataframe (UNCHANGED) ---
+                            dupe_summary = next((s for s in summaries if s.get('check_key') == 'check_italy_mexico' and s['details'].get('duplicate_data')), None)
+                            
+                            if dupe_summary and dupe_summary['details']['duplicate_data']:
+                                duplicate_data = dupe_summary['details']['duplicate_data']
+                                st.subheader("⚠️ Duplicate Rows Found and Consolidated (Italy/Mexico)")
+                                
+                                duplicates_df = pd.DataFrame(duplicate_data)
+                                st.dataframe(duplicates_df, use_container_width=True)
+                                st.caption(
+                                    f"The table above shows {len(duplicates_df)} rows involved in the duplicate sets (including the one kept). "
+                                    f"**{dupe_summary['details'].get('rows_removed', 0)}** rows were removed."
                                 )
-                            else:
-                                st.warning("Processed file download link was not generated. Check backend logs.")
 
-                        except (requests.JSONDecodeError, KeyError) as e:
-                            st.error(f"❌ Failed to parse JSON response from backend. Error: {e}")
-                        
-                    else:
-                        # 5. Handle Backend Error
-                        try:
-                            error_detail = response.json().get("detail", "Unknown error occurred during check execution.")
-                        except requests.JSONDecodeError:
-                            error_detail = response.text
-                        st.error(f"❌ Backend Processing Error ({response.status_code}): {error_detail}")
+                        else:
+                            st.info("No specific operational summaries were returned.")
+
+                        # --- Provide Download Button (UNCHANGED) ---
+                        if download_url_suffix:
+                            st.markdown("---")
+                            st.markdown(
+                                f'### 📥 Download Processed File <a href="{full_download_url}" download>Click Here to Download</a>',
+                                unsafe_allow_html=True
+                            )
+                        else:
+                            st.warning("Processed file download link was not generated. Check backend logs.")
+
+                    except (requests.JSONDecodeError, KeyError) as e:
+                        st.error(f"❌ Failed to parse JSON response from backend. Error: {e}")
+                    
+                except JobError as e:
+                    # 5. Handle Backend Error
+                    st.error(f"❌ Backend Processing Error ({e.status_code or 'job'}): {e}")
 
                 except requests.exceptions.RequestException as e:
                     st.error(f"❌ Connection Error: Could not reach the backend. Error: {e}")
\ No newline at end of file
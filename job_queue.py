@@ -0,0 +1,171 @@
+"""
+Background job queue for long QC runs.
+
+A submitted job gets an id straight away and runs on a bounded thread pool
+(QC_JOB_WORKERS, default 2). Job state (status, progress, message, result
+file, summaries, error) lives in a local SQLite database (QC_JOB_DB), so a
+restart keeps finished results; jobs that were still queued or running when
+the server stopped are marked failed on the next start (so run the API as a
+single process, e.g. one uvicorn worker, when jobs are used).
+
+Job functions are called as fn(progress, *args) and report with
+progress(fraction, message). Their return value is a dict that may hold
+"result_path" (file served by the result endpoint) and any JSON-serializable
+extras (e.g. "summaries").
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+MAX_WORKERS = int(os.environ.get("QC_JOB_WORKERS", "2"))
+
+
+class JobStore:
+    """SQLite-backed job table. One short-lived connection per call, so it is thread safe."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    result_path TEXT,
+                    result_json TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def create(self, job_id, kind):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, progress, message, created_at, updated_at) "
+                "VALUES (?, ?, ?, 0, ?, ?, ?)",
+                (job_id, kind, QUEUED, "Waiting for a worker", now, now),
+            )
+
+    def update(self, job_id, **fields):
+        if not fields:
+            return
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        """Job row as a dict (result_json decoded into 'result'), or None."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job.pop("result_json") or "{}")
+        return job
+
+    def fail_unfinished(self, reason):
+        """Marks jobs left queued/running by a previous process as failed."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?)",
+                (FAILED, reason, time.time(), QUEUED, RUNNING),
+            )
+
+    def purge(self, max_age_hours):
+        """Deletes finished jobs (and their result files) older than max_age_hours."""
+        cutoff = time.time() - max_age_hours * 3600
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, result_path FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (SUCCEEDED, FAILED, cutoff),
+            ).fetchall()
+            for job_id, result_path in rows:
+                if result_path and os.path.exists(result_path):
+                    try:
+                        os.remove(result_path)
+                        if not os.listdir(os.path.dirname(result_path)):
+                            os.rmdir(os.path.dirname(result_path))
+                    except OSError as e:
+                        print(f"⚠️ Error deleting job result {result_path}: {e}")
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(rows)
+
+
+class JobQueue:
+    """Runs submitted jobs on a bounded worker pool and records their state in a JobStore."""
+
+    def __init__(self, store, max_workers=MAX_WORKERS):
+        self.store = store
+        self.store.fail_unfinished("Interrupted by a server restart")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="qc-job")
+
+    @staticmethod
+    def new_job_id():
+        return uuid.uuid4().hex
+
+    def submit(self, kind, fn, *args, job_id=None, cleanup=None):
+        """
+        Queues fn(progress, *args) and returns the job id.
+        job_id: id reserved with new_job_id() (e.g. to name the job's folders); generated if omitted.
+        cleanup: optional callable run after the job finishes (e.g. removing its uploads).
+        """
+        job_id = job_id or self.new_job_id()
+        self.store.create(job_id, kind)
+        try:
+            self._executor.submit(self._run, job_id, fn, args, cleanup)
+        except Exception as e:
+            # Not queued (e.g. the pool is shut down): cleanup is left to the caller
+            self.store.update(job_id, status=FAILED, message="Failed", error=str(e))
+            raise
+        return job_id
+
+    def _run(self, job_id, fn, args, cleanup):
+        self.store.update(job_id, status=RUNNING, message="Started")
+
+        def progress(fraction, message=None):
+            self.store.update(job_id, progress=round(min(max(fraction, 0.0), 1.0), 3), message=message)
+
+        try:
+            result = dict(fn(progress, *args) or {})
+            result_path = result.pop("result_path", None)
+            self.store.update(
+                job_id,
+                status=SUCCEEDED,
+                progress=1.0,
+                message="Finished",
+                result_path=result_path,
+                result_json=json.dumps(result, default=str),
+            )
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.store.update(job_id, status=FAILED, message="Failed", error=str(e))
+        finally:
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception as e:
+                    print(f"Error cleaning up after job {job_id}: {e}")
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,52 @@
+"""
+Compiled keyword matching for the keyword lists in config.json
+(domestic_league_keywords, client_check.keywords, highlight_keywords,
+magazine_keywords, ...).
+
+A keyword list is compiled once into a single case-insensitive regex
+alternation (cached per list), and a whole column is matched in one
+vectorized pass instead of testing every keyword against every row in Python.
+Matching is case-insensitive substring search, i.e. the same as
+`any(kw.lower() in str(x).lower() for kw in keywords)`.
+"""
+import re
+import functools
+
+import numpy as np
+import pandas as pd
+
+_NEVER = re.compile(r"(?!)")
+
+
+@functools.lru_cache(maxsize=128)
+def _compiled(keywords, word_start, literal):
+    if not keywords:
+        return _NEVER
+    parts = [re.escape(kw) if literal else f"(?:{kw})" for kw in keywords]
+    pattern = "|".join(parts)
+    if word_start:
+        pattern = rf"\b(?:{pattern})"
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def keyword_regex(keywords, word_start=False, literal=True):
+    """
+    Compiled alternation for a keyword list.
+    word_start: keywords must start at a word boundary (r"\\b" + kw)
+    literal   : escape the keywords; False treats them as regex fragments
+                (left as written: lower-casing would turn \\D into \\d, ...;
+                the pattern is case-insensitive anyway)
+    """
+    keywords = tuple(str(kw).lower() if literal else str(kw) for kw in keywords)
+    return _compiled(keywords, word_start, literal)
+
+
+def contains_any(series, keywords, word_start=False, literal=True):
+    """
+    Boolean array: True where the cell contains any of the keywords.
+    Missing values are matched as empty text; stringify the column first to
+    match them as "nan".
+    """
+    text = np.where(series.isna(), "", series.astype(str).str.lower())
+    regex = keyword_regex(keywords, word_start=word_start, literal=literal)
+    return pd.Series(text, index=series.index, dtype=object).str.contains(regex, na=False).to_numpy(dtype=bool)
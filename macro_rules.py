@@ -0,0 +1,180 @@
+"""
+Compiled macro duplication rules ("Data Core" sheet of the BSA Market Duplicator).
+
+The macro workbook changes rarely but is read on every request, so the rule
+table is compiled once per file *content* (SHA-256) and kept:
+    - in an in-process LRU (MACRO_LRU_SIZE entries), and
+    - on disk as a pickle under QC_MACRO_CACHE_DIR (default: .cache/macro_rules),
+so repeat requests, and restarts, skip Excel parsing entirely.
+
+Each compiled index hands out per-project rule sets (ProjectRules) with
+normalized market/channel keys and (Orig Market, Dup Market) groupings.
+"""
+import os
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import excel_reader
+import upload_store
+
+# Same logical names as config.json -> column_mappings -> macro
+MACRO_COLUMNS = {
+    "projects": "Projects",
+    "orig_market": "Orig Market",
+    "orig_channel": "Orig Channel",
+    "dup_market": "Dup Market",
+    "dup_channel": "Dup Channel",
+}
+MACRO_LRU_SIZE = 8
+CACHE_DIR = os.environ.get(
+    "QC_MACRO_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "macro_rules"),
+)
+ARTIFACT_VERSION = 1  # bump when the compiled table layout changes
+
+_LRU = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 of the file contents, read in chunks."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def content_digest(path):
+    """
+    SHA-256 of the file; files inside the content-addressed upload store
+    (upload_store.py) are already named by it, so they are not re-read.
+    """
+    return upload_store.stored_digest(path) or file_digest(path)
+
+
+class ProjectRules:
+    """
+    Duplication rules of one project (rows whose 'Projects' cell matches the
+    project keyword), in macro order.
+
+    rules        : rule columns as stripped strings (original case)
+    keys(case)   : copy of the rule columns normalized to "upper" or "lower"
+    market_pairs : {(ORIG MARKET, DUP MARKET): [DUP CHANNEL, ...]} on upper keys,
+                   pairs sorted, channels unique in macro order
+    """
+
+    def __init__(self, rules, columns):
+        self.rules = rules
+        self.columns = columns
+        self._keys = {}
+
+        upper = self.keys("upper")
+        orig_mkt, dup_mkt, dup_ch = columns["orig_market"], columns["dup_market"], columns["dup_channel"]
+        self.market_pairs = {}
+        if not upper.empty and all(c in upper.columns for c in (orig_mkt, dup_mkt, dup_ch)):
+            for pair, group in upper.groupby([orig_mkt, dup_mkt]):
+                self.market_pairs[pair] = list(group[dup_ch].unique())
+
+    @property
+    def empty(self):
+        return self.rules.empty
+
+    def keys(self, case="upper"):
+        if case not in self._keys:
+            normalized = pd.DataFrame(index=self.rules.index)
+            for role, col in self.columns.items():
+                if role == "projects" or col not in self.rules.columns:
+                    continue
+                values = self.rules[col].astype(str).str.strip()
+                normalized[col] = values.str.upper() if case == "upper" else values.str.lower()
+            self._keys[case] = normalized
+        # Callers add helper columns to the frame they get, so never hand out the cached one
+        return self._keys[case].copy()
+
+
+class MacroRuleIndex:
+    """Rule table of one macro file, with per-project rule sets compiled on demand."""
+
+    def __init__(self, table, columns, digest):
+        self.table = table
+        self.columns = columns
+        self.digest = digest
+        self._projects = {}
+        self._lock = threading.Lock()
+
+    def project(self, keyword):
+        """Rules whose 'Projects' cell contains keyword (case-insensitive regex, as before)."""
+        with self._lock:
+            if keyword not in self._projects:
+                proj_col = self.columns["projects"]
+                mask = self.table[proj_col].astype(str).str.contains(keyword, case=False, na=False)
+                self._projects[keyword] = ProjectRules(self.table[mask], self.columns)
+            return self._projects[keyword]
+
+
+def _artifact_path(key):
+    name = hashlib.sha256(repr((ARTIFACT_VERSION,) + key).encode()).hexdigest()[:32]
+    return os.path.join(CACHE_DIR, f"{name}.pkl")
+
+
+def _read_artifact(key):
+    path = _artifact_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path)
+    except Exception as e:
+        print(f"Ignoring unreadable macro rule artifact {path}: {e}")
+        return None
+
+
+def _write_artifact(key, table):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _artifact_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        table.to_pickle(tmp_path, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Could not persist macro rule artifact: {e}")
+
+
+def _parse_macro(macro_path, sheet_name, header, columns):
+    table = excel_reader.read_excel(
+        macro_path, sheet_name=sheet_name, header=header, dtype=str,
+        usecols=excel_reader.columns_named(columns.values())
+    )
+    table.columns = [str(c).strip() for c in table.columns]
+    return table.reset_index(drop=True)
+
+
+def load_macro_rule_index(macro_path, sheet_name="Data Core", header=1, columns=None):
+    """
+    Returns the compiled MacroRuleIndex for macro_path. Only the first request
+    for a given file content parses the workbook.
+    """
+    columns = dict(columns or MACRO_COLUMNS)
+    key = (content_digest(macro_path), sheet_name, header, tuple(sorted(columns.items())))
+
+    with _LOCK:
+        if key in _LRU:
+            _LRU.move_to_end(key)
+            return _LRU[key]
+
+    table = _read_artifact(key)
+    if table is None:
+        table = _parse_macro(macro_path, sheet_name, header, columns)
+        _write_artifact(key, table)
+    index = MacroRuleIndex(table, columns, key[0])
+
+    with _LOCK:
+        index = _LRU.setdefault(key, index)
+        _LRU.move_to_end(key)
+        while len(_LRU) > MACRO_LRU_SIZE:
+            _LRU.popitem(last=False)
+    return index
@@ -6,6 +6,13 @@ import logging
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 from openpyxl.utils.dataframe import dataframe_to_rows
+import report_writer
+from compact_frame import compact_frame, should_compact
+from keyword_matcher import contains_any
+from durations import duration_minutes
+from sequential_gaps import sequential_gaps
+from flag_codes import flags_from_masks
+from column_schema import find_column, resolve_schema
 
 # Removed logging.basicConfig - it's now handled by app.py
 DATE_FORMAT = "%Y-%m-%d"
@@ -21,18 +28,10 @@ def _find_column(df, candidates):
     Case-insensitive lookup for a column in df.columns.
     candidates: list of possible header names (strings) from config.
     Returns first matching actual column name or None.
+    For config fields read by the BSR checks, resolve the mapping once with
+    column_schema.resolve_schema() instead.
     """
-    if not isinstance(candidates, list):
-        candidates = [candidates] # Handle single-string entries
-        
-    lower_map = {c.lower().strip(): c for c in df.columns}
-    for cand in candidates:
-        if cand is None:
-            continue
-        key = cand.lower().strip()
-        if key in lower_map:
-            return lower_map[key]
-    return None
+    return find_column(df, candidates)
 
 
 def _is_present(val):
@@ -58,37 +57,14 @@ def _is_present(val):
         return False
     return True
 
-def parse_duration_to_minutes(duration_series):
-    results = []
-    for item in duration_series:
-        if pd.isna(item):
-            results.append(np.nan)
-            continue
-        if isinstance(item, (int, float)):
-            results.append(float(item))
-            continue
-        s = str(item).strip()
-        try:
-            num = float(s)
-            results.append(num)
-            continue
-        except ValueError:
-            pass
-        parts = s.split(':')
-        if len(parts) >= 2:
-            try:
-                hours = float(re.sub(r"[^0-9.]", "", parts[0]))
-                minutes = float(re.sub(r"[^0-9.]", "", parts[1]))
-                seconds = 0.0
-                if len(parts) >= 3:
-                    seconds = float(re.sub(r"[^0-9.]", "", parts[2]))
-                total_minutes = (hours * 60) + minutes + (seconds / 60)
-                results.append(total_minutes)
-            except (ValueError, IndexError):
-                results.append(np.nan)
-        else:
-            results.append(np.nan)
-    return pd.Series(results, index=duration_series.index)
+
+def _present_mask(series):
+    """
+    Column-wise equivalent of _is_present: returns a boolean Series that is
+    True wherever _is_present(val) would be True for the same cell.
+    """
+    text = series.astype(str).str.strip().str.lower()
+    return series.notna() & ~text.isin(["", "nan", "none"])
 
 
 # ----------------------------- 1️⃣ Detect Monitoring Period -----------------------------
@@ -154,17 +130,24 @@ def detect_header_row(bsr_path, bsr_cols):
     raise ValueError("Could not detect header row in BSR file.")
 
 
-def load_bsr(bsr_path, bsr_cols):
+def load_bsr(bsr_path, bsr_cols, compact=None):
+    """
+    compact: store text columns as categoricals / Arrow strings
+             (compact_frame.py); None follows QC_COMPACT_BSR.
+    """
     header_row = detect_header_row(bsr_path, bsr_cols)
     df = pd.read_excel(bsr_path, header=header_row)
     df.columns = [str(c).strip() for c in df.columns]
+    if should_compact(compact):
+        df = compact_frame(df)
     return df
 
 
 # ----------------------------- 3️⃣ Period Check -----------------------------
-def period_check(df, start_date, end_date, bsr_cols):
+def period_check(df, start_date, end_date, bsr_cols, schema=None):
     
-    date_col = _find_column(df, bsr_cols.get('date', ['date']))
+    schema = resolve_schema(df, bsr_cols, schema)
+    date_col = schema['date'] if 'date' in schema.columns else schema.find(['date'])
     
     if not date_col:
         logging.warning("Period Check: 'date' column not found.")
@@ -180,19 +163,29 @@ def period_check(df, start_date, end_date, bsr_cols):
 
 
 # ----------------------------- 4️⃣ Completeness Check -----------------------------
-def completeness_check(df, bsr_cols, rules):
+def completeness_check(df, bsr_cols, rules, engine="vectorized", schema=None):
+    """
+    Flags rows missing mandatory fields, audience values or home/away teams.
+
+    engine: "vectorized" (default) builds presence masks once per column;
+            "rows" keeps the original row-by-row loop, for diffing results.
+    Both engines produce identical Completeness_OK / Completeness_Remark columns
+    (the vectorized remark is a flag-code categorical, see flag_codes.py).
+    schema: ColumnSchema resolved once by the pipeline (column_schema.py)
+    """
     
     # --- Map logical names to actual columns (from config) ---
+    schema = resolve_schema(df, bsr_cols, schema)
     colmap = {
-        "tv_channel": _find_column(df, bsr_cols['tv_channel']),
-        "channel_id": _find_column(df, bsr_cols['channel_id']),
-        "type_of_program": _find_column(df, bsr_cols['type_of_program']),
-        "match_day": _find_column(df, bsr_cols['match_day']),
-        "home_team": _find_column(df, bsr_cols['home_team']),
-        "away_team": _find_column(df, bsr_cols['away_team']),
-        "aud_estimates": _find_column(df, bsr_cols['aud_estimates']),
-        "aud_metered": _find_column(df, bsr_cols['aud_metered']),
-        "source": _find_column(df, bsr_cols['source'])
+        "tv_channel": schema['tv_channel'],
+        "channel_id": schema['channel_id'],
+        "type_of_program": schema['type_of_program'],
+        "match_day": schema['match_day'],
+        "home_team": schema['home_team'],
+        "away_team": schema['away_team'],
+        "aud_estimates": schema['aud_estimates'],
+        "aud_metered": schema['aud_metered'],
+        "source": schema['source']
     }
 
     # --- Initialize result columns
@@ -203,6 +196,14 @@ def completeness_check(df, bsr_cols, rules):
     live_types = set(rules.get('live_types', ['live', 'repeat', 'delayed']))
     relaxed_types = set(rules.get('relaxed_types', ['highlights']))
 
+    if engine == "rows":
+        return _completeness_rows(df, colmap, live_types, relaxed_types)
+    if engine != "vectorized":
+        raise ValueError(f"Unknown completeness engine: {engine}")
+    return _completeness_vectorized(df, colmap, live_types, relaxed_types)
+
+
+def _completeness_rows(df, colmap, live_types, relaxed_types):
     # --- Iterate rows
     for idx, row in df.iterrows():
         missing = []
@@ -258,15 +259,95 @@ def completeness_check(df, bsr_cols, rules):
     return df
 
 
+def _completeness_vectorized(df, colmap, live_types, relaxed_types):
+    all_rows = pd.Series(True, index=df.index)
+    no_rows = pd.Series(False, index=df.index)
+    # (mask, remark) pairs, in the same order the row engine appends them
+    checks = []
+
+    # 1️⃣ Mandatory Fields
+    for logical, display in [("tv_channel", "TV Channel"), ("channel_id", "Channel ID"),
+                             ("match_day", "Match Day"), ("source", "Source")]:
+        colname = colmap.get(logical)
+        if colname is None:
+            checks.append((all_rows, f"{display} (column not found)"))
+        else:
+            checks.append((~_present_mask(df[colname]), display))
+
+    # 2️⃣ Audience Logic
+    aud_est_col = colmap.get("aud_estimates")
+    aud_met_col = colmap.get("aud_metered")
+
+    if not aud_est_col and not aud_met_col:
+        checks.append((all_rows, "Audience (Estimates/Metered) (columns not found)"))
+    else:
+        est_present = _present_mask(df[aud_est_col]) if aud_est_col else no_rows
+        met_present = _present_mask(df[aud_met_col]) if aud_met_col else no_rows
+        checks.append((~est_present & ~met_present, "Both Audience fields are empty"))
+        checks.append((est_present & met_present, "Both Audience fields are filled"))
+
+    # 3️⃣ Type-based (Home/Away)
+    type_col = colmap.get("type_of_program")
+    if type_col:
+        prog_type = df[type_col].map(lambda v: str(v or "").strip().lower())
+    else:
+        prog_type = pd.Series("", index=df.index)
+    is_live = prog_type.isin(live_types)
+    is_strict = ~is_live & ~prog_type.isin(relaxed_types)
+
+    for logical, display in [("home_team", "Home Team"), ("away_team", "Away Team")]:
+        colname = colmap.get(logical)
+        if not colname:
+            checks.append((is_live, f"{display} (column not found)"))
+        else:
+            checks.append(((is_live | is_strict) & ~_present_mask(df[colname]), display))
+
+    # 4️⃣ Final result (flag codes: each combination of missing fields is rendered once)
+    failed = np.zeros(len(df), dtype=bool)
+    for mask, _ in checks:
+        failed |= mask.to_numpy()
+
+    df["Completeness_OK"] = ~failed
+    df["Completeness_Remark"] = flags_from_masks(checks, df.index, ok="All key fields present")
+    return df
+
+
 # ----------------------------- 5️⃣ Overlap / Duplicate / Day Break -----------------------------
-def overlap_duplicate_daybreak_check(df, bsr_cols, rules):
+def _overlap_sweep_mask(df, group_cols, start_col, end_col):
+    """
+    Interval sweep over programs sorted by start time within each group.
+    Returns True where a program starts before the latest end time of ANY
+    earlier program in the same group (not only the immediately preceding one).
+    Rows with a missing group key or start time are never flagged.
+    """
+    work = df.sort_values(by=group_cols + [start_col], na_position="last", kind="mergesort")
+    keys = [work[c] for c in group_cols]
+
+    # Latest end time seen so far in the group, excluding the current row
+    ends = work[end_col].fillna(pd.Timestamp.min)
+    prev_max_end = ends.groupby(keys, sort=False, dropna=False).shift(1).fillna(pd.Timestamp.min)
+    prev_max_end = prev_max_end.groupby(keys, sort=False, dropna=False).cummax()
+
+    mask = work[group_cols].notna().all(axis=1) & work[start_col].notna() & \
+           (work[start_col] < prev_max_end)
+    return mask.reindex(df.index)
+
+
+def overlap_duplicate_daybreak_check(df, bsr_cols, rules, engine="vectorized", schema=None):
     """
     Final optimized & realistic Overlap + Duplicate + Daybreak check.
     Includes:
         - Duplicate check using exact UTC date/time + channel + market + broadcaster
         - Overlap check using time windows (ANY two events on the same channel/date)
         - Daybreak check using midnight continuation and tolerance rules
+
+    engine: "vectorized" (default) compares each row with its shifted predecessor
+            on the sorted frame and sweeps for overlaps with any earlier program;
+            "rows" keeps the original iloc loops (consecutive overlaps only).
+    schema: ColumnSchema resolved once by the pipeline (column_schema.py)
     """
+    if engine not in ("vectorized", "rows"):
+        raise ValueError(f"Unknown overlap engine: {engine}")
 
     df = df.copy()
 
@@ -274,14 +355,15 @@ def overlap_duplicate_daybreak_check(df, bsr_cols, rules):
     # Column mappings
     # ------------------------------------------------------------
     # Ensure these keys exist in your bsr_cols dictionary and map to valid columns
-    col_channel       = _find_column(df, bsr_cols['tv_channel'])
-    col_channel_id    = _find_column(df, bsr_cols['channel_id'])
-    col_market        = _find_column(df, bsr_cols['market'])
-    col_broadcaster   = _find_column(df, bsr_cols['broadcaster'])
-    col_date          = _find_column(df, bsr_cols['date'])
-    col_title         = _find_column(df, bsr_cols['program_title'])
-    col_start         = _find_column(df, bsr_cols['start_time'])
-    col_end           = _find_column(df, bsr_cols['end_time'])
+    schema = resolve_schema(df, bsr_cols, schema)
+    col_channel       = schema['tv_channel']
+    col_channel_id    = schema['channel_id']
+    col_market        = schema['market']
+    col_broadcaster   = schema['broadcaster']
+    col_date          = schema['date']
+    col_title         = schema['program_title']
+    col_start         = schema['start_time']
+    col_end           = schema['end_time']
 
     required = [col_channel, col_channel_id, col_market, col_broadcaster,
                 col_date, col_title, col_start, col_end]
@@ -311,6 +393,40 @@ def overlap_duplicate_daybreak_check(df, bsr_cols, rules):
         na_position="last"
     ).reset_index(drop=True)
 
+    gap_tolerance = rules.get("daybreak_gap_tolerance_min", 5)
+
+    if engine == "rows":
+        results = _overlap_duplicate_daybreak_rows(
+            df, col_channel, col_channel_id, col_market, col_broadcaster,
+            col_date, col_title, col_start, col_end, gap_tolerance
+        )
+    else:
+        results = _overlap_duplicate_daybreak_vectorized(
+            df, col_channel, col_channel_id, col_market, col_broadcaster,
+            col_date, col_title, col_start, col_end, gap_tolerance
+        )
+    overlap_ok, overlap_r, duplicate_ok, duplicate_r, daybreak_ok, daybreak_r = results
+
+    # ------------------------------------------------------------
+    # Attach results and restore original index order
+    # ------------------------------------------------------------
+    df["Overlap_OK"] = overlap_ok
+    df["Overlap_Remark"] = overlap_r
+
+    df["Duplicate_OK"] = duplicate_ok
+    df["Duplicate_Remark"] = duplicate_r
+
+    df["Daybreak_OK"] = daybreak_ok
+    df["Daybreak_Remark"] = daybreak_r
+
+    # Clean up temporary columns
+    df = df.sort_values("_orig_idx").drop(columns=["_start_dt", "_end_dt", "_orig_idx"])
+
+    return df
+
+
+def _overlap_duplicate_daybreak_rows(df, col_channel, col_channel_id, col_market, col_broadcaster,
+                                     col_date, col_title, col_start, col_end, gap_tolerance):
     n = len(df)
 
     # ------------------------------------------------------------
@@ -367,7 +483,6 @@ def overlap_duplicate_daybreak_check(df, bsr_cols, rules):
     # ------------------------------------------------------------
     # 3️⃣ DAYBREAK CHECK 
     # ------------------------------------------------------------
-    gap_tolerance = rules.get("daybreak_gap_tolerance_min", 5)
 
     for i in range(1, n):
         prev = df.iloc[i - 1]
@@ -410,26 +525,121 @@ def overlap_duplicate_daybreak_check(df, bsr_cols, rules):
                 daybreak_ok[i] = False
                 daybreak_r[i] = "Possible continuation mismatch across midnight"
 
+    return overlap_ok, overlap_r, duplicate_ok, duplicate_r, daybreak_ok, daybreak_r
+
+
+def _overlap_duplicate_daybreak_vectorized(df, col_channel, col_channel_id, col_market, col_broadcaster,
+                                           col_date, col_title, col_start, col_end, gap_tolerance):
+    n = len(df)
+    prev = df.shift(1)
+
     # ------------------------------------------------------------
-    # Attach results and restore original index order
+    # 1️⃣ DUPLICATE CHECK 
     # ------------------------------------------------------------
-    df["Overlap_OK"] = overlap_ok
-    df["Overlap_Remark"] = overlap_r
+    dup_columns = [
+        col_channel, col_channel_id, col_market, col_broadcaster,
+        col_date, col_start, col_end
+    ]
 
-    df["Duplicate_OK"] = duplicate_ok
-    df["Duplicate_Remark"] = duplicate_r
+    dup_mask = df.duplicated(subset=dup_columns, keep=False).to_numpy()
+    duplicate_ok = ~dup_mask
+    duplicate_r = np.where(
+        dup_mask,
+        "Duplicate row (Channel, Channel ID, Market, Broadcaster, "
+        "Date UTC, Start UTC, End UTC match)",
+        ""
+    )
 
-    df["Daybreak_OK"] = daybreak_ok
-    df["Daybreak_Remark"] = daybreak_r
+    # ------------------------------------------------------------
+    # 2️⃣ OVERLAP CHECK (ANY overlap on same channel/date)
+    # Consecutive overlaps keep their original remark; the sweep adds rows
+    # that start before an earlier, non-adjacent program has ended.
+    # ------------------------------------------------------------
+    same_slot = (
+        df[col_channel].eq(prev[col_channel]) &
+        df[col_date].eq(prev[col_date]) &
+        df[col_market].eq(prev[col_market])
+    )
+    consecutive_mask = (same_slot & (df["_start_dt"] < prev["_end_dt"])).to_numpy()
+    sweep_mask = _overlap_sweep_mask(df, [col_channel, col_market, col_date], "_start_dt", "_end_dt").to_numpy()
+
+    overlap_ok = ~(consecutive_mask | sweep_mask)
+    overlap_r = np.where(
+        consecutive_mask,
+        "Overlap detected between consecutive programs on the same channel/date.",
+        np.where(sweep_mask, "Overlap detected with an earlier program on the same channel/date.", "")
+    )
 
-    # Clean up temporary columns
-    df = df.sort_values("_orig_idx").drop(columns=["_start_dt", "_end_dt", "_orig_idx"])
+    # ------------------------------------------------------------
+    # 3️⃣ DAYBREAK CHECK 
+    # ------------------------------------------------------------
+    daybreak_ok = np.ones(n, dtype=bool)
+    daybreak_r = np.full(n, "", dtype=object)
+
+    # must match the same broadcast chain (previous row of the same feed, in the frame's sort order)
+    feed = sequential_gaps(df, [col_channel, col_channel_id, col_market, col_title], "_start_dt", "_end_dt", sort=False)
+    same_feed = pd.Series(feed["has_predecessor"].to_numpy(), index=df.index)
+    across_midnight = same_feed & prev["_end_dt"].notna() & df["_start_dt"].notna() & \
+                      (prev["_end_dt"].dt.hour >= 23) & (df["_start_dt"].dt.hour <= 1)
+
+    # true daybreak scenario (date arithmetic only on the candidate rows)
+    across_midnight = across_midnight.to_numpy()
+    next_day = np.zeros(n, dtype=bool)
+    if across_midnight.any():
+        curr_date = df[col_date][across_midnight].tolist()
+        prev_date = prev[col_date][across_midnight].tolist()
+        next_day[across_midnight] = [c == p + pd.Timedelta(days=1) for c, p in zip(curr_date, prev_date)]
+    continuation = across_midnight & next_day
+    mismatch = across_midnight & ~next_day
+
+    gap = feed["gap_min"].to_numpy()
+    valid_gap = continuation & (gap >= 0) & (gap <= gap_tolerance)
+    invalid_gap = continuation & ~valid_gap
+
+    daybreak_r[valid_gap] = "Valid midnight continuation"
+    daybreak_ok[invalid_gap] = False
+    daybreak_r[invalid_gap] = [
+        f"Invalid continuation gap ({g:.1f} min > {gap_tolerance} min)" for g in gap[invalid_gap]
+    ]
+    daybreak_ok[mismatch] = False
+    daybreak_r[mismatch] = "Possible continuation mismatch across midnight"
 
-    return df
+    return overlap_ok, overlap_r, duplicate_ok, duplicate_r, daybreak_ok, daybreak_r
 
 
 # ----------------------------- 6️⃣ Program Category Check -----------------------------
-def program_category_check(bsr_path, df, col_map, rules, file_rules):
+def _naive_datetimes(series):
+    """datetime64[ns] without timezone (tz-aware values are converted to UTC first)."""
+    series = pd.to_datetime(series, errors="coerce")
+    if getattr(series.dt, "tz", None) is not None:
+        series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+    return series.astype("datetime64[ns]")
+
+
+def _asof_fixture_match(bsr_keys, bsr_start, fix_keys, fix_start, tolerance_min):
+    """
+    As-of join of every broadcast start on the nearest fixture start with the
+    same event key. Returns a boolean array (aligned with bsr_keys) that is
+    True where such a fixture starts within tolerance_min minutes.
+    """
+    left = pd.DataFrame({"event_key": bsr_keys.to_numpy(), "_start": _naive_datetimes(bsr_start).to_numpy(),
+                         "_pos": np.arange(len(bsr_keys))})
+    right = pd.DataFrame({"event_key": fix_keys.to_numpy(), "_fix_start": _naive_datetimes(fix_start).to_numpy()})
+    left = left[left["_start"].notna()].sort_values("_start", kind="mergesort")
+    right = right[right["_fix_start"].notna()].sort_values("_fix_start", kind="mergesort")
+
+    matched = np.zeros(len(bsr_keys), dtype=bool)
+    if left.empty or right.empty:
+        return matched
+    joined = pd.merge_asof(
+        left, right, left_on="_start", right_on="_fix_start", by="event_key",
+        direction="nearest", tolerance=pd.Timedelta(minutes=tolerance_min),
+    )
+    matched[joined["_pos"].to_numpy()] = joined["_fix_start"].notna().to_numpy()
+    return matched
+
+
+def program_category_check(bsr_path, df, col_map, rules, file_rules, schema=None):
     bsr_cols = col_map['bsr']
     fix_cols = col_map['fixture']
 
@@ -455,25 +665,27 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
     df_fix.columns = df_fix.columns.map(str)
 
     # BSR columns
-    col_home_bsr  = _find_column(df, bsr_cols['home_team'])
-    col_away_bsr  = _find_column(df, bsr_cols['away_team'])
-    col_date_bsr  = _find_column(df, bsr_cols['date'])
-    col_progtype  = _find_column(df, bsr_cols['type_of_program'])
-    col_desc      = _find_column(df, bsr_cols['program_desc'])
-    col_source    = _find_column(df, bsr_cols['source'])
-    col_start_utc = _find_column(df, bsr_cols['start_time'])
-    col_end_utc   = _find_column(df, bsr_cols['end_time'])
-    col_duration_direct = _find_column(df, bsr_cols['duration'])
+    schema = resolve_schema(df, bsr_cols, schema)
+    col_home_bsr  = schema['home_team']
+    col_away_bsr  = schema['away_team']
+    col_date_bsr  = schema['date']
+    col_progtype  = schema['type_of_program']
+    col_desc      = schema['program_desc']
+    col_source    = schema['source']
+    col_start_utc = schema['start_time']
+    col_end_utc   = schema['end_time']
+    col_duration_direct = schema['duration']
 
     # Fixture columns - ensure presence of the required columns you mentioned
-    col_comp_fix    = _find_column(df_fix, fix_cols.get('competition', 'competition'))
-    col_matchday_fix= _find_column(df_fix, fix_cols.get('matchday', 'matchday'))
-    col_phase_fix   = _find_column(df_fix, fix_cols.get('phase', 'phase'))  # Phase/Fixture/Episode Desc.
-    col_home_fix    = _find_column(df_fix, fix_cols['home_team'])
-    col_away_fix    = _find_column(df_fix, fix_cols['away_team'])
-    col_date_fix    = _find_column(df_fix, fix_cols['date'])
-    col_start_fix   = _find_column(df_fix, fix_cols['start_time'])
-    col_end_fix     = _find_column(df_fix, fix_cols.get('end_time', fix_cols.get('end', 'end_time')))
+    fix_schema = resolve_schema(df_fix, fix_cols)
+    col_comp_fix    = fix_schema.find(fix_cols.get('competition', 'competition'))
+    col_matchday_fix= fix_schema.find(fix_cols.get('matchday', 'matchday'))
+    col_phase_fix   = fix_schema.find(fix_cols.get('phase', 'phase'))  # Phase/Fixture/Episode Desc.
+    col_home_fix    = fix_schema['home_team']
+    col_away_fix    = fix_schema['away_team']
+    col_date_fix    = fix_schema['date']
+    col_start_fix   = fix_schema['start_time']
+    col_end_fix     = fix_schema.find(fix_cols.get('end_time', fix_cols.get('end', 'end_time')))
 
     # --- 3. Parse/Prepare DateTimes & Duration ---
     # BSR: combine BSR date with start/end if needed (handles cases where start/end are time-only or have UTC text)
@@ -520,7 +732,7 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
 
     duration_direct_parsed = pd.Series(np.nan, index=df.index)
     if col_duration_direct:
-        duration_direct_parsed = parse_duration_to_minutes(df[col_duration_direct])
+        duration_direct_parsed = duration_minutes(df[col_duration_direct])
 
     df['duration_min'] = duration_calc.combine_first(duration_direct_parsed)
     df['_bsr_start_time'] = df.get(f"_dt_{col_start_utc}", pd.NaT)
@@ -551,8 +763,8 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
     df["Program_Category_Remark"] = pd.NA
 
     # rules
-    highlight_keywords = [r"\b" + k for k in rules.get('highlight_keywords', [])]
-    magazine_keywords = [r"\b" + k for k in rules.get('magazine_keywords', [])]
+    highlight_keywords = rules.get('highlight_keywords', [])
+    magazine_keywords = rules.get('magazine_keywords', [])
     match_types = set(rules.get('live_types', []))
     magazine_types = set(rules.get('relaxed_types', []))
     live_tolerance = rules.get('live_tolerance_min', 30)
@@ -562,12 +774,6 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
 
     # --- 6. Group by event (non-timing keys) and apply fixture matching rules ---
     # event key uses: competition, matchday, phase, home, away, date
-    df['event_key'] = (
-        df_fix_index_placeholder if False else  # placeholder to keep style similar if needed
-        df[['home_clean', 'away_clean']].apply(lambda r: f"{r['home_clean']}||{r['away_clean']}", axis=1)
-    )
-
-    # But we need event key based on competition/matchday/phase/home/away/date for BSR
     def _bsr_event_key(r):
         comp = _clean_text(r.get(col_map['bsr'].get('competition', '')) if col_map['bsr'].get('competition') else '')
         matchday = _clean_text(r.get(col_map['bsr'].get('matchday', '')) if col_map['bsr'].get('matchday') else '')
@@ -587,95 +793,34 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
         date_only = r.get('_fix_date_only', "")
         return f"{comp}||{matchday}||{phase}||{home}||{away}||{date_only}"
 
-    # Build fixture index by event_key for fast lookup
     df_fix['event_key'] = df_fix.apply(_fix_event_key, axis=1)
-    fix_event_groups = df_fix.groupby('event_key')
-
-    # Compute BSR event_key and group
     df['event_key'] = df.apply(_bsr_event_key, axis=1)
-    bsr_event_groups = df.groupby('event_key')
 
-    # iterate events
-    for event_key, bsr_group in bsr_event_groups:
-        # indices in order of BSR start time (so earliest is first broadcast)
-        sorted_bsr = bsr_group.sort_values(by='_bsr_start_time')
-        bsr_indices = sorted_bsr.index.tolist()
+    # Timing: as-of join of each broadcast on the nearest fixture start of its event
+    timed = _asof_fixture_match(df['event_key'], df['_bsr_start_time'],
+                                df_fix['event_key'], df_fix['_fix_start_parsed'], live_tolerance)
 
-        # find fixtures for this event_key
-        if event_key in fix_event_groups.groups:
-            fix_rows = df_fix.loc[fix_event_groups.groups[event_key]]
-        else:
-            fix_rows = pd.DataFrame([])  # no fixture rows for this event
-
-        # find any fixture that matches start AND end exactly (after parsing)
-        exact_fix_mask = pd.Series(False, index=fix_rows.index)
-        if not fix_rows.empty:
-            # use parsed fix start/end cols
-            exact_fix_mask = (~fix_rows['_fix_start_parsed'].isna()) & \
-                             (~fix_rows['_fix_end_parsed'].isna()) & \
-                             (fix_rows['_fix_start_parsed'].notna()) & \
-                             (fix_rows['_fix_end_parsed'].notna())
-
-        # For each BSR broadcast in chronological order, determine expected type
-        for i, idx in enumerate(bsr_indices):
-            row = df.loc[idx]
-            actual_type = row["Program_Category_Actual"]
-            bsr_start = row['_bsr_start_time']
-            bsr_end = df.get(f"_dt_{col_end_utc}", pd.Series(pd.NaT, index=df.index)).loc[idx] if col_end_utc else pd.NaT
-
-            # default
-            expected = pd.NA
-
-            # if no fixture rows found -> can't match
-            if fix_rows.empty:
-                expected = pd.NA
-                df.at[idx, "Program_Category_Expected"] = expected
-                df.at[idx, "Program_Category_Remark"] = "No fixture entry for this event"
-                continue
-
-            # check if any fixture has both start and end parsed and equals BSR start/end (exact)
-            exact_matches = []
-            for fidx, frow in fix_rows.iterrows():
-                fix_start = frow.get('_fix_start_parsed', pd.NaT)
-                fix_end = frow.get('_fix_end_parsed', pd.NaT)
-
-                # If both parsed and BSR also parsed, compare
-                if pd.notna(fix_start) and pd.notna(fix_end) and pd.notna(bsr_start) and pd.notna(bsr_end):
-                    # exactness: equal datetimes (to the second) OR within live_tolerance for start decision
-                    if fix_start == bsr_start and fix_end == bsr_end:
-                        exact_matches.append((fidx, frow))
-                # if fixture doesn't contain parsed times, we cannot treat as 'timing exact' here; it's non-timing match
-            # If exact fixture timing present:
-            if exact_matches:
-                # For exact match, use start_diff to decide live vs delayed
-                # Use the earliest BSR broadcast (i == 0) as the one to be considered live/delayed; others are repeats
-                if i == 0:
-                    fix_start = exact_matches[0][1]['_fix_start_parsed']
-                    start_diff_min = (bsr_start - fix_start).total_seconds() / 60 if pd.notna(bsr_start) and pd.notna(fix_start) else np.nan
-                    if pd.notna(start_diff_min) and abs(start_diff_min) <= live_tolerance:
-                        expected = 'live'
-                    else:
-                        expected = 'delayed'
-                else:
-                    expected = 'repeat'
+    # Rank broadcasts of each event by start time; rank 0 is the first broadcast
+    order = df.sort_values(by=['event_key', '_bsr_start_time'], na_position='last', kind='mergesort')
+    first = (order.groupby('event_key', sort=False).cumcount() == 0).reindex(df.index).to_numpy()
 
-            else:
-                # No exact timing match — fixture exists for non-timing columns but timings differ / missing
-                # If this is the first broadcast for this event in the worksheet -> delayed
-                # Else -> repeat
-                if i == 0:
-                    expected = 'delayed'
-                else:
-                    expected = 'repeat'
+    # First broadcast: live when a fixture starts within tolerance, else delayed;
+    # later broadcasts are repeats; events without any fixture entry stay unknown
+    has_fixture = df['event_key'].isin(df_fix['event_key']).to_numpy()
+    expected = np.where(first, np.where(timed, 'live', 'delayed'), 'repeat').astype(object)
+    expected[~has_fixture] = pd.NA
+    df["Program_Category_Expected"] = expected
 
-            df.at[idx, "Program_Category_Expected"] = expected
+    # Keyword presence in the description, one vectorized pass per keyword list
+    desc_text = df[col_desc].astype(str).str.strip() if col_desc else pd.Series("", index=df.index)
+    has_highlight_kw = pd.Series(contains_any(desc_text, highlight_keywords, word_start=True, literal=False), index=df.index)
+    has_magazine_kw = pd.Series(contains_any(desc_text, magazine_keywords, word_start=True, literal=False), index=df.index)
 
     # --- 7. Apply Verification Logic per row (highlights/magazine/matches etc.) ---
     for idx, row in df.iterrows():
         actual_type = row["Program_Category_Actual"]
         expected_type = row["Program_Category_Expected"]
         duration = row["duration_min"]
-        desc = str(row.get(col_desc, "")).strip().lower() if col_desc else ""
         source = str(row.get(col_source, "")).strip().lower() if col_source else ""
 
         ok = False
@@ -690,9 +835,9 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
             elif support_min <= duration <= support_max:
                 ok = True
                 remark = "OK"
-                if actual_type == 'highlights' and not any(re.search(k, desc) for k in highlight_keywords):
+                if actual_type == 'highlights' and not has_highlight_kw.at[idx]:
                     remark = "OK (Duration valid, but keywords missing)"
-                elif actual_type != 'highlights' and not any(re.search(k, desc) for k in magazine_keywords):
+                elif actual_type != 'highlights' and not has_magazine_kw.at[idx]:
                     remark = "OK (Duration valid, but keywords missing)"
             else:
                 ok = False
@@ -742,7 +887,7 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
 
 
 # ----------------------------- 7️⃣ Duration Check -----------------------------
-#def duration_check(df):
+def duration_check(df):
     """Validate program type vs actual duration (Start (UTC) / End (UTC))."""
     print("\n--- DEBUG: Running Duration Check ---")
 
@@ -772,64 +917,22 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
     df[start_col] = df[start_col].astype(str).str.strip()
     df[end_col] = df[end_col].astype(str).str.strip()
 
-    # --- Helper: parse HH:MM:SS to minutes ---
-    def parse_hms_to_minutes(val):
-        if not val or val in ["None", "nan", "NaT"]:
-            return None
-        try:
-            parts = val.split(":")
-            if len(parts) >= 2:
-                h, m = int(parts[0]), int(parts[1])
-                s = int(parts[2]) if len(parts) == 3 else 0
-                return h * 60 + m + s / 60
-        except Exception as e:
-            print(f"[WARN] Could not parse time '{val}': {e}")
-        return None
-
-    # --- Helper: classify by duration ---
-    def expected_category(duration_min):
-        if duration_min is None:
-            return "unknown"
-        if duration_min >= 120:
-            return "live"
-        elif 60 <= duration_min < 120:
-            return "repeat"
-        elif 30 <= duration_min < 60:
-            return "highlights"
-        elif 0 < duration_min < 30:
-            return "support"
-        else:
-            return "unknown"
-
-    expected_list = []
-    ok_list = []
-
-    for idx, row in df.iterrows():
-        start_val = row[start_col]
-        end_val = row[end_col]
-        actual_prog = str(row[type_col]).strip().lower() if pd.notna(row[type_col]) else "unknown"
-
-        start_min = parse_hms_to_minutes(start_val)
-        end_min = parse_hms_to_minutes(end_val)
-
-        if start_min is None or end_min is None:
-            duration_min = None
-        else:
-            duration_min = end_min - start_min
-            if duration_min < 0:
-                duration_min += 24 * 60  # Handle midnight crossover
-
-        expected = expected_category(duration_min)
-        ok = expected in actual_prog or actual_prog in expected
-
-        expected_list.append(expected)
-        ok_list.append(ok)
-
-        print(f"[Row {idx}] Start={start_val} | End={end_val} | Duration(min)={duration_min} | "
-              f"Expected='{expected}' | Actual='{actual_prog}' | OK={ok}")
+    # --- Start/End clock times to minutes (negative spans cross midnight) ---
+    start_min = duration_minutes(df[start_col], clock_only=True)
+    end_min = duration_minutes(df[end_col], clock_only=True)
+    span_min = end_min - start_min
+    span_min = span_min.where(span_min >= 0, span_min + 24 * 60)
+
+    # --- Classify by duration ---
+    expected = np.select(
+        [span_min >= 120, span_min >= 60, span_min >= 30, span_min > 0],
+        ["live", "repeat", "highlights", "support"],
+        default="unknown",
+    )
+    actual = df[type_col].astype(str).str.strip().str.lower().where(df[type_col].notna(), "unknown")
 
-    df["Expected_Category_From_Duration"] = expected_list
-    df["Duration_Check_OK"] = ok_list
+    df["Expected_Category_From_Duration"] = expected
+    df["Duration_Check_OK"] = [e in a or a in e for e, a in zip(expected, actual)]
 
     print("--- DEBUG: Duration Check Completed ---\n")
     return df
@@ -1070,16 +1173,6 @@ def market_channel_program_duration_check(df_worksheet, reference_df=None, debug
             return ""
         return str(x).strip()
 
-    def parse_duration_to_minutes(val):
-        try:
-            parts = str(val).split(":")
-            if len(parts) < 2:
-                return None
-            h, m, s = int(parts[0]), int(parts[1]), int(parts[2]) if len(parts) == 3 else 0
-            return h * 60 + m + s / 60
-        except Exception:
-            return None
-
     reference_markets = set()
     reference_channels = set()
     if reference_df is not None:
@@ -1088,11 +1181,15 @@ def market_channel_program_duration_check(df_worksheet, reference_df=None, debug
         if "TV-Channel" in reference_df.columns:
             reference_channels.update(reference_df["TV-Channel"].dropna().astype(str).str.strip().unique())
 
-    for idx, row in df.iterrows():
+    if "Duration" in df.columns:
+        durations = duration_minutes(df["Duration"], clock_only=True)
+    else:
+        durations = pd.Series(np.nan, index=df.index)
+
+    for (idx, row), duration_min in zip(df.iterrows(), durations):
         market = norm(row.get("Market", ""))
         channel = norm(row.get("TV-Channel", ""))
         program = norm(row.get("Program Title", "")) or norm(row.get("Combined", ""))
-        duration_min = parse_duration_to_minutes(row.get("Duration", ""))
 
         remarks = []
         ok1 = True
@@ -1116,7 +1213,7 @@ def market_channel_program_duration_check(df_worksheet, reference_df=None, debug
             ok2 = False
             remarks.append("Missing Program Title")
 
-        if duration_min is None:
+        if pd.isna(duration_min):
             ok2 = False
             remarks.append("Invalid Duration")
 
@@ -1231,17 +1328,7 @@ def duplicated_markets_check(df):
             print(f"⚠️ Missing required column: {col}. Skipping duplicated markets check.")
             return df
 
-    def duration_to_hours(d):
-        try:
-            if pd.isna(d):
-                return 0
-            parts = str(d).split(":")
-            h, m, s = (int(parts[i]) if i < len(parts) else 0 for i in range(3))
-            return h + m/60 + s/3600
-        except:
-            return 0
-
-    df["Duration_Hours"] = df["Duration"].apply(duration_to_hours)
+    df["Duration_Hours"] = duration_minutes(df["Duration"]).fillna(0) / 60
     df["Duplicated_Market_Check_OK"] = True
     df["Duplicated_Market_Check"] = "Not Applicable"
 
@@ -1278,6 +1365,20 @@ def duplicated_markets_check(df):
     return df
 # -----------------------------------------------------------
 # 13️⃣ Country & Channel IDs Check
+def _stripped_text(series):
+    """str(x).strip() for every cell, "" for missing values."""
+    return pd.Series(np.where(series.isna(), "", series.astype(str).str.strip()), index=series.index, dtype=object)
+
+
+def _join_remarks(parts, default="OK"):
+    """Joins per-row remark arrays with "; " (empty entries skipped); rows without any remark get default."""
+    joined = np.full(len(parts[0]), "", dtype=object)
+    for part in parts:
+        part = np.asarray(part, dtype=object)
+        joined = np.where(joined == "", part, np.where(part == "", joined, joined + "; " + part))
+    return np.where(joined == "", default, joined)
+
+
 def country_channel_id_check(df):
     """
     Ensures that each channel and market is mapped to a single, consistent ID.
@@ -1285,62 +1386,40 @@ def country_channel_id_check(df):
       - Market_Channel_ID_OK (True/False)
       - Market_Channel_ID_Remark (string)
     """
-
-    df_result = df.copy()
-    df_result["Market_Channel_ID_OK"] = True
-    df_result["Market_Channel_ID_Remark"] = ""
-
-    def norm(x):
-        return str(x).strip() if pd.notna(x) else ""
-
-    # Maps to track consistency
-    channel_id_map = {}
-    market_id_map = {}
-
-    for idx, row in df_result.iterrows():
-        channel = norm(row.get("TV-Channel"))
-        channel_id = norm(row.get("Channel ID"))
-        market = norm(row.get("Market"))
-        market_id = norm(row.get("Market ID"))
-
-        remarks = []
-        ok = True
-
-        # ✅ Check 1 – Same channel shouldn't have multiple Channel IDs
-        if channel:
-            if channel in channel_id_map and channel_id_map[channel] != channel_id:
-                remarks.append(
-                    f"Channel '{channel}' has multiple IDs ({channel_id_map[channel]} vs {channel_id})"
-                )
-                ok = False
-            else:
-                channel_id_map[channel] = channel_id
-
-        # ✅ Check 2 – Same market shouldn't have multiple Market IDs
-        if market:
-            if market in market_id_map and market_id_map[market] != market_id:
-                remarks.append(
-                    f"Market '{market}' has multiple IDs ({market_id_map[market]} vs {market_id})"
-                )
-                ok = False
-            else:
-                market_id_map[market] = market_id
-
-        # ✅ Check 3 – Same Channel ID shouldn't be used for multiple channels
-        if channel_id and list(channel_id_map.values()).count(channel_id) > 1:
-            remarks.append(f"Channel ID '{channel_id}' assigned to multiple channels")
-            ok = False
-
-        # ✅ Check 4 – Same Market ID shouldn't be used for multiple markets
-        if market_id and list(market_id_map.values()).count(market_id) > 1:
-            remarks.append(f"Market ID '{market_id}' assigned to multiple markets")
-            ok = False
-
-        # ✅ Write results
-        df_result.at[idx, "Market_Channel_ID_OK"] = ok
-        df_result.at[idx, "Market_Channel_ID_Remark"] = "; ".join(remarks) if remarks else "OK"
-
-    return df_result
+    def text(col):
+        return _stripped_text(df[col]) if col in df.columns else pd.Series("", index=df.index, dtype=object)
+
+    channel, channel_id = text("TV-Channel"), text("Channel ID")
+    market, market_id = text("Market"), text("Market ID")
+
+    # ✅ Check 1 – Same channel shouldn't have multiple Channel IDs (the first one seen is the reference)
+    channel_first_id = channel_id.groupby(channel, sort=False).transform("first")
+    channel_conflict = (channel != "") & (channel_id != channel_first_id)
+
+    # ✅ Check 2 – Same market shouldn't have multiple Market IDs
+    market_first_id = market_id.groupby(market, sort=False).transform("first")
+    market_conflict = (market != "") & (market_id != market_first_id)
+
+    # ✅ Check 3 – Same Channel ID shouldn't be used for multiple channels
+    # (number of channels first seen with this ID up to the current row)
+    channels_on_id = ((channel != "") & ~channel.duplicated()).astype(int).groupby(channel_id, sort=False).cumsum()
+    shared_channel_id = (channel_id != "") & (channels_on_id > 1)
+
+    # ✅ Check 4 – Same Market ID shouldn't be used for multiple markets
+    markets_on_id = ((market != "") & ~market.duplicated()).astype(int).groupby(market_id, sort=False).cumsum()
+    shared_market_id = (market_id != "") & (markets_on_id > 1)
+
+    # ✅ Write results
+    df["Market_Channel_ID_OK"] = ~(channel_conflict | market_conflict | shared_channel_id | shared_market_id)
+    df["Market_Channel_ID_Remark"] = _join_remarks([
+        np.where(channel_conflict,
+                 "Channel '" + channel + "' has multiple IDs (" + channel_first_id + " vs " + channel_id + ")", ""),
+        np.where(market_conflict,
+                 "Market '" + market + "' has multiple IDs (" + market_first_id + " vs " + market_id + ")", ""),
+        np.where(shared_channel_id, "Channel ID '" + channel_id + "' assigned to multiple channels", ""),
+        np.where(shared_market_id, "Market ID '" + market_id + "' assigned to multiple markets", ""),
+    ])
+    return df
 
 # -----------------------------------------------------------
 # 14️⃣ Client Data / LSTV / OTT Check (corrected)
@@ -1434,11 +1513,8 @@ def color_excel(output_path, df):
     wb.save(output_path)
 # -----------------------------------------------------------
 # Summary Sheet
-def generate_summary_sheet(output_path, df):
-    wb = load_workbook(output_path)
-    if "Summary" in wb.sheetnames: del wb["Summary"]
-    ws = wb.create_sheet("Summary")
-
+def qc_summary(df):
+    """Pass/fail counts of every QC result column, as written to the Summary sheet."""
     qc_columns = [col for col in df.columns if "_OK" in col]
     summary_data = []
     for col in qc_columns:
@@ -1446,7 +1522,22 @@ def generate_summary_sheet(output_path, df):
         passed = df[col].sum() if df[col].dtype==bool else sum(df[col]=="True")
         summary_data.append([col, total, passed, total - passed])
 
-    summary_df = pd.DataFrame(summary_data, columns=["Check", "Total", "Passed", "Failed"])
+    return pd.DataFrame(summary_data, columns=["Check", "Total", "Passed", "Failed"])
+
+def generate_summary_sheet(output_path, df):
+    wb = load_workbook(output_path)
+    if "Summary" in wb.sheetnames: del wb["Summary"]
+    ws = wb.create_sheet("Summary")
+
+    summary_df = qc_summary(df)
     for r in dataframe_to_rows(summary_df, index=False, header=True):
         ws.append(r)
-    wb.save(output_path)
\ No newline at end of file
+    wb.save(output_path)
+
+
+def write_qc_report(output_path, df, sheet_name="Sheet1"):
+    """
+    Writes the QC results, their green/red highlighting and the Summary sheet
+    in a single pass (replaces to_excel + color_excel + generate_summary_sheet).
+    """
+    return report_writer.write_report(output_path, df, sheet_name=sheet_name, summary=qc_summary(df))
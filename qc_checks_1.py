@@ -6,6 +6,16 @@ import logging
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
 from openpyxl.utils.dataframe import dataframe_to_rows
+import channel_names
+import macro_rules
+import report_writer
+from compact_frame import compact_frame, should_compact
+from keyword_matcher import contains_any
+from durations import duration_minutes
+from sequential_gaps import sequential_gaps
+from flag_codes import flags_from_masks
+from column_schema import resolve_schema
+from workbook_cache import WorkbookCache
 
 # Removed logging.basicConfig - it's now handled by app.py
 DATE_FORMAT = "%Y-%m-%d"
@@ -16,25 +26,6 @@ HEADER_FILL = PatternFill(start_color="BDD7EE", end_color="BDD7EE", fill_type="s
 
 
 # ----------------------------- Helpers -----------------------------
-def _find_column(df, candidates):
-    """
-    Case-insensitive lookup for a column in df.columns.
-    candidates: list of possible header names (strings) from config.
-    Returns first matching actual column name or None.
-    """
-    if not isinstance(candidates, list):
-        candidates = [candidates] # Handle single-string entries
-        
-    lower_map = {c.lower().strip(): c for c in df.columns}
-    for cand in candidates:
-        if cand is None:
-            continue
-        key = cand.lower().strip()
-        if key in lower_map:
-            return lower_map[key]
-    return None
-
-
 def _is_present(val):
     """
     Treat numeric values (including 0) as present.
@@ -59,15 +50,41 @@ def _is_present(val):
     return True
 
 
+def _present_mask(series):
+    """
+    Column-wise equivalent of _is_present: returns a boolean Series that is
+    True wherever _is_present(val) would be True for the same cell.
+    """
+    text = series.astype(str).str.strip().str.lower()
+    return series.notna() & ~text.isin(["", "nan", "none"])
+
+
+def _stripped_text(series):
+    """str(x).strip() for every cell, "" for missing values."""
+    return pd.Series(np.where(series.isna(), "", series.astype(str).str.strip()), index=series.index, dtype=object)
+
+
+def _join_remarks(parts, default="OK"):
+    """Joins per-row remark arrays with "; " (empty entries skipped); rows without any remark get default."""
+    joined = np.full(len(parts[0]), "", dtype=object)
+    for part in parts:
+        part = np.asarray(part, dtype=object)
+        joined = np.where(joined == "", part, np.where(part == "", joined, joined + "; " + part))
+    return np.where(joined == "", default, joined)
+
+
 # ----------------------------- 1️⃣ Detect Monitoring Period -----------------------------
-def detect_period_from_rosco(rosco_path):
+def detect_period_from_rosco(rosco_path, cache=None):
     """
     Attempts to find 'Monitoring Period' row anywhere in the Rosco file and extract two dates (YYYY-MM-DD).
     Returns (start_date, end_date) as pandas.Timestamp.
     Raises ValueError if not found or parsed.
+    cache: optional WorkbookCache shared across the QC run.
     """
+    if cache is None:
+        cache = WorkbookCache()
     # This function is heuristic-based and doesn't need config
-    x = pd.read_excel(rosco_path, header=None, dtype=str)
+    x = cache.read_excel(rosco_path, header=None, dtype=str)
     combined_text = x.fillna("").astype(str).apply(lambda row: " ".join(row.values), axis=1)
     match_rows = combined_text[combined_text.str.contains("Monitoring Period", case=False, na=False)]
     if match_rows.empty:
@@ -102,8 +119,10 @@ def detect_period_from_rosco(rosco_path):
 
 
 # ----------------------------- 2️⃣ Load BSR -----------------------------
-def detect_header_row(bsr_path, bsr_cols):
-    df_sample = pd.read_excel(bsr_path, header=None, nrows=200)
+def detect_header_row(bsr_path, bsr_cols, cache=None):
+    if cache is None:
+        cache = WorkbookCache()
+    df_sample = cache.read_excel(bsr_path, header=None, nrows=200)
     
     # Use config columns to find the header
     key_cols = [
@@ -122,17 +141,26 @@ def detect_header_row(bsr_path, bsr_cols):
     raise ValueError("Could not detect header row in BSR file.")
 
 
-def load_bsr(bsr_path, bsr_cols):
-    header_row = detect_header_row(bsr_path, bsr_cols)
-    df = pd.read_excel(bsr_path, header=header_row)
+def load_bsr(bsr_path, bsr_cols, cache=None, compact=None):
+    """
+    compact: store text columns as categoricals / Arrow strings
+             (compact_frame.py); None follows QC_COMPACT_BSR.
+    """
+    if cache is None:
+        cache = WorkbookCache()
+    header_row = detect_header_row(bsr_path, bsr_cols, cache=cache)
+    df = cache.read_excel(bsr_path, header=header_row)
     df.columns = [str(c).strip() for c in df.columns]
+    if should_compact(compact):
+        df = compact_frame(df)
     return df
 
 
 # ----------------------------- 3️⃣ Period Check -----------------------------
-def period_check(df, start_date, end_date, bsr_cols):
+def period_check(df, start_date, end_date, bsr_cols, schema=None):
     
-    date_col = _find_column(df, bsr_cols.get('date', ['date']))
+    schema = resolve_schema(df, bsr_cols, schema)
+    date_col = schema['date'] if 'date' in schema.columns else schema.find(['date'])
     
     if not date_col:
         logging.warning("Period Check: 'date' column not found.")
@@ -148,19 +176,29 @@ def period_check(df, start_date, end_date, bsr_cols):
 
 
 # ----------------------------- 4️⃣ Completeness Check -----------------------------
-def completeness_check(df, bsr_cols, rules):
+def completeness_check(df, bsr_cols, rules, engine="vectorized", schema=None):
+    """
+    Flags rows missing mandatory fields, audience values or home/away teams.
+
+    engine: "vectorized" (default) builds presence masks once per column;
+            "rows" keeps the original row-by-row loop, for diffing results.
+    Both engines produce identical Completeness_OK / Completeness_Remark columns
+    (the vectorized remark is a flag-code categorical, see flag_codes.py).
+    schema: ColumnSchema resolved once by the pipeline (column_schema.py)
+    """
     
     # --- Map logical names to actual columns (from config) ---
+    schema = resolve_schema(df, bsr_cols, schema)
     colmap = {
-        "tv_channel": _find_column(df, bsr_cols['tv_channel']),
-        "channel_id": _find_column(df, bsr_cols['channel_id']),
-        "type_of_program": _find_column(df, bsr_cols['type_of_program']),
-        "match_day": _find_column(df, bsr_cols['match_day']),
-        "home_team": _find_column(df, bsr_cols['home_team']),
-        "away_team": _find_column(df, bsr_cols['away_team']),
-        "aud_estimates": _find_column(df, bsr_cols['aud_estimates']),
-        "aud_metered": _find_column(df, bsr_cols['aud_metered']),
-        "source": _find_column(df, bsr_cols['source'])
+        "tv_channel": schema['tv_channel'],
+        "channel_id": schema['channel_id'],
+        "type_of_program": schema['type_of_program'],
+        "match_day": schema['match_day'],
+        "home_team": schema['home_team'],
+        "away_team": schema['away_team'],
+        "aud_estimates": schema['aud_estimates'],
+        "aud_metered": schema['aud_metered'],
+        "source": schema['source']
     }
 
     # --- Initialize result columns
@@ -171,6 +209,14 @@ def completeness_check(df, bsr_cols, rules):
     live_types = set(rules.get('live_types', ['live', 'repeat', 'delayed']))
     relaxed_types = set(rules.get('relaxed_types', ['highlights']))
 
+    if engine == "rows":
+        return _completeness_rows(df, colmap, live_types, relaxed_types)
+    if engine != "vectorized":
+        raise ValueError(f"Unknown completeness engine: {engine}")
+    return _completeness_vectorized(df, colmap, live_types, relaxed_types)
+
+
+def _completeness_rows(df, colmap, live_types, relaxed_types):
     # --- Iterate rows
     for idx, row in df.iterrows():
         missing = []
@@ -225,20 +271,105 @@ def completeness_check(df, bsr_cols, rules):
 
     return df
 
+
+def _completeness_vectorized(df, colmap, live_types, relaxed_types):
+    all_rows = pd.Series(True, index=df.index)
+    no_rows = pd.Series(False, index=df.index)
+    # (mask, remark) pairs, in the same order the row engine appends them
+    checks = []
+
+    # 1️⃣ Mandatory Fields
+    for logical, display in [("tv_channel", "TV Channel"), ("channel_id", "Channel ID"),
+                             ("match_day", "Match Day"), ("source", "Source")]:
+        colname = colmap.get(logical)
+        if colname is None:
+            checks.append((all_rows, f"{display} (column not found)"))
+        else:
+            checks.append((~_present_mask(df[colname]), display))
+
+    # 2️⃣ Audience Logic
+    aud_est_col = colmap.get("aud_estimates")
+    aud_met_col = colmap.get("aud_metered")
+
+    if not aud_est_col and not aud_met_col:
+        checks.append((all_rows, "Audience (Estimates/Metered) (columns not found)"))
+    else:
+        est_present = _present_mask(df[aud_est_col]) if aud_est_col else no_rows
+        met_present = _present_mask(df[aud_met_col]) if aud_met_col else no_rows
+        checks.append((~est_present & ~met_present, "Both Audience fields are empty"))
+        checks.append((est_present & met_present, "Both Audience fields are filled"))
+
+    # 3️⃣ Type-based (Home/Away)
+    type_col = colmap.get("type_of_program")
+    if type_col:
+        prog_type = df[type_col].map(lambda v: str(v or "").strip().lower())
+    else:
+        prog_type = pd.Series("", index=df.index)
+    is_live = prog_type.isin(live_types)
+    is_strict = ~is_live & ~prog_type.isin(relaxed_types)
+
+    for logical, display in [("home_team", "Home Team"), ("away_team", "Away Team")]:
+        colname = colmap.get(logical)
+        if not colname:
+            checks.append((is_live, f"{display} (column not found)"))
+        else:
+            checks.append(((is_live | is_strict) & ~_present_mask(df[colname]), display))
+
+    # 4️⃣ Final result (flag codes: each combination of missing fields is rendered once)
+    failed = np.zeros(len(df), dtype=bool)
+    for mask, _ in checks:
+        failed |= mask.to_numpy()
+
+    df["Completeness_OK"] = ~failed
+    df["Completeness_Remark"] = flags_from_masks(checks, df.index, ok="All key fields present")
+    return df
+
 # ----------------------------- 5️⃣ Overlap / Duplicate / Day Break -----------------------------
-def overlap_duplicate_daybreak_check(df, bsr_cols, rules):
+def _overlap_sweep_mask(df, group_cols, start_col, end_col):
+    """
+    Interval sweep over programs sorted by start time within each group.
+    Returns True where a program starts before the latest end time of ANY
+    earlier program in the same group (not only the immediately preceding one).
+    Rows with a missing group key or start time are never flagged.
+    """
+    work = df.sort_values(by=group_cols + [start_col], na_position="last", kind="mergesort")
+    keys = [work[c] for c in group_cols]
+
+    # Latest end time seen so far in the group, excluding the current row
+    ends = work[end_col].fillna(pd.Timestamp.min)
+    prev_max_end = ends.groupby(keys, sort=False, dropna=False).shift(1).fillna(pd.Timestamp.min)
+    prev_max_end = prev_max_end.groupby(keys, sort=False, dropna=False).cummax()
+
+    mask = work[group_cols].notna().all(axis=1) & work[start_col].notna() & \
+           (work[start_col] < prev_max_end)
+    return mask.reindex(df.index)
+
+
+def overlap_duplicate_daybreak_check(df, bsr_cols, rules, engine="vectorized", schema=None):
+    """
+    Flags overlapping, duplicated and daybreak-continuation programs.
+
+    engine: "vectorized" (default) uses shifted comparisons on the sorted frame
+            plus an interval sweep, so a program overlapping ANY earlier program
+            on the same channel/date is flagged;
+            "rows" keeps the original loop (consecutive overlaps only), for diffing.
+    schema: ColumnSchema resolved once by the pipeline (column_schema.py)
+    """
+    if engine not in ("vectorized", "rows"):
+        raise ValueError(f"Unknown overlap engine: {engine}")
     
     df_in = df.copy(deep=True)
 
     # -------- Find columns using config --------
-    col_channel = _find_column(df_in, bsr_cols['tv_channel'])
-    col_channel_id = _find_column(df_in, bsr_cols['channel_id'])
-    col_date = _find_column(df_in, bsr_cols['date'])
-    col_start = _find_column(df_in, bsr_cols['start_time'])
-    col_end = _find_column(df_in, bsr_cols['end_time'])
-    col_pay = _find_column(df_in, bsr_cols['pay_tv'])
+    schema = resolve_schema(df_in, bsr_cols, schema)
+    col_channel = schema['tv_channel']
+    col_channel_id = schema['channel_id']
+    col_date = schema['date']
+    col_start = schema['start_time']
+    col_end = schema['end_time']
+    col_pay = schema['pay_tv']
     # 'combined' seems to be a specific BSR column, add to config if needed
-    col_combined = _find_column(df_in, ['combined']) 
+    col_combined = schema.find(['combined']) 
 
     # --- Failsafe if core columns are missing ---
     if not col_channel or not col_date or not col_start or not col_end:
@@ -282,6 +413,12 @@ def overlap_duplicate_daybreak_check(df, bsr_cols, rules):
         
         overlap_ok.loc[overlap_mask] = False
         overlap_remark.loc[overlap_mask] = "Overlap detected between consecutive programs"
+
+        if engine == "vectorized":
+            sweep_mask = _overlap_sweep_mask(df_work, [col_channel, col_date], "_qc_start_dt", "_qc_end_dt") & \
+                         (~is_ignored_platform) & (~overlap_mask)
+            overlap_ok.loc[sweep_mask] = False
+            overlap_remark.loc[sweep_mask] = "Overlap detected with an earlier program"
     except Exception as e:
         print(f"⚠️ Overlap logic failed: {e}")
 
@@ -308,23 +445,46 @@ def overlap_duplicate_daybreak_check(df, bsr_cols, rules):
     gap_tolerance = rules.get('daybreak_gap_tolerance_min', 2)
 
     try:
-        for i in range(1, len(df_work)):
-            curr, prev = df_work.iloc[i], df_work.iloc[i - 1]
-            same_channel_val = (curr[col_channel] == prev[col_channel])
-            same_channel_id_val = (col_channel_id and curr[col_channel_id] == prev[col_channel_id])
-            same_combined_val = (col_combined and curr.get(col_combined) == prev.get(col_combined))
-
-            if same_channel_val and same_channel_id_val and same_combined_val:
-                if pd.notna(prev["_qc_end_dt"]) and pd.notna(curr["_qc_start_dt"]):
-                    gap = (curr["_qc_start_dt"] - prev["_qc_end_dt"]).total_seconds() / 60
-                    if gap < 0 or gap > gap_tolerance:
-                        daybreak_ok.iat[i] = False
-                        daybreak_remark.iat[i] = "Invalid continuation gap"
+        if engine == "vectorized":
+            prev_end = df_work["_qc_end_dt"].shift(1)
+            curr_start = df_work["_qc_start_dt"]
+            if col_channel_id and col_combined:
+                feed = sequential_gaps(df_work, [col_channel, col_channel_id, col_combined],
+                                       "_qc_start_dt", "_qc_end_dt", sort=False)
+                same_feed = feed["has_predecessor"]
+                gap = feed["gap_min"]
             else:
-                if pd.notna(prev["_qc_end_dt"]) and pd.notna(curr["_qc_start_dt"]) and \
-                   curr["_qc_start_dt"].hour < 6 and prev["_qc_end_dt"].hour > 20: # Simple daybreak heuristic
-                    daybreak_ok.iat[i] = False
-                    daybreak_remark.iat[i] = "Potential continuation across daybreak"
+                same_feed = pd.Series(False, index=df_work.index)
+                gap = pd.Series(np.nan, index=df_work.index)
+
+            has_times = prev_end.notna() & curr_start.notna()
+
+            gap_mask = same_feed & has_times & ((gap < 0) | (gap > gap_tolerance))
+            daybreak_mask = ~same_feed & has_times & \
+                            (curr_start.dt.hour < 6) & (prev_end.dt.hour > 20) # Simple daybreak heuristic
+
+            daybreak_ok.loc[gap_mask | daybreak_mask] = False
+            daybreak_remark.loc[gap_mask] = "Invalid continuation gap"
+            daybreak_remark.loc[daybreak_mask] = "Potential continuation across daybreak"
+
+        else:
+            for i in range(1, len(df_work)):
+                curr, prev = df_work.iloc[i], df_work.iloc[i - 1]
+                same_channel_val = (curr[col_channel] == prev[col_channel])
+                same_channel_id_val = (col_channel_id and curr[col_channel_id] == prev[col_channel_id])
+                same_combined_val = (col_combined and curr.get(col_combined) == prev.get(col_combined))
+
+                if same_channel_val and same_channel_id_val and same_combined_val:
+                    if pd.notna(prev["_qc_end_dt"]) and pd.notna(curr["_qc_start_dt"]):
+                        gap = (curr["_qc_start_dt"] - prev["_qc_end_dt"]).total_seconds() / 60
+                        if gap < 0 or gap > gap_tolerance:
+                            daybreak_ok.iat[i] = False
+                            daybreak_remark.iat[i] = "Invalid continuation gap"
+                else:
+                    if pd.notna(prev["_qc_end_dt"]) and pd.notna(curr["_qc_start_dt"]) and \
+                       curr["_qc_start_dt"].hour < 6 and prev["_qc_end_dt"].hour > 20: # Simple daybreak heuristic
+                        daybreak_ok.iat[i] = False
+                        daybreak_remark.iat[i] = "Potential continuation across daybreak"
     except Exception as e:
         print(f"⚠️ Daybreak logic failed: {e}")
 
@@ -348,57 +508,24 @@ def overlap_duplicate_daybreak_check(df, bsr_cols, rules):
 
 # ----------------------------- 6️⃣ Program Category Check -----------------------------
 
-def parse_duration_to_minutes(duration_series):
-    # (Helper function, no config needed)
-    results = []
-    for item in duration_series:
-        if pd.isna(item):
-            results.append(np.nan)
-            continue
-        if isinstance(item, (int, float)):
-            results.append(float(item))
-            continue
-        s = str(item).strip()
-        try:
-            num = float(s)
-            results.append(num)
-            continue
-        except ValueError:
-            pass
-        parts = s.split(':')
-        if len(parts) >= 2:
-            try:
-                hours = float(re.sub(r"[^0-9.]", "", parts[0]))
-                minutes = float(re.sub(r"[^0-9.]", "", parts[1]))
-                seconds = 0.0
-                if len(parts) >= 3:
-                    seconds = float(re.sub(r"[^0-9.]", "", parts[2]))
-                total_minutes = (hours * 60) + minutes + (seconds / 60)
-                results.append(total_minutes)
-            except (ValueError, IndexError):
-                results.append(np.nan)
-        else:
-            results.append(np.nan)
-    return pd.Series(results, index=duration_series.index)
-
-
-def program_category_check(bsr_path, df, col_map, rules, file_rules):
+def program_category_check(bsr_path, df, col_map, rules, file_rules, cache=None, schema=None):
     
     bsr_cols = col_map['bsr']
     fix_cols = col_map['fixture']
+    if cache is None:
+        cache = WorkbookCache()
 
     # --- 1. Load Fixture Sheet ---
     try:
-        xl = pd.ExcelFile(bsr_path)
         fixture_keyword = file_rules.get('fixture_sheet_keyword', 'fixture')
-        fixture_sheet = next((s for s in xl.sheet_names if fixture_keyword in s.lower()), None)
+        fixture_sheet = next((s for s in cache.sheet_names(bsr_path) if fixture_keyword in s.lower()), None)
 
         if not fixture_sheet:
             df["Program_Category_OK"] = False
             df["Program_Category_Remark"] = "Fixture list sheet missing"
             return df
         
-        df_fix = xl.parse(fixture_sheet)
+        df_fix = cache.read_excel(bsr_path, sheet_name=fixture_sheet)
     except Exception as e:
         df["Program_Category_OK"] = False
         df["Program_Category_Remark"] = f"Error loading fixture sheet: {e}"
@@ -409,23 +536,25 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
     df_fix.columns = df_fix.columns.map(str)
 
     # BSR columns
-    col_home_bsr  = _find_column(df, bsr_cols['home_team'])
-    col_away_bsr  = _find_column(df, bsr_cols['away_team'])
-    col_date_bsr  = _find_column(df, bsr_cols['date'])
-    col_progtype  = _find_column(df, bsr_cols['type_of_program'])
-    col_desc      = _find_column(df, bsr_cols['program_desc'])
-    col_source    = _find_column(df, bsr_cols['source'])
+    schema = resolve_schema(df, bsr_cols, schema)
+    col_home_bsr  = schema['home_team']
+    col_away_bsr  = schema['away_team']
+    col_date_bsr  = schema['date']
+    col_progtype  = schema['type_of_program']
+    col_desc      = schema['program_desc']
+    col_source    = schema['source']
     
     # Fixture columns
-    col_home_fix  = _find_column(df_fix, fix_cols['home_team'])
-    col_away_fix  = _find_column(df_fix, fix_cols['away_team'])
-    col_date_fix  = _find_column(df_fix, fix_cols['date'])
-    col_start_fix = _find_column(df_fix, fix_cols['start_time'])
+    fix_schema = resolve_schema(df_fix, fix_cols)
+    col_home_fix  = fix_schema['home_team']
+    col_away_fix  = fix_schema['away_team']
+    col_date_fix  = fix_schema['date']
+    col_start_fix = fix_schema['start_time']
     
     # --- 3. Data Preparation & Robust Duration Calculation ---
-    col_start_utc = _find_column(df, bsr_cols['start_time'])
-    col_end_utc   = _find_column(df, bsr_cols['end_time'])
-    col_duration_direct = _find_column(df, bsr_cols['duration'])
+    col_start_utc = schema['start_time']
+    col_end_utc   = schema['end_time']
+    col_duration_direct = schema['duration']
 
     base_date_str = df[col_date_bsr].astype(str) if col_date_bsr else pd.Series(pd.NaT, index=df.index).astype(str)
     
@@ -451,7 +580,7 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
         
     duration_direct_parsed = pd.Series(np.nan, index=df.index)
     if col_duration_direct:
-        duration_direct_parsed = parse_duration_to_minutes(df[col_duration_direct])
+        duration_direct_parsed = duration_minutes(df[col_duration_direct])
         
     df['duration_min'] = duration_calc.combine_first(duration_direct_parsed)
     df['_bsr_start_time'] = df.get(f"_dt_{col_start_utc}", pd.NaT)
@@ -469,8 +598,8 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
     df["Program_Category_Remark"] = pd.NA
 
     # --- 5. Get Rules from Config ---
-    highlight_keywords = [r"\b" + k for k in rules.get('highlight_keywords', [])]
-    magazine_keywords = [r"\b" + k for k in rules.get('magazine_keywords', [])]
+    highlight_keywords = rules.get('highlight_keywords', [])
+    magazine_keywords = rules.get('magazine_keywords', [])
     match_types = set(rules.get('live_types', []))
     magazine_types = set(rules.get('relaxed_types', []))
     live_tolerance = rules.get('live_tolerance_min', 30)
@@ -537,12 +666,16 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
             
         unprocessed_indices = unprocessed_indices.difference(matching_indices)
 
+    # Keyword presence in the description, one vectorized pass per keyword list
+    desc_text = df[col_desc].astype(str).str.strip() if col_desc else pd.Series("", index=df.index)
+    has_highlight_kw = pd.Series(contains_any(desc_text, highlight_keywords, word_start=True, literal=False), index=df.index)
+    has_magazine_kw = pd.Series(contains_any(desc_text, magazine_keywords, word_start=True, literal=False), index=df.index)
+
     # --- 7. Apply Verification Logic (Row-by-Row) ---
     for idx, row in df.iterrows():
         actual_type = row["Program_Category_Actual"]
         expected_type = row["Program_Category_Expected"]
         duration = row["duration_min"]
-        desc = str(row.get(col_desc, "")).strip().lower() if col_desc else ""
         source = str(row.get(col_source, "")).strip().lower() if col_source else ""
 
         ok = False
@@ -558,9 +691,9 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
                 ok = True
                 remark = "OK"
                 # Bonus check for keywords
-                if actual_type == 'highlights' and not any(re.search(k, desc) for k in highlight_keywords):
+                if actual_type == 'highlights' and not has_highlight_kw.at[idx]:
                     remark = "OK (Duration valid, but keywords missing)"
-                elif actual_type != 'highlights' and not any(re.search(k, desc) for k in magazine_keywords):
+                elif actual_type != 'highlights' and not has_magazine_kw.at[idx]:
                     remark = "OK (Duration valid, but keywords missing)"
             else:
                 ok = False
@@ -607,14 +740,17 @@ def program_category_check(bsr_path, df, col_map, rules, file_rules):
 
 
 # ----------------------------- 8️⃣ Event / Matchday / Competition Check -----------------------------
-def check_event_matchday_competition(df, bsr_path, col_map, file_rules):
+def check_event_matchday_competition(df, bsr_path, col_map, file_rules, cache=None, schema=None):
 
     logging.info("Starting Event / Matchday / Fixture consistency check...")
     
     bsr_cols = col_map['bsr']
     fix_cols = col_map['fixture']
+    if cache is None:
+        cache = WorkbookCache()
+    schema = resolve_schema(df, bsr_cols, schema)
     
-    col_progtype = _find_column(df, bsr_cols['type_of_program'])
+    col_progtype = schema['type_of_program']
     if not col_progtype:
         logging.error("❌ 'Type of program' column not found. Skipping Event check.")
         df["Event_Matchday_OK"] = False
@@ -627,12 +763,11 @@ def check_event_matchday_competition(df, bsr_path, col_map, file_rules):
     # Load fixture list
     fixture_df = None
     try:
-        excel_file = pd.ExcelFile(bsr_path)
         fixture_keyword = file_rules.get('fixture_sheet_keyword', 'fixture')
-        fixture_sheet = next((s for s in excel_file.sheet_names if fixture_keyword in s.lower()), None)
+        fixture_sheet = next((s for s in cache.sheet_names(bsr_path) if fixture_keyword in s.lower()), None)
         
         if fixture_sheet:
-            fixture_df = excel_file.parse(fixture_sheet)
+            fixture_df = cache.read_excel(bsr_path, sheet_name=fixture_sheet)
             fixture_df.columns = [c.strip() for c in fixture_df.columns]
         else:
             logging.warning("⚠️ No sheet containing 'fixture' found.")
@@ -641,10 +776,11 @@ def check_event_matchday_competition(df, bsr_path, col_map, file_rules):
 
     if fixture_df is not None:
         # Find fixture columns using config
-        fix_event_col = _find_column(fixture_df, fix_cols['event'])
-        fix_home_col = _find_column(fixture_df, fix_cols['home_team'])
-        fix_away_col = _find_column(fixture_df, fix_cols['away_team'])
-        fix_md_col = _find_column(fixture_df, fix_cols['match_day'])
+        fix_schema = resolve_schema(fixture_df, fix_cols)
+        fix_event_col = fix_schema['event']
+        fix_home_col = fix_schema['home_team']
+        fix_away_col = fix_schema['away_team']
+        fix_md_col = fix_schema['match_day']
 
         # Normalize fixture data
         for col in [fix_event_col, fix_home_col, fix_away_col, fix_md_col]:
@@ -656,81 +792,63 @@ def check_event_matchday_competition(df, bsr_path, col_map, file_rules):
                 break
 
     # Find BSR columns
-    bsr_event_col = _find_column(df, bsr_cols['event'])
-    bsr_home_col = _find_column(df, bsr_cols['home_team'])
-    bsr_away_col = _find_column(df, bsr_cols['away_team'])
-    bsr_md_col = _find_column(df, bsr_cols['match_day'])
+    bsr_key_cols = [schema[key] for key in ('event', 'home_team', 'away_team', 'match_day')]
 
-    for i, row in df.iterrows():
-        try:
-            prog_type = str(row.get(col_progtype, "")).strip().lower()
-
-            if prog_type == 'live':
-                if fixture_df is None:
-                    df.at[i, "Event_Matchday_OK"] = False
-                    df.at[i, "Event_Matchday_Remark"] = "Fixture list missing or invalid"
-                    continue
-
-                event = str(row.get(bsr_event_col, "")).strip().lower()
-                home = str(row.get(bsr_home_col, "")).strip().lower()
-                away = str(row.get(bsr_away_col, "")).strip().lower()
-                matchday = str(row.get(bsr_md_col, "")).strip().lower()
-
-                if not event or not home or not away or not matchday:
-                    df.at[i, "Event_Matchday_OK"] = False
-                    df.at[i, "Event_Matchday_Remark"] = "Missing event/home/away/matchday in BSR"
-                    continue
-
-                match = fixture_df[
-                    (fixture_df[fix_event_col] == event)
-                    & (fixture_df[fix_home_col] == home)
-                    & (fixture_df[fix_away_col] == away)
-                    & (fixture_df[fix_md_col] == matchday)
-                ]
-
-                if match.empty:
-                    df.at[i, "Event_Matchday_OK"] = False
-                    df.at[i, "Event_Matchday_Remark"] = "No matching fixture found"
-                else:
-                    df.at[i, "Event_Matchday_OK"] = True
-                    df.at[i, "Event_Matchday_Remark"] = "Fixture found"
-            
-            # Else: keep default "Not Applicable"
+    is_live = (df[col_progtype].astype(str).str.strip().str.lower() == 'live').to_numpy()
+    if not is_live.any():
+        logging.info("✅ Event / Matchday / Fixture consistency check completed.")
+        return df
 
-        except Exception as e:
-            df.at[i, "Event_Matchday_OK"] = False
-            df.at[i, "Event_Matchday_Remark"] = f"Error: {e}"
+    ok = df["Event_Matchday_OK"].to_numpy(dtype=object)
+    remark = df["Event_Matchday_Remark"].to_numpy(dtype=object)
+
+    if fixture_df is None:
+        ok[is_live] = False
+        remark[is_live] = "Fixture list missing or invalid"
+    else:
+        # Hash join on the normalized (event, home, away, matchday) key
+        # instead of scanning the fixture list once per live row
+        bsr_keys = pd.DataFrame({
+            i: df[col].astype(str).str.strip().str.lower() if col else ""
+            for i, col in enumerate(bsr_key_cols)
+        }, index=df.index)
+        missing = (bsr_keys == "").any(axis=1).to_numpy()
+
+        fixture_index = pd.MultiIndex.from_frame(
+            fixture_df[[fix_event_col, fix_home_col, fix_away_col, fix_md_col]].drop_duplicates()
+        )
+        found = pd.MultiIndex.from_frame(bsr_keys).isin(fixture_index).astype(object)
+
+        ok[is_live] = found[is_live]
+        remark[is_live] = np.where(found[is_live], "Fixture found", "No matching fixture found")
+        live_missing = is_live & missing
+        ok[live_missing] = False
+        remark[live_missing] = "Missing event/home/away/matchday in BSR"
+
+    df["Event_Matchday_OK"] = ok
+    df["Event_Matchday_Remark"] = remark
 
     logging.info("✅ Event / Matchday / Fixture consistency check completed.")
     return df
 
 # -----------------------------------------------------------
-def market_channel_consistency_check(df_bsr, rosco_path, col_map, file_rules):
+def market_channel_consistency_check(df_bsr, rosco_path, col_map, file_rules, cache=None, schema=None):
     
     logging.info("🔍 Starting Market & Channel Consistency Check...")
     
     bsr_cols = col_map['bsr']
     rosco_cols = col_map['rosco']
+    if cache is None:
+        cache = WorkbookCache()
     
-    # --- Normalization helper for ROSCO ---
-    def normalize_channel(name):
-        if pd.isna(name): return ""
-        s = str(name)
-        s = re.sub(r"\(.*?\)|\[.*?\]", "", s)
-        s = re.split(r"[-–—]", s)[0]
-        s = re.sub(r"[^0-9a-zA-Z\s]", " ", s)
-        s = re.sub(r"\s+", " ", s).strip().lower()
-        return s
-
     # --- Load ROSCO reference sheet ---
     rosco_df = None
     if rosco_path:
         try:
-            xls = pd.ExcelFile(rosco_path)
             ignore_sheet = file_rules.get('rosco_ignore_sheet', 'general')
-            sheet_name = next((s for s in xls.sheet_names if ignore_sheet not in s.lower()), None)
+            sheet_name = next((s for s in cache.sheet_names(rosco_path) if ignore_sheet not in s.lower()), None)
             if sheet_name:
-                rosco_df = xls.parse(sheet_name)
+                rosco_df = cache.read_excel(rosco_path, sheet_name=sheet_name)
             else:
                 logging.warning(f"⚠️ No valid sheet found in ROSCO (ignoring '{ignore_sheet}').")
         except Exception as e:
@@ -740,17 +858,16 @@ def market_channel_consistency_check(df_bsr, rosco_path, col_map, file_rules):
             return df_bsr
 
     # --- Build valid (Market, Channel) pairs from ROSCO ---
-    valid_pairs = set()
+    valid_pairs = pd.MultiIndex.from_arrays([[], []])
     rosco_country_col = rosco_cols.get('channel_country', 'ChannelCountry')
     rosco_name_col = rosco_cols.get('channel_name', 'ChannelName')
     
     if rosco_df is not None:
         if {rosco_country_col, rosco_name_col}.issubset(rosco_df.columns):
-            for _, row in rosco_df.iterrows():
-                market = str(row[rosco_country_col]).strip().lower()
-                channel = normalize_channel(row[rosco_name_col])
-                if market and channel:
-                    valid_pairs.add((market, channel))
+            markets = rosco_df[rosco_country_col].astype(str).str.strip().str.lower()
+            channels = channel_names.normalize_series(rosco_df[rosco_name_col], "rosco")
+            keep = (markets != "") & (channels != "")
+            valid_pairs = pd.MultiIndex.from_arrays([markets[keep], channels[keep]]).unique()
             logging.info(f"✅ Loaded {len(valid_pairs)} valid Market+Channel pairs from ROSCO.")
         else:
             logging.warning(f"⚠️ '{rosco_country_col}' or '{rosco_name_col}' not in ROSCO sheet.")
@@ -760,8 +877,9 @@ def market_channel_consistency_check(df_bsr, rosco_path, col_map, file_rules):
     df_bsr["Market_Channel_Program_Remark"] = "OK"
     
     # --- Find BSR columns ---
-    bsr_market_col = _find_column(df_bsr, bsr_cols['market'])
-    bsr_channel_col = _find_column(df_bsr, bsr_cols['tv_channel'])
+    schema = resolve_schema(df_bsr, bsr_cols, schema)
+    bsr_market_col = schema['market']
+    bsr_channel_col = schema['tv_channel']
     
     if not bsr_market_col or not bsr_channel_col:
         logging.error("❌ Market/Channel Check: BSR columns not found. Skipping.")
@@ -769,27 +887,26 @@ def market_channel_consistency_check(df_bsr, rosco_path, col_map, file_rules):
         df_bsr["Market_Channel_Program_Remark"] = "BSR columns not found"
         return df_bsr
 
-    # --- Validate each row in BSR ---
-    for idx, row in df_bsr.iterrows():
-        remarks = []
-        market = str(row.get(bsr_market_col, "")).strip().lower()
-        channel = str(row.get(bsr_channel_col, "")).strip()
+    # --- Validate all BSR rows at once (channels normalized once per distinct name) ---
+    markets = df_bsr[bsr_market_col].astype(str).str.strip().str.lower()
+    channels = df_bsr[bsr_channel_col].astype(str).str.strip()
+    missing = ((markets == "") | (channels == "")).to_numpy()
 
-        if not market or not channel:
-            df_bsr.at[idx, "Market_Channel_Consistency_OK"] = False
-            remarks.append("Missing market or channel")
-        elif valid_pairs:
-            if (market, normalize_channel(channel)) not in valid_pairs:
-                df_bsr.at[idx, "Market_Channel_Consistency_OK"] = False
-                remarks.append("Market+Channel not found in ROSCO")
+    not_found = np.zeros(len(df_bsr), dtype=bool)
+    if len(valid_pairs):
+        pairs = pd.MultiIndex.from_arrays([markets, channel_names.normalize_series(channels, "rosco")])
+        not_found = ~missing & ~pairs.isin(valid_pairs)
 
-        df_bsr.at[idx, "Market_Channel_Program_Remark"] = "; ".join(remarks) if remarks else "OK"
+    df_bsr["Market_Channel_Consistency_OK"] = ~(missing | not_found)
+    df_bsr["Market_Channel_Program_Remark"] = np.select(
+        [missing, not_found], ["Missing market or channel", "Market+Channel not found in ROSCO"], default="OK"
+    )
 
     logging.info("✅ Market & Channel Consistency Check completed.")
     return df_bsr
 
 # -----------------------------------------------------------
-def domestic_market_check(df, project_config, bsr_cols, debug=False):
+def domestic_market_check(df, project_config, bsr_cols, debug=False, schema=None):
     
     league_name = project_config.get('league_keyword', 'F24 Spain')
     domestic_market = project_config.get('domestic_market', 'Spain')
@@ -798,11 +915,12 @@ def domestic_market_check(df, project_config, bsr_cols, debug=False):
     logging.info(f" Running domestic market coverage check for league: {league_name}")
 
     # --- Find columns using config mapping ---
-    market_col = _find_column(df, bsr_cols['market'])
-    competition_col = _find_column(df, bsr_cols['competition'])
-    event_col = _find_column(df, bsr_cols['event'])
-    program_type_col = _find_column(df, bsr_cols['type_of_program'])
-    matchday_col = _find_column(df, bsr_cols['match_day'])
+    schema = resolve_schema(df, bsr_cols, schema)
+    market_col = schema['market']
+    competition_col = schema['competition']
+    event_col = schema['event']
+    program_type_col = schema['type_of_program']
+    matchday_col = schema['match_day']
 
     required_cols_found = [market_col, competition_col, event_col, program_type_col, matchday_col]
     
@@ -817,62 +935,61 @@ def domestic_market_check(df, project_config, bsr_cols, debug=False):
         df[col] = df[col].astype(str).str.strip()
 
     # --- Use config variables instead of hard-coded strings ---
-    df["is_domestic_market"] = df[market_col].str.contains(domestic_market, case=False, na=False)
-    
-    df["is_target_league"] = df[competition_col].apply(
-        lambda x: any(kw.lower() in str(x).lower() for kw in domestic_keywords)
-    ) | df[event_col].apply(
-        lambda x: any(kw.lower() in str(x).lower() for kw in domestic_keywords)
-    )
+    is_domestic_market = df[market_col].str.contains(domestic_market, case=False, na=False).to_numpy()
+    is_target_league = contains_any(df[competition_col], domestic_keywords) | \
+                       contains_any(df[event_col], domestic_keywords)
 
     # Initialize output columns
-    df["Domestic_Market_Coverage_Check_OK"] = pd.NA
-    df["Domestic_Market_Coverage_Check_OK"] = df["Domestic_Market_Coverage_Check_OK"].astype('object')
-    df["Domestic Market Coverage Remark"] = "Not Applicable"
+    ok = np.full(len(df), pd.NA, dtype=object)
+    remark = np.full(len(df), "Not Applicable", dtype=object)
 
-    target_rows = df[df["is_target_league"] & df["is_domestic_market"]]
-    if target_rows.empty:
+    target = is_target_league & is_domestic_market
+    if not target.any():
         logging.warning(f" No '{league_name}' entries found for '{domestic_market}' market.")
-        df.drop(columns=["is_domestic_market", "is_target_league"], inplace=True, errors="ignore")
+        df["Domestic_Market_Coverage_Check_OK"] = ok
+        df["Domestic Market Coverage Remark"] = remark
         return df
 
-    all_matchdays = target_rows[matchday_col].unique()
+    matchday = df[matchday_col]
     if debug:
+        all_matchdays = matchday[target].unique()
         logging.info(f" Found {len(all_matchdays)} matchdays for {domestic_market} market: {all_matchdays}")
 
-    for md in all_matchdays:
-        if not md or str(md).lower() == 'nan':
-            continue
-            
-        md_rows = target_rows[target_rows[matchday_col] == md]
-        live_present = any(md_rows[program_type_col].str.contains("Live", case=False, na=False))
-        delayed_present = any(md_rows[program_type_col].str.contains("Delayed", case=False, na=False))
-
-        condition = (df[matchday_col] == md) & df["is_target_league"] & df["is_domestic_market"]
-
-        if not live_present and not delayed_present:
-            df.loc[condition, "Domestic_Market_Coverage_Check_OK"] = False
-            df.loc[condition, "Domestic Market Coverage Remark"] = f"No live/delayed coverage for matchday {md}"
-        else:
-            df.loc[condition, "Domestic_Market_Coverage_Check_OK"] = True
-            remark = "Live" if live_present else ""
-            remark += " & " if live_present and delayed_present else ""
-            remark += "Delayed" if delayed_present else ""
-            df.loc[condition, "Domestic Market Coverage Remark"] = f"{remark} coverage present for matchday {md}"
+    # Live / delayed coverage per matchday of the domestic league rows
+    program_type = df[program_type_col]
+    covered = target & (matchday != "").to_numpy() & (matchday.str.lower() != "nan").to_numpy()
+    coverage = pd.DataFrame({
+        "live": program_type[covered].str.contains("Live", case=False, na=False),
+        "delayed": program_type[covered].str.contains("Delayed", case=False, na=False),
+    }).groupby(matchday[covered], sort=False).transform("any")
+    live_present = coverage["live"].to_numpy(dtype=bool)
+    delayed_present = coverage["delayed"].to_numpy(dtype=bool)
+    md = matchday[covered].to_numpy(dtype=object)
+
+    ok[covered] = live_present | delayed_present
+    coverage_kind = np.select([live_present & delayed_present, live_present, delayed_present],
+                              ["Live & Delayed", "Live", "Delayed"], default="")
+    remark[covered] = np.where(
+        live_present | delayed_present,
+        coverage_kind.astype(object) + " coverage present for matchday " + md,
+        "No live/delayed coverage for matchday " + md,
+    )
 
     # Set non-applicable rows
-    mask_highlights = df[program_type_col].str.contains("Highlight|Magazine", case=False, na=False) & df["is_domestic_market"]
-    df.loc[mask_highlights, "Domestic_Market_Coverage_Check_OK"] = pd.NA
-    df.loc[mask_highlights, "Domestic Market Coverage Remark"] = "Not applicable for highlights or magazine programs"
+    mask_highlights = program_type.str.contains("Highlight|Magazine", case=False, na=False).to_numpy() & is_domestic_market
+    ok[mask_highlights] = pd.NA
+    remark[mask_highlights] = "Not applicable for highlights or magazine programs"
 
-    df.drop(columns=["is_domestic_market", "is_target_league"], inplace=True, errors="ignore")
+    df["Domestic_Market_Coverage_Check_OK"] = ok
+    df["Domestic Market Coverage Remark"] = remark
     return df
 
 # -----------------------------------------------------------
-def rates_and_ratings_check(df, bsr_cols):
+def rates_and_ratings_check(df, bsr_cols, schema=None):
     
-    est_col = _find_column(df, bsr_cols['aud_estimates'])
-    met_col = _find_column(df, bsr_cols['aud_metered'])
+    schema = resolve_schema(df, bsr_cols, schema)
+    est_col = schema['aud_estimates']
+    met_col = schema['aud_metered']
     
     if est_col is None:
         df[est_col] = pd.NA # Create dummy column to avoid errors
@@ -903,7 +1020,7 @@ def rates_and_ratings_check(df, bsr_cols):
     return df
 
 # -----------------------------------------------------------
-def duplicated_market_check(df_bsr, macro_path, project, col_map, file_rules, debug=False):
+def duplicated_market_check(df_bsr, macro_path, project, col_map, file_rules, debug=False, schema=None):
     
     result_col = "Duplicated_Markets_Check_OK"
     remark_col = "Duplicated_Markets_Remark"
@@ -924,32 +1041,30 @@ def duplicated_market_check(df_bsr, macro_path, project, col_map, file_rules, de
         # --- Load and clean Macro Data ---
         macro_sheet = file_rules.get('macro_sheet_name', 'Data Core')
         header_row = file_rules.get('macro_header_row', 1)
-        macro_df = pd.read_excel(macro_path, sheet_name=macro_sheet, header=header_row, dtype=str)
-        macro_df.columns = macro_df.columns.str.strip()
 
         # Find macro columns
-        proj_col = macro_cols['projects']
         orig_mkt_col = macro_cols['orig_market']
         orig_ch_col = macro_cols['orig_channel']
         dup_mkt_col = macro_cols['dup_market']
         dup_ch_col = macro_cols['dup_channel']
-        
-        macro_df = macro_df[
-            macro_df[proj_col].astype(str).str.contains(league_keyword, case=False, na=False)
-        ].copy()
 
-        if macro_df.empty:
+        # Compiled once per macro file content (see macro_rules.py)
+        rule_index = macro_rules.load_macro_rule_index(macro_path, macro_sheet, header_row, columns=macro_cols)
+        project_rules = rule_index.project(league_keyword)
+
+        if project_rules.empty:
             df_bsr[remark_col] = f"No duplication rules found for {league_keyword}"
             return df_bsr
 
-        for col in [orig_mkt_col, orig_ch_col, dup_mkt_col, dup_ch_col]:
-            macro_df[col] = macro_df[col].astype(str).str.strip().str.lower()
+        # Key columns come back stripped and lower-cased
+        macro_df = project_rules.keys("lower")
 
         # --- Find BSR columns ---
-        mkt_col = _find_column(df_bsr, bsr_cols['market'])
-        ch_col = _find_column(df_bsr, bsr_cols['tv_channel'])
-        comp_col = _find_column(df_bsr, bsr_cols['competition'])
-        evt_col = _find_column(df_bsr, bsr_cols['event'])
+        schema = resolve_schema(df_bsr, bsr_cols, schema)
+        mkt_col = schema['market']
+        ch_col = schema['tv_channel']
+        comp_col = schema['competition']
+        evt_col = schema['event']
 
         # --- Filter BSR for selected league (competition/event) ---
         in_league = (
@@ -963,23 +1078,23 @@ def duplicated_market_check(df_bsr, macro_path, project, col_map, file_rules, de
             return df_bsr
 
         # --- Core Duplication Logic ---
-        for _, row in macro_df.iterrows():
-            orig_market = row[orig_mkt_col]
-            orig_channel = row[orig_ch_col]
-            dup_market = row[dup_mkt_col]
-            dup_channel = row[dup_ch_col]
-
-            orig_events = set(df_league[
-                (df_league[mkt_col].astype(str).str.lower() == orig_market)
-                & (df_league[ch_col].astype(str).str.lower() == orig_channel)
-            ][evt_col])
-
-            dup_events = set(df_league[
-                (df_league[mkt_col].astype(str).str.lower() == dup_market)
-                & (df_league[ch_col].astype(str).str.lower() == dup_channel)
-            ][evt_col])
-
-            status, remark = pd.NA, "Not Applicable"
+        # Normalize the BSR keys once and collect the league's events per (market, channel)
+        mkt_key = df_bsr[mkt_col].astype(str).str.lower()
+        ch_key = df_bsr[ch_col].astype(str).str.lower()
+        events_by_key = {
+            key: set(events)
+            for key, events in df_league[evt_col].groupby([mkt_key[in_league], ch_key[in_league]], sort=False)
+        }
+
+        # Evaluate every rule with set lookups; as rules are applied in macro order,
+        # a (market, channel) touched by several rules keeps the outcome of the last one
+        outcomes = {}
+        for orig_market, orig_channel, dup_market, dup_channel in zip(
+            macro_df[orig_mkt_col], macro_df[orig_ch_col], macro_df[dup_mkt_col], macro_df[dup_ch_col]
+        ):
+            orig_events = events_by_key.get((orig_market, orig_channel), set())
+            dup_events = events_by_key.get((dup_market, dup_channel), set())
+
             if not orig_events:
                 status = pd.NA
                 remark = f"No events found in {orig_market} / {orig_channel}"
@@ -991,14 +1106,21 @@ def duplicated_market_check(df_bsr, macro_path, project, col_map, file_rules, de
                 status = False
                 remark = f"Missing {len(missing)} events in {dup_market} / {dup_channel}"
 
-            # Apply results to all relevant rows
-            orig_rows_mask = (df_bsr[mkt_col].astype(str).str.lower() == orig_market) & \
-                             (df_bsr[ch_col].astype(str).str.lower() == orig_channel) & in_league
-            dup_rows_mask = (df_bsr[mkt_col].astype(str).str.lower() == dup_market) & \
-                            (df_bsr[ch_col].astype(str).str.lower() == dup_channel) & in_league
+            outcomes[(orig_market, orig_channel)] = (status, remark)
+            outcomes[(dup_market, dup_channel)] = (status, remark)
+
+        # Apply results to all relevant rows in one merge
+        outcome_df = pd.DataFrame(
+            [(mkt, ch, status, remark) for (mkt, ch), (status, remark) in outcomes.items()],
+            columns=["_mkt", "_ch", "_status", "_remark"],
+        )
+        matched = pd.DataFrame({"_mkt": mkt_key.values, "_ch": ch_key.values}).merge(
+            outcome_df, on=["_mkt", "_ch"], how="left"
+        )
+        apply_mask = in_league.values & matched["_remark"].notna().values
 
-            df_bsr.loc[orig_rows_mask | dup_rows_mask, result_col] = status
-            df_bsr.loc[orig_rows_mask | dup_rows_mask, remark_col] = remark
+        df_bsr.loc[apply_mask, result_col] = matched.loc[apply_mask, "_status"].values
+        df_bsr.loc[apply_mask, remark_col] = matched.loc[apply_mask, "_remark"].values
 
         return df_bsr
 
@@ -1007,15 +1129,16 @@ def duplicated_market_check(df_bsr, macro_path, project, col_map, file_rules, de
         df_bsr[remark_col] = str(e)
         return df_bsr
 # -----------------------------------------------------------
-def country_channel_id_check(df, bsr_cols):
+def country_channel_id_check(df, bsr_cols, schema=None):
     
     df["Market_Channel_ID_OK"] = True
     df["Market_Channel_ID_Remark"] = "OK"
 
-    ch_col = _find_column(df, bsr_cols['tv_channel'])
-    ch_id_col = _find_column(df, bsr_cols['channel_id'])
-    mkt_col = _find_column(df, bsr_cols['market'])
-    mkt_id_col = _find_column(df, bsr_cols['market_id'])
+    schema = resolve_schema(df, bsr_cols, schema)
+    ch_col = schema['tv_channel']
+    ch_id_col = schema['channel_id']
+    mkt_col = schema['market']
+    mkt_id_col = schema['market_id']
     
     if not all([ch_col, ch_id_col, mkt_col, mkt_id_col]):
         logging.warning("ID Check: Missing one or more ID columns. Skipping.")
@@ -1023,55 +1146,33 @@ def country_channel_id_check(df, bsr_cols):
         df["Market_Channel_ID_Remark"] = "Check skipped: ID columns not found"
         return df
 
-    def norm(x):
-        return str(x).strip() if pd.notna(x) else ""
-
-    channel_id_map = {}
-    market_id_map = {}
-    
-    # Build maps first
-    for idx, row in df.iterrows():
-        channel = norm(row.get(ch_col))
-        channel_id = norm(row.get(ch_id_col))
-        market = norm(row.get(mkt_col))
-        market_id = norm(row.get(mkt_id_col))
-
-        if channel and channel_id and channel not in channel_id_map:
-            channel_id_map[channel] = channel_id
-        if market and market_id and market not in market_id_map:
-            market_id_map[market] = market_id
-            
-    # Check for inconsistencies
-    for idx, row in df.iterrows():
-        channel = norm(row.get(ch_col))
-        channel_id = norm(row.get(ch_id_col))
-        market = norm(row.get(mkt_col))
-        market_id = norm(row.get(mkt_id_col))
-        
-        remarks = []
-        ok = True
-
-        if channel and channel_id_map.get(channel) != channel_id:
-            remarks.append(f"Channel '{channel}' has multiple IDs")
-            ok = False
-        if market and market_id_map.get(market) != market_id:
-            remarks.append(f"Market '{market}' has multiple IDs")
-            ok = False
-            
-        df.at[idx, "Market_Channel_ID_OK"] = ok
-        df.at[idx, "Market_Channel_ID_Remark"] = "; ".join(remarks) if remarks else "OK"
-
+    channel, channel_id = _stripped_text(df[ch_col]), _stripped_text(df[ch_id_col])
+    market, market_id = _stripped_text(df[mkt_col]), _stripped_text(df[mkt_id_col])
+
+    # Reference ID = first non-empty ID seen for the channel/market; rows with
+    # another ID (or none at all) are inconsistent
+    channel_ref = channel_id.where(channel_id != "").groupby(channel, sort=False).transform("first")
+    market_ref = market_id.where(market_id != "").groupby(market, sort=False).transform("first")
+    channel_conflict = (channel != "") & (channel_id != channel_ref)
+    market_conflict = (market != "") & (market_id != market_ref)
+
+    df["Market_Channel_ID_OK"] = ~(channel_conflict | market_conflict)
+    df["Market_Channel_ID_Remark"] = _join_remarks([
+        np.where(channel_conflict, "Channel '" + channel + "' has multiple IDs", ""),
+        np.where(market_conflict, "Market '" + market + "' has multiple IDs", ""),
+    ])
     return df
 
 # -----------------------------------------------------------
-def client_lstv_ott_check(df, bsr_cols, rules):
+def client_lstv_ott_check(df, bsr_cols, rules, schema=None):
     
     df["Client_LSTV_OTT_OK"] = True
     df["Client_LSTV_OTT_Remark"] = "OK"
     
-    ch_id_col = _find_column(df, bsr_cols['channel_id'])
-    mkt_id_col = _find_column(df, bsr_cols['market_id'])
-    pay_col = _find_column(df, bsr_cols['pay_tv'])
+    schema = resolve_schema(df, bsr_cols, schema)
+    ch_id_col = schema['channel_id']
+    mkt_id_col = schema['market_id']
+    pay_col = schema['pay_tv']
     keywords = rules.get('keywords', ['client', 'lstv', 'ott'])
     
     if not all([ch_id_col, mkt_id_col, pay_col]):
@@ -1080,40 +1181,22 @@ def client_lstv_ott_check(df, bsr_cols, rules):
         df["Client_LSTV_OTT_Remark"] = "Check skipped: columns not found"
         return df
         
-    def norm(x):
-        return str(x).strip().lower() if pd.notna(x) else ""
-
-    channel_to_market = {}
-    market_to_channel = {}
-
-    for idx, row in df.iterrows():
-        ch_id = norm(row.get(ch_id_col))
-        mk_id = norm(row.get(mkt_id_col))
-        remarks = []
-        ok = True
-
-        if ch_id:
-            if ch_id in channel_to_market and channel_to_market[ch_id] != mk_id:
-                remarks.append(f"Channel ID {ch_id} linked to multiple Market IDs")
-                ok = False
-            else:
-                channel_to_market[ch_id] = mk_id
-
-        if mk_id:
-            if mk_id in market_to_channel and market_to_channel[mk_id] != ch_id:
-                remarks.append(f"Market ID {mk_id} linked to multiple Channel IDs")
-                ok = False
-            else:
-                market_to_channel[mk_id] = ch_id
-
-        val = norm(row.get(pay_col, ""))
-        if not any(k in val for k in keywords):
-            remarks.append(f"Missing Client/LSTV/OTT source: {row.get(pay_col, '')}")
-            ok = False
-
-        df.at[idx, "Client_LSTV_OTT_OK"] = ok
-        df.at[idx, "Client_LSTV_OTT_Remark"] = "; ".join(remarks) if remarks else "OK"
-
+    ch_id = _stripped_text(df[ch_id_col]).str.lower()
+    mk_id = _stripped_text(df[mkt_id_col]).str.lower()
+
+    # Each channel ID should stay on the market ID it first appears with, and vice versa
+    ch_conflict = (ch_id != "") & (mk_id != mk_id.groupby(ch_id, sort=False).transform("first"))
+    mk_conflict = (mk_id != "") & (ch_id != ch_id.groupby(mk_id, sort=False).transform("first"))
+
+    # Pay/Free TV must mention one of the client/LSTV/OTT keywords
+    no_source = ~contains_any(df[pay_col], keywords)
+
+    df["Client_LSTV_OTT_OK"] = ~(ch_conflict.to_numpy() | mk_conflict.to_numpy() | no_source)
+    df["Client_LSTV_OTT_Remark"] = _join_remarks([
+        np.where(ch_conflict, "Channel ID " + ch_id + " linked to multiple Market IDs", ""),
+        np.where(mk_conflict, "Market ID " + mk_id + " linked to multiple Channel IDs", ""),
+        np.where(no_source, "Missing Client/LSTV/OTT source: " + df[pay_col].astype(str), ""),
+    ])
     return df
 # -----------------------------------------------------------
 def color_excel(output_path, df):
@@ -1140,15 +1223,8 @@ def color_excel(output_path, df):
 
     wb.save(output_path)
 # -----------------------------------------------------------
-def generate_summary_sheet(output_path, df, file_rules):
-    
-    summary_sheet_name = file_rules.get('summary_sheet_name', 'Summary')
-    
-    wb = load_workbook(output_path)
-    if summary_sheet_name in wb.sheetnames: 
-        del wb[summary_sheet_name]
-    ws = wb.create_sheet(summary_sheet_name)
-
+def qc_summary(df):
+    """Pass/fail/N-A counts of every QC result column, as written to the Summary sheet."""
     qc_columns = [col for col in df.columns if "_OK" in col]
     summary_data = []
     
@@ -1163,7 +1239,31 @@ def generate_summary_sheet(output_path, df, file_rules):
         
         summary_data.append([col, total, passed, failed, not_applicable])
 
-    summary_df = pd.DataFrame(summary_data, columns=["Check", "Total", "Passed", "Failed", "N/A"])
+    return pd.DataFrame(summary_data, columns=["Check", "Total", "Passed", "Failed", "N/A"])
+
+
+def generate_summary_sheet(output_path, df, file_rules):
+    
+    summary_sheet_name = file_rules.get('summary_sheet_name', 'Summary')
+    
+    wb = load_workbook(output_path)
+    if summary_sheet_name in wb.sheetnames: 
+        del wb[summary_sheet_name]
+    ws = wb.create_sheet(summary_sheet_name)
+
+    summary_df = qc_summary(df)
     for r in dataframe_to_rows(summary_df, index=False, header=True):
         ws.append(r)
-    wb.save(output_path)
\ No newline at end of file
+    wb.save(output_path)
+# -----------------------------------------------------------
+def write_qc_report(output_path, df, file_rules, sheet_name="QC Results"):
+    """
+    Writes the QC results, their green/red highlighting and the Summary sheet
+    in a single pass (replaces to_excel + color_excel + generate_summary_sheet).
+    """
+    return report_writer.write_report(
+        output_path, df,
+        sheet_name=sheet_name,
+        summary=qc_summary(df),
+        summary_sheet_name=file_rules.get('summary_sheet_name', 'Summary'),
+    )
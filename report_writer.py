@@ -0,0 +1,213 @@
+"""
+Single-pass QC report writer.
+
+Writes the data sheet (styled header), the green/red highlighting of the QC
+result columns and the Summary sheet in one pass, instead of
+df.to_excel -> color_excel (reload + per-cell fills) -> generate_summary_sheet
+(reload again).
+
+Highlighting is one conditional-format rule per column range: a cell turns
+green when it holds TRUE (boolean or text, any case) and red for FALSE, so
+the cost no longer grows with the number of rows.
+
+Categorical columns (compact_frame.py loads, flag_codes.py flag columns) are
+expanded by converting each category once and looking the codes up, so a
+flag column's messages are only turned into cell text here.
+
+The engine is chosen at runtime:
+    - "xlsxwriter" when it is installed (fastest); frames with at least
+      CONSTANT_MEMORY_ROWS rows are written in its constant_memory mode;
+    - otherwise "openpyxl" in write_only mode, which always streams rows.
+Set QC_REPORT_ENGINE to force one.
+"""
+import os
+import datetime
+import functools
+
+import numpy as np
+import pandas as pd
+
+ENGINE_ENV_VAR = "QC_REPORT_ENGINE"
+CONSTANT_MEMORY_ROWS = int(os.environ.get("QC_CONSTANT_MEMORY_ROWS", "200000"))
+
+# Types both writers take as-is; anything else (lists, Decimals, ...) is written as text
+_NATIVE_TYPES = (str, bool, int, float, datetime.datetime, datetime.date, datetime.time, datetime.timedelta)
+
+GREEN = "C6EFCE"
+RED = "FFC7CE"
+HEADER = "BDD7EE"
+
+
+@functools.lru_cache(maxsize=None)
+def report_engine():
+    """Name of the fastest Excel writer available in this environment."""
+    forced = os.environ.get(ENGINE_ENV_VAR)
+    if forced:
+        return forced
+    try:
+        import xlsxwriter  # noqa: F401
+        return "xlsxwriter"
+    except ImportError:
+        return "openpyxl"
+
+
+def ok_columns(df):
+    """QC result columns that get highlighted (same selection as color_excel)."""
+    return [col for col in df.columns if str(col).endswith("_OK")]
+
+
+def _column_letter(idx):
+    """0-based column index -> Excel letters (0 -> A, 26 -> AA)."""
+    letters = ""
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _highlight_formulas(col_idx):
+    """Conditional-format formulas for the first data cell of a column (row 2)."""
+    cell = f"{_column_letter(col_idx)}2"
+    return f'OR({cell}=TRUE,{cell}="true")', f'OR({cell}=FALSE,{cell}="false")'
+
+
+def _cell_values(series):
+    """Column as Python values ready for the writer: missing values (NaN/NA/NaT) become None."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Convert the categories once; code -1 (missing) picks the trailing None
+        categories = _cell_values(pd.Series(series.cat.categories, dtype=object)) + [None]
+        return [categories[code] for code in series.cat.codes.tolist()]
+    values = series.astype(object)
+    values = values.where(series.notna(), None).tolist()
+    if series.dtype != object:
+        return [v.item() if isinstance(v, np.generic) else v for v in values]
+    return [
+        v if v is None or isinstance(v, _NATIVE_TYPES)
+        else v.item() if isinstance(v, np.generic)
+        else str(v)
+        for v in values
+    ]
+
+
+def _rows(df):
+    columns = [_cell_values(df.iloc[:, i]) for i in range(df.shape[1])]
+    return zip(*columns) if columns else iter(())
+
+
+def _header(df):
+    return [str(col) if col is not None else "" for col in df.columns]
+
+
+def write_report(output_path, df, sheet_name="Sheet1", summary=None, summary_sheet_name="Summary",
+                 highlight_columns=None, constant_memory=None, engine=None, extra_sheets=None):
+    """
+    Writes df (without index) to output_path in one pass.
+
+    summary           : optional DataFrame written to summary_sheet_name after the data sheet
+    extra_sheets      : optional {sheet name: DataFrame} of detail tables written last
+    highlight_columns : columns to colour green/red (default: the *_OK columns)
+    constant_memory   : xlsxwriter constant_memory mode; default when df has at
+                        least CONSTANT_MEMORY_ROWS rows
+    """
+    if highlight_columns is None:
+        highlight_columns = ok_columns(df)
+    if constant_memory is None:
+        constant_memory = len(df) >= CONSTANT_MEMORY_ROWS
+
+    extra_sheets = extra_sheets or {}
+
+    engine = engine or report_engine()
+    if engine == "xlsxwriter":
+        _write_xlsxwriter(output_path, df, sheet_name, summary, summary_sheet_name, highlight_columns, constant_memory,
+                          extra_sheets)
+    elif engine == "openpyxl":
+        _write_openpyxl(output_path, df, sheet_name, summary, summary_sheet_name, highlight_columns, extra_sheets)
+    else:
+        raise ValueError(f"Unknown report engine: {engine!r}")
+    return output_path
+
+
+def _write_xlsxwriter(output_path, df, sheet_name, summary, summary_sheet_name, highlight_columns, constant_memory,
+                      extra_sheets):
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(output_path, {
+        "constant_memory": constant_memory,
+        "strings_to_urls": False,
+        "nan_inf_to_errors": True,
+        "remove_timezone": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+    header_fmt = wb.add_format({"bold": True, "border": 1, "bg_color": HEADER})
+    green_fmt = wb.add_format({"bg_color": GREEN})
+    red_fmt = wb.add_format({"bg_color": RED})
+
+    def write_sheet(name, frame, highlight):
+        ws = wb.add_worksheet(name)
+        ws.write_row(0, 0, _header(frame), header_fmt)
+        for r, row in enumerate(_rows(frame), start=1):
+            ws.write_row(r, 0, row)
+
+        last_row = max(len(frame), 1)
+        positions = {col: i for i, col in enumerate(frame.columns)}
+        for col in highlight:
+            if col not in positions:
+                continue
+            c = positions[col]
+            true_rule, false_rule = _highlight_formulas(c)
+            ws.conditional_format(1, c, last_row, c, {"type": "formula", "criteria": f"={true_rule}", "format": green_fmt})
+            ws.conditional_format(1, c, last_row, c, {"type": "formula", "criteria": f"={false_rule}", "format": red_fmt})
+
+    write_sheet(sheet_name, df, highlight_columns)
+    if summary is not None:
+        write_sheet(summary_sheet_name, summary, [])
+    for name, frame in extra_sheets.items():
+        write_sheet(name, frame, [])
+    wb.close()
+
+
+def _write_openpyxl(output_path, df, sheet_name, summary, summary_sheet_name, highlight_columns, extra_sheets):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.styles import Border, Font, PatternFill, Side
+
+    wb = Workbook(write_only=True)
+    thin = Side(style="thin")
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color=HEADER, end_color=HEADER, fill_type="solid")
+    header_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    green_fill = PatternFill(start_color=GREEN, end_color=GREEN, fill_type="solid")
+    red_fill = PatternFill(start_color=RED, end_color=RED, fill_type="solid")
+
+    def write_sheet(name, frame, highlight):
+        ws = wb.create_sheet(name)
+        header = []
+        for value in _header(frame):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font, cell.fill, cell.border = header_font, header_fill, header_border
+            header.append(cell)
+
+        last_row = max(len(frame), 1) + 1
+        positions = {col: i for i, col in enumerate(frame.columns)}
+        for col in highlight:
+            if col not in positions:
+                continue
+            c = positions[col]
+            letter = _column_letter(c)
+            true_rule, false_rule = _highlight_formulas(c)
+            cell_range = f"{letter}2:{letter}{last_row}"
+            ws.conditional_formatting.add(cell_range, FormulaRule(formula=[true_rule], fill=green_fill))
+            ws.conditional_formatting.add(cell_range, FormulaRule(formula=[false_rule], fill=red_fill))
+
+        ws.append(header)
+        for row in _rows(frame):
+            ws.append(row)
+
+    write_sheet(sheet_name, df, highlight_columns)
+    if summary is not None:
+        write_sheet(summary_sheet_name, summary, [])
+    for name, frame in extra_sheets.items():
+        write_sheet(name, frame, [])
+    wb.save(output_path)
@@ -0,0 +1,98 @@
+"""
+Batched row removals for the market checks (remove_andorra, remove_serbia,
+remove_brazil_espn_fox, ...).
+
+Each removal check is a predicate over a few text columns compared in lower
+case (Market, Broadcaster, TV-Channel). Run one by one, every check
+stringified and lower-cased the columns again and copied the frame. Here the
+selected removals are planned together:
+    - LowerText lower-cases each column once, per distinct value, and serves
+      it to every predicate;
+    - the predicates' masks are OR-ed in check order and the frame is
+      filtered once;
+    - each check is still reported with the rows it removed itself (rows an
+      earlier check of the batch already removed don't count again), as if
+      the checks had run in sequence.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+class LowerText:
+    """str(value).lower() of df's text columns, computed once per column and distinct value."""
+
+    def __init__(self, df):
+        self.df = df
+        self._columns = {}  # column -> (codes, lower-cased distinct values)
+
+    def _resolve(self, name, fallbacks):
+        for col in (name,) + fallbacks:
+            if col in self.df.columns:
+                break
+        else:
+            raise KeyError(f"Missing column '{name}'")
+        if col not in self._columns:
+            # Missing values stay distinct values, so they read as "nan" like astype(str)
+            codes, uniques = pd.factorize(self.df[col], use_na_sentinel=False)
+            lowered = pd.Series(np.asarray(uniques, dtype=object), dtype=object).astype(str).str.lower()
+            self._columns[col] = (codes, lowered)
+        return self._columns[col]
+
+    def __call__(self, name, *fallbacks):
+        """Lower-cased column (the first of name / fallbacks present in the frame)."""
+        codes, lowered = self._resolve(name, fallbacks)
+        return pd.Series(lowered.to_numpy()[codes], index=self.df.index, dtype=object)
+
+    def contains(self, name, pattern, *fallbacks):
+        """Boolean array: the lower-cased column matches the regex pattern (searched per distinct value)."""
+        codes, lowered = self._resolve(name, fallbacks)
+        matched = lowered.str.contains(pattern, flags=re.IGNORECASE, regex=True, na=False).to_numpy(dtype=bool)
+        return matched[codes]
+
+
+class RowRemoval:
+    """
+    One removal check.
+
+    predicate   : LowerText -> boolean mask of the rows to remove
+    summary     : (rows_processed, rows_removed) -> status dict of the check
+    reset_index : renumber the rows after removing them
+    """
+
+    def __init__(self, check_key, predicate, summary, reset_index=True):
+        self.check_key = check_key
+        self.predicate = predicate
+        self.summary = summary
+        self.reset_index = reset_index
+
+
+def apply_removals(df, removals):
+    """
+    Applies the removals in order with one combined filter.
+
+    Returns (df, outcomes) with one (check_key, status dict or exception)
+    per removal; a removal whose predicate raised removes nothing.
+    """
+    text = LowerText(df)
+    removed = np.zeros(len(df), dtype=bool)
+    outcomes = []
+    reset_index = False
+    for removal in removals:
+        try:
+            mask = np.asarray(removal.predicate(text), dtype=bool)
+        except Exception as e:
+            outcomes.append((removal.check_key, e))
+            continue
+        rows_processed = len(df) - int(removed.sum())
+        rows_removed = int((mask & ~removed).sum())
+        removed |= mask
+        reset_index |= removal.reset_index
+        outcomes.append((removal.check_key, removal.summary(rows_processed, rows_removed)))
+
+    if removed.any():
+        df = df[~removed]
+    if reset_index:
+        df = df.reset_index(drop=True)
+    return df, outcomes
@@ -0,0 +1,53 @@
+"""
+Sequential gap primitive for "consecutive program on the same channel" checks.
+
+Programs are compared with the program just before them in the same group
+(e.g. Market + TV-Channel), in start-time order: the daybreak continuation
+checks and the Gillette consolidation check all ask how long after the
+previous program of the group a program starts. sequential_gaps() answers
+that for every row with one shift over the ordered frame, so the cost is a
+sort plus linear column operations, without a Python loop over groups.
+
+Two rows belong to the same group when all group columns are equal; a
+missing key never matches, so rows with a missing key have no predecessor
+(as with groupby, which drops them).
+"""
+import numpy as np
+import pandas as pd
+
+
+def sequential_gaps(df, group_cols, start_col, end_col, sort=True):
+    """
+    (row, predecessor, gap) for every row of df.
+
+    sort: order rows by group_cols + start_col first (stable, missing values
+          last); False keeps df's order, for frames the caller already sorted
+
+    Returns a DataFrame indexed by the row labels in scan order with:
+        predecessor     : index label of the previous row of the same group (None for the first)
+        has_predecessor : bool
+        gap_min         : minutes from the predecessor's end to the row's start
+                          (NaN without predecessor or when a time is missing)
+    """
+    group_cols = list(group_cols)
+    if sort:
+        df = df.sort_values(by=group_cols + [start_col], na_position="last", kind="mergesort")
+
+    same_group = np.ones(len(df), dtype=bool)
+    for col in group_cols:
+        values = df[col]
+        same_group &= (values.eq(values.shift(1)) & values.notna()).to_numpy()
+
+    gap = (df[start_col] - df[end_col].shift(1)).dt.total_seconds() / 60
+    gap = gap.where(same_group)
+
+    labels = df.index.to_numpy()
+    predecessor = np.full(len(df), None, dtype=object)
+    positions = np.flatnonzero(same_group)
+    predecessor[positions] = labels[positions - 1]
+
+    return pd.DataFrame({
+        "predecessor": predecessor,
+        "has_predecessor": same_group,
+        "gap_min": gap.to_numpy(),
+    }, index=df.index)
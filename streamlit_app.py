@@ -35,6 +35,7 @@ try:
 
     from C_data_processing_f1 import BSRValidator
     from C_data_processing_EPL import EPLValidator
+    import report_writer
 
 except ImportError as e:
         st.error(f"Failed to import colleague's files (qc_checks.py, C_data_processing_f1.py): {e}")
@@ -44,6 +45,7 @@ except ImportError as e:
 # Your 11-check QC functions
 try:
     import qc_checks_1 as qc_general
+    from column_schema import REQUIRED_BSR_FIELDS, log_unresolved, resolve_schema
 except ImportError as e:
     st.error(f"Failed to import your QC file (qc_checks_1.py): {e}")
     st.stop()
@@ -388,28 +390,26 @@ with main_qc_tab:
                     with open(bsr_path, "wb") as f: f.write(main_bsr_file.getbuffer())
 
                     # --- Run YOUR 9 QC Checks Directly ---
-                    start_date, end_date = qc_general.detect_period_from_rosco(rosco_path)
                     df = qc_general.load_bsr(bsr_path, col_map["bsr"])
+                    # Every config field is resolved once; a BSR without the core columns stops here
+                    schema = log_unresolved(resolve_schema(df, col_map["bsr"])).require(REQUIRED_BSR_FIELDS)
+                    start_date, end_date = qc_general.detect_period_from_rosco(rosco_path)
                     
-                    df = qc_general.period_check(df, start_date, end_date, col_map["bsr"])
-                    df = qc_general.completeness_check(df, col_map["bsr"], rules["program_category"])
-                    df = qc_general.overlap_duplicate_daybreak_check(df, col_map["bsr"], rules["overlap_check"])
-                    df = qc_general.program_category_check(bsr_path, df, col_map, rules["program_category"], file_rules)
-                    df = qc_general.check_event_matchday_competition(df, bsr_path, col_map, file_rules)
-                    df = qc_general.market_channel_consistency_check(df, rosco_path, col_map, file_rules)
-                    df = qc_general.rates_and_ratings_check(df, col_map["bsr"])
-                    df = qc_general.country_channel_id_check(df, col_map["bsr"])
-                    df = qc_general.client_lstv_ott_check(df, col_map["bsr"], rules["client_check"])
+                    df = qc_general.period_check(df, start_date, end_date, col_map["bsr"], schema=schema)
+                    df = qc_general.completeness_check(df, col_map["bsr"], rules["program_category"], schema=schema)
+                    df = qc_general.overlap_duplicate_daybreak_check(df, col_map["bsr"], rules["overlap_check"], schema=schema)
+                    df = qc_general.program_category_check(bsr_path, df, col_map, rules["program_category"], file_rules, schema=schema)
+                    df = qc_general.check_event_matchday_competition(df, bsr_path, col_map, file_rules, schema=schema)
+                    df = qc_general.market_channel_consistency_check(df, rosco_path, col_map, file_rules, schema=schema)
+                    df = qc_general.rates_and_ratings_check(df, col_map["bsr"], schema=schema)
+                    df = qc_general.country_channel_id_check(df, col_map["bsr"], schema=schema)
+                    df = qc_general.client_lstv_ott_check(df, col_map["bsr"], rules["client_check"], schema=schema)
 
                     # --- Generate Output File ---
                     output_file = f"General_QC_Result_{os.path.splitext(main_bsr_file.name)[0]}.xlsx"
                     output_path = os.path.join(OUTPUT_FOLDER, output_file)
 
-                    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-                        df.to_excel(writer, index=False, sheet_name="QC Results")
-
-                    qc_general.color_excel(output_path, df)
-                    qc_general.generate_summary_sheet(output_path, df, file_rules)
+                    qc_general.write_qc_report(output_path, df, file_rules, sheet_name="QC Results")
                     
                     st.success("✅ General QC completed successfully!")
                     with open(output_path, "rb") as f:
@@ -462,33 +462,31 @@ with laliga_qc_tab:
                     with open(macro_path, "wb") as f: f.write(laliga_macro_file.getbuffer())
                     
                     # --- Run YOUR 11 QC Checks Directly ---
-                    start_date, end_date = qc_general.detect_period_from_rosco(rosco_path)
                     df = qc_general.load_bsr(bsr_path, col_map["bsr"])
+                    # Every config field is resolved once; a BSR without the core columns stops here
+                    schema = log_unresolved(resolve_schema(df, col_map["bsr"])).require(REQUIRED_BSR_FIELDS)
+                    start_date, end_date = qc_general.detect_period_from_rosco(rosco_path)
 
                     # Run the 9 General Checks
-                    df = qc_general.period_check(df, start_date, end_date, col_map["bsr"])
-                    df = qc_general.completeness_check(df, col_map["bsr"], rules["program_category"])
-                    df = qc_general.overlap_duplicate_daybreak_check(df, col_map["bsr"], rules["overlap_check"])
-                    df = qc_general.program_category_check(bsr_path, df, col_map, rules["program_category"], file_rules)
-                    df = qc_general.check_event_matchday_competition(df, bsr_path, col_map, file_rules)
-                    df = qc_general.market_channel_consistency_check(df, rosco_path, col_map, file_rules)
-                    df = qc_general.rates_and_ratings_check(df, col_map["bsr"])
-                    df = qc_general.country_channel_id_check(df, col_map["bsr"])
-                    df = qc_general.client_lstv_ott_check(df, col_map["bsr"], rules["client_check"])
+                    df = qc_general.period_check(df, start_date, end_date, col_map["bsr"], schema=schema)
+                    df = qc_general.completeness_check(df, col_map["bsr"], rules["program_category"], schema=schema)
+                    df = qc_general.overlap_duplicate_daybreak_check(df, col_map["bsr"], rules["overlap_check"], schema=schema)
+                    df = qc_general.program_category_check(bsr_path, df, col_map, rules["program_category"], file_rules, schema=schema)
+                    df = qc_general.check_event_matchday_competition(df, bsr_path, col_map, file_rules, schema=schema)
+                    df = qc_general.market_channel_consistency_check(df, rosco_path, col_map, file_rules, schema=schema)
+                    df = qc_general.rates_and_ratings_check(df, col_map["bsr"], schema=schema)
+                    df = qc_general.country_channel_id_check(df, col_map["bsr"], schema=schema)
+                    df = qc_general.client_lstv_ott_check(df, col_map["bsr"], rules["client_check"], schema=schema)
                     
                     # Run the 2 Laliga-Specific Checks
-                    df = qc_general.domestic_market_check(df, project, col_map["bsr"], debug=True)
-                    df = qc_general.duplicated_market_check(df, macro_path, project, col_map, file_rules, debug=True)
+                    df = qc_general.domestic_market_check(df, project, col_map["bsr"], debug=True, schema=schema)
+                    df = qc_general.duplicated_market_check(df, macro_path, project, col_map, file_rules, debug=True, schema=schema)
 
                     # --- Generate Output File ---
                     output_file = f"Laliga_QC_Result_{os.path.splitext(laliga_bsr_file.name)[0]}.xlsx"
                     output_path = os.path.join(OUTPUT_FOLDER, output_file)
 
-                    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-                        df.to_excel(writer, index=False, sheet_name="Laliga QC Results")
-
-                    qc_general.color_excel(output_path, df)
-                    qc_general.generate_summary_sheet(output_path, df, file_rules)
+                    qc_general.write_qc_report(output_path, df, file_rules, sheet_name="Laliga QC Results")
                     
                     st.success("✅ Laliga QC completed successfully!")
                     with open(output_path, "rb") as f:
@@ -762,7 +760,10 @@ with epl_tab:
                     output_filename = f"Processed_BSR_{os.path.splitext(f1_bsr_file.name)[0]}_{int(time.time())}.xlsx"
                     output_path = os.path.join(OUTPUT_FOLDER, output_filename)
                     
-                    df_processed.to_excel(output_path, index=False)
+                    # Same layout as /api/market_check_and_process: the processed BSR, then the
+                    # validator's detail tables (e.g. 'Capacity Conflicts') as extra sheets
+                    report_writer.write_report(output_path, df_processed, sheet_name='Processed BSR',
+                                               extra_sheets=validator.side_tables)
                     
                     st.success(f"✅ F1 checks completed successfully!")
                     
@@ -0,0 +1,107 @@
+"""
+Content-addressed store for uploaded files.
+
+Uploads are streamed to disk in chunks while their SHA-256 is computed, then
+stored as <root>/<sha256><ext>. Two users uploading files with the same name
+never collide, and byte-identical uploads end up at the same path, so caches
+keyed on the file (WorkbookCache, the macro rule index) see one file.
+
+Paths are shared between requests, so endpoints never delete them: a saved
+upload is pinned until release(), and cleanup() only removes unpinned files
+older than the given age.
+
+stored_digest() gives the SHA-256 of a path inside a store from its name,
+without reading the file; any other file has to be hashed.
+"""
+import os
+import re
+import time
+import hashlib
+import tempfile
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+_SHA256_NAME = re.compile(r"[0-9a-f]{64}")
+_STORE_ROOTS = set()  # real paths of every UploadStore root in this process
+
+
+def stored_digest(path):
+    """
+    SHA-256 of a file saved by an UploadStore, taken from its name; None for
+    any path outside the stores' directories (whatever it is named).
+    """
+    path = os.path.realpath(path)
+    if os.path.dirname(path) not in _STORE_ROOTS:
+        return None
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem if _SHA256_NAME.fullmatch(stem) else None
+
+
+class UploadStore:
+
+    def __init__(self, root, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+        self._pins = {}  # path -> number of requests/jobs using it
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        _STORE_ROOTS.add(os.path.realpath(self.root))
+
+    def save(self, fileobj, filename):
+        """
+        Streams fileobj into the store and returns (path, sha256 hex digest).
+        The returned path stays pinned until release(path).
+        """
+        ext = os.path.splitext(os.path.basename(filename or ""))[1].lower()
+        sha = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                for chunk in iter(lambda: fileobj.read(self.chunk_size), b""):
+                    sha.update(chunk)
+                    buffer.write(chunk)
+            digest = sha.hexdigest()
+            path = os.path.join(self.root, f"{digest}{ext}")
+
+            with self._lock:
+                if os.path.exists(path):
+                    os.remove(tmp_path)  # Same content already stored
+                    os.utime(path)       # Restart its retention clock
+                else:
+                    os.replace(tmp_path, path)
+                self._pins[path] = self._pins.get(path, 0) + 1
+            return path, digest
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def save_upload(self, upload):
+        """save() for a FastAPI UploadFile; returns None when no file was sent."""
+        if not (upload and upload.filename):
+            return None
+        return self.save(upload.file, upload.filename)[0]
+
+    def release(self, *paths):
+        """Unpins paths returned by save(); None entries are ignored."""
+        with self._lock:
+            for path in paths:
+                if path in self._pins:
+                    self._pins[path] -= 1
+                    if self._pins[path] <= 0:
+                        del self._pins[path]
+
+    def cleanup(self, max_age_minutes=30):
+        """Deletes unpinned files (and stale partial uploads) older than max_age_minutes."""
+        cutoff = time.time() - max_age_minutes * 60
+        with self._lock:
+            for filename in os.listdir(self.root):
+                path = os.path.join(self.root, filename)
+                if path in self._pins or not os.path.isfile(path):
+                    continue
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        print(f"🧹 Deleted old upload: {path}")
+                except OSError as e:
+                    print(f"⚠️ Error deleting {path}: {e}")
@@ -0,0 +1,117 @@
+"""
+Per-run workbook cache.
+
+A single QC run reads the same BSR / Rosco workbooks many times (header
+detection, full load, fixture sheet, reference sheet, ...). WorkbookCache
+parses every sheet at most once and serves later reads from memory.
+
+Reads go through the same TextParser step pandas.read_excel uses, so a cached
+read returns the same DataFrame as pd.read_excel with the same arguments.
+"""
+import os
+import pandas as pd
+import excel_reader
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+
+
+def _trim_rows(rows):
+    """
+    Trims trailing empty cells/rows and re-pads to the widest row, as the
+    Excel reader does for a partial (nrows) read of a sheet.
+    """
+    trimmed = []
+    last_row_with_data = -1
+    for i, row in enumerate(rows):
+        row = list(row)
+        while row and row[-1] == "":
+            row.pop()
+        if row:
+            last_row_with_data = i
+        trimmed.append(row)
+
+    trimmed = trimmed[:last_row_with_data + 1]
+    width = max((len(row) for row in trimmed), default=0)
+    return [row + [""] * (width - len(row)) for row in trimmed]
+
+
+class WorkbookCache:
+    """
+    Cache of parsed workbooks keyed by (absolute path, mtime, size), so an
+    overwritten upload with the same name is never served stale data.
+
+    Create one per QC run and pass it to every check that reads Excel files.
+    A cache sent to another process (a check_graph pool check) arrives empty
+    and re-reads the workbooks there from their paths; uploads live in the
+    content-addressed store, so those paths are stable.
+    """
+
+    def __init__(self):
+        self._books = {}   # file key -> pd.ExcelFile
+        self._sheets = {}  # (file key, sheet name) -> list of raw cell rows
+
+    def __getstate__(self):
+        # Open workbooks can't be pickled; the parsed sheets aren't worth shipping
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    @staticmethod
+    def _file_key(path):
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    def _book(self, path):
+        key = self._file_key(path)
+        if key not in self._books:
+            self._books[key] = excel_reader.excel_file(path)
+        return key, self._books[key]
+
+    def sheet_names(self, path):
+        """Sheet names of the workbook, in workbook order."""
+        return self._book(path)[1].sheet_names
+
+    def _raw_rows(self, path, sheet_name):
+        key, book = self._book(path)
+        if isinstance(sheet_name, int):
+            sheet_name = book.sheet_names[sheet_name]
+
+        if (key, sheet_name) not in self._sheets:
+            # Raw cell values exactly as the Excel reader hands them to the parser
+            raw = book.parse(sheet_name, header=None, dtype=object, na_filter=False)
+            self._sheets[(key, sheet_name)] = raw.values.tolist()
+        return self._sheets[(key, sheet_name)]
+
+    def read_excel(self, path, sheet_name=0, header=0, nrows=None, dtype=None):
+        """
+        Drop-in replacement for pd.read_excel(path, sheet_name, header, nrows, dtype)
+        served from the cached sheet.
+        """
+        data = self._raw_rows(path, sheet_name)
+        if not data:
+            return pd.DataFrame()
+        if nrows is not None:
+            # Same row budget pd.read_excel reads from the file for an nrows read
+            header_rows = 1 if header is None else header + 1
+            data = _trim_rows(data[:header_rows + nrows])
+            if not data:
+                return pd.DataFrame()
+
+        try:
+            parser = TextParser(
+                [list(row) for row in data],
+                header=header,
+                dtype=dtype,
+                nrows=nrows,
+                skip_blank_lines=False,
+            )
+            return parser.read(nrows=nrows)
+        except EmptyDataError:
+            return pd.DataFrame()
+
+    def clear(self):
+        for book in self._books.values():
+            book.close()
+        self._books.clear()
+        self._sheets.clear()